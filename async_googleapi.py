@@ -0,0 +1,398 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, TypeVar, Union
+
+import httpx
+from icecream import ic
+
+from googleapi import AUTH_TYPE_SERVICE_ACCOUNT, ApiError, GoogleAPI, Permissions
+from instrumentation import instrumentation
+from scheduler import (
+    BULK,
+    INTERACTIVE,
+    RequestScheduler,
+    default_scheduler,
+    error_status,
+    is_idempotent,
+    method_service,
+)
+
+DOCS_URL = "https://docs.googleapis.com"
+DRIVE_URL = "https://www.googleapis.com"
+# Вместо ошибки в общем поле клиента каждый вызов возвращает свою
+T = TypeVar("T")
+Result = tuple[Union[T, None], Union[ApiError, None]]
+
+
+class AsyncGoogleAPI:
+    """Asyncio version of `GoogleAPI` over a pooled keep-alive HTTP client.
+
+    Requests share the quotas and the retry policy of the synchronous
+    clients through the same `RequestScheduler`. Concurrent calls cannot
+    share one `last_error`, so every method returns a `(result, error)`
+    pair where `error` is an `ApiError` or None.
+    """
+
+    def __init__(
+        self,
+        credentials_file=None,
+        credentials_json=None,
+        credentials=None,
+        max_connections: int = 20,
+        max_concurrency: int = 10,
+        timeout: float = 30.0,
+        docs_url: str = DOCS_URL,
+        drive_url: str = DRIVE_URL,
+        scheduler: Union[RequestScheduler, None] = None,
+    ) -> None:
+        # Синхронный клиент используется только для учётных данных и разбора ссылок
+        self._google_api = GoogleAPI(credentials_file, credentials_json)
+        self.credentials = credentials
+
+        self.docs_url = docs_url.rstrip("/")
+        self.drive_url = drive_url.rstrip("/")
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.scheduler = scheduler or default_scheduler
+        # Создаются при первом запросе, внутри работающего цикла событий
+        self._semaphore: Union[asyncio.Semaphore, None] = None
+        self._refresh_lock: Union[asyncio.Lock, None] = None
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            timeout=timeout,
+        )
+
+    async def __aenter__(self) -> "AsyncGoogleAPI":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    @property
+    def service_email(self) -> Union[str, None]:
+        return self._google_api.service_email
+
+    def authorize(self, authentication_type: Union[str, None] = None) -> bool:
+        """Load the credentials; the access token is fetched on the first request."""
+        if self.credentials is None:
+            self.credentials = self._google_api._get_credentials(
+                authentication_type or AUTH_TYPE_SERVICE_ACCOUNT
+            )
+        return True
+
+    async def _token(self) -> str:
+        if self.credentials is None:
+            raise RuntimeError("Клиент не авторизован, вызовите authorize()")
+
+        if not self.credentials.valid:
+            if self._refresh_lock is None:
+                self._refresh_lock = asyncio.Lock()
+            async with self._refresh_lock:
+                if not self.credentials.valid:
+                    await asyncio.to_thread(self._refresh_credentials)
+        return self.credentials.token
+
+    def _refresh_credentials(self) -> None:
+        import google_auth_httplib2
+        import httplib2
+
+        self.credentials.refresh(google_auth_httplib2.Request(httplib2.Http()))
+
+    @staticmethod
+    def _fail(
+        method: str, message: str, error: Union[Exception, None] = None
+    ) -> tuple[None, ApiError]:
+        return None, ApiError(
+            method,
+            message,
+            status=error_status(error),
+            retries=getattr(error, "retries", 0),
+            error=error,
+        )
+
+    async def _request(
+        self,
+        name: str,
+        method: str,
+        url: str,
+        params: Union[dict, None] = None,
+        json: Union[dict, None] = None,
+        timeout: Union[float, None] = None,
+        raw: bool = False,
+        priority: int = INTERACTIVE,
+    ) -> Any:
+        """Send one API request through the scheduler: quotas and retries."""
+        return await self.scheduler.execute_async(
+            lambda: self._send(name, method, url, params, json, timeout, raw),
+            method_service(name),
+            name,
+            priority,
+            idempotent=is_idempotent(name, json),
+        )
+
+    async def _send(
+        self,
+        name: str,
+        method: str,
+        url: str,
+        params: Union[dict, None],
+        json: Union[dict, None],
+        timeout: Union[float, None],
+        raw: bool,
+    ) -> Any:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async with self._semaphore:
+            headers = {"Authorization": f"Bearer {await self._token()}"}
+            start = time.perf_counter()
+            try:
+                response = await self._client.request(
+                    method,
+                    url,
+                    params=params,
+                    json=json,
+                    headers=headers,
+                    timeout=timeout or self.timeout,
+                )
+            except httpx.HTTPError as e:
+                instrumentation.record_request(
+                    name, type(e).__name__, time.perf_counter() - start
+                )
+                raise
+            instrumentation.record_request(
+                name,
+                response.status_code,
+                time.perf_counter() - start,
+                len(response.content),
+            )
+        response.raise_for_status()
+        if raw:
+            return response.content
+        return response.json() if response.content else None
+
+    def _file_url(self, file_id: str, *parts: str) -> str:
+        file_id = self._google_api.extract_file_id_from_url(file_id)
+        return "/".join((f"{self.drive_url}/drive/v3/files", file_id) + parts)
+
+    async def get_file_name(self, file_id: str) -> Result[str]:
+        """Get the name of a file by its ID."""
+        try:
+            file = await self._request(
+                "drive.files.get",
+                "GET",
+                self._file_url(file_id),
+                params={"fields": "name"},
+            )
+            return file["name"], None
+        except httpx.HTTPError as e:
+            if error_status(e) == 404:
+                return self._fail("get_file_name", f"Файл с ID {file_id} не найден.", e)
+            return self._fail(
+                "get_file_name", f"Ошибка при получении имени файла: {e}", e
+            )
+
+    async def iter_files(
+        self,
+        query: Union[str, None] = None,
+        fields: str = "id, name, mimeType",
+        page_size: int = 1000,
+    ) -> AsyncIterator[dict]:
+        """Iterate over all files, requesting pages lazily with only `fields`.
+
+        HTTP errors are raised: the files already yielded stay valid.
+        """
+        params = {"pageSize": page_size, "fields": f"nextPageToken, files({fields})"}
+        if query:
+            params["q"] = query
+        while True:
+            page = await self._request(
+                "drive.files.list",
+                "GET",
+                f"{self.drive_url}/drive/v3/files",
+                params=params,
+                priority=BULK,
+            )
+            for file in page.get("files", []):
+                yield file
+            page_token = page.get("nextPageToken")
+            if not page_token:
+                return
+            params["pageToken"] = page_token
+
+    async def get_files(self) -> Result[dict]:
+        """Get a list of all files."""
+        try:
+            return {"files": [file async for file in self.iter_files()]}, None
+        except httpx.HTTPError as e:
+            return self._fail(
+                "get_files", f"Ошибка при получении списка файлов: {e}", e
+            )
+
+    async def delete_file(self, file_id: str) -> Result[dict]:
+        """Delete a file by its ID."""
+        try:
+            return (
+                await self._request(
+                    "drive.files.delete", "DELETE", self._file_url(file_id)
+                ),
+                None,
+            )
+        except httpx.HTTPError as e:
+            if error_status(e) == 404:
+                return self._fail("delete_file", f"Файл с ID {file_id} не найден.", e)
+            return self._fail("delete_file", f"Ошибка при удалении файла: {e}", e)
+
+    async def get_document(self, file_id: str) -> Result[dict]:
+        """Get the content of a document by its ID."""
+        file_id = self._google_api.extract_file_id_from_url(file_id)
+        try:
+            return (
+                await self._request(
+                    "docs.documents.get",
+                    "GET",
+                    f"{self.docs_url}/v1/documents/{file_id}",
+                ),
+                None,
+            )
+        except httpx.HTTPError as e:
+            if error_status(e) == 403:
+                return self._fail(
+                    "get_document",
+                    f"У вас нет прав для просмотра документа с ID {file_id}. Проверьте права доступа.",
+                    e,
+                )
+            return self._fail("get_document", f"Ошибка при получении документа: {e}", e)
+
+    async def get_document_bytes(self, file_id: str) -> bytes:
+        """Get the undecoded JSON of a document; HTTP errors are raised."""
+        file_id = self._google_api.extract_file_id_from_url(file_id)
+        return await self._request(
+            "docs.documents.get",
+            "GET",
+            f"{self.docs_url}/v1/documents/{file_id}",
+            raw=True,
+        )
+
+    async def get_permissions(self, file_id: str) -> Result[list[dict]]:
+        """Get the permissions of a file by its ID."""
+        try:
+            permissions = await self._request(
+                "drive.permissions.list",
+                "GET",
+                self._file_url(file_id, "permissions"),
+                params={"fields": "*"},
+            )
+            return permissions.get("permissions", []), None
+        except httpx.HTTPError as e:
+            if error_status(e) == 403:
+                return self._fail(
+                    "get_permissions",
+                    f"У вас нет прав для просмотра документа с ID {file_id}. Проверьте права доступа.",
+                    e,
+                )
+            return self._fail(
+                "get_permissions",
+                f"Ошибка при получении разрешений для документа: {e}",
+                e,
+            )
+
+    async def add_permissions(
+        self,
+        file_id: str,
+        user_email: str,
+        role: Permissions,
+    ) -> Result[dict]:
+        """Add permissions to a file."""
+        try:
+            permission = await self._request(
+                "drive.permissions.create",
+                "POST",
+                self._file_url(file_id, "permissions"),
+                json={"type": "user", "role": role.value, "emailAddress": user_email},
+            )
+            return permission, None
+        except httpx.HTTPError as e:
+            if error_status(e) == 403:
+                return self._fail(
+                    "add_permissions",
+                    f"У вас нет прав для просмотра документа с ID {file_id}. Проверьте права доступа.",
+                    e,
+                )
+            return self._fail(
+                "add_permissions",
+                f"Ошибка при добавлении разрешений для документа: {e}",
+                e,
+            )
+
+    async def delete_permissions(
+        self,
+        file_id: str,
+        user_email: Union[str, None] = None,
+        user_id: Union[int, None] = None,
+    ) -> Result[dict]:
+        """Delete permissions from a file."""
+        if not user_id and not user_email:
+            raise ValueError("Вы должны указать user_id или user_email")
+
+        if user_email:
+            permissions_list, error = await self.get_permissions(file_id)
+            if error is not None:
+                return None, error
+
+            user_id = next(
+                (
+                    permission["id"]
+                    for permission in permissions_list
+                    if permission.get("emailAddress") == user_email
+                ),
+                None,
+            )
+            if not user_id:
+                return self._fail(
+                    "delete_permissions",
+                    f"Не найдено разрешение для email: {user_email}",
+                )
+
+        try:
+            response = await self._request(
+                "drive.permissions.delete",
+                "DELETE",
+                self._file_url(file_id, "permissions", str(user_id)),
+            )
+            return response, None
+        except httpx.HTTPError as e:
+            if error_status(e) == 403:
+                return self._fail(
+                    "delete_permissions",
+                    f"У вас нет прав для просмотра документа с ID {file_id}. Проверьте права доступа.",
+                    e,
+                )
+            return self._fail(
+                "delete_permissions",
+                f"Ошибка при удалении разрешений для документа: {e}",
+                e,
+            )
+
+
+if __name__ == "__main__":
+
+    async def main() -> None:
+        async with AsyncGoogleAPI("credentials.json") as google_api:
+            google_api.authorize()
+            files, error = await google_api.get_files()
+            if error is not None:
+                ic(error)
+                return
+            names = await asyncio.gather(
+                *(google_api.get_file_name(file["id"]) for file in files["files"])
+            )
+            ic([name for name, _ in names])
+
+    asyncio.run(main())
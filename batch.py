@@ -0,0 +1,275 @@
+import argparse
+import io
+import json
+import math
+import os
+import time
+from collections import Counter
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from typing import Iterable, Union
+
+from document import Document
+from googleapi import GoogleAPI, per_thread
+from instrumentation import instrumentation
+
+
+def analyse(
+    source: str,
+    payload: Union[bytes, None] = None,
+    count_emoji=False,
+    first_table_only=False,
+) -> dict:
+    """Count document metrics from raw JSON bytes or a saved JSON export.
+
+    Runs in a worker process, so only the bytes or the file path cross the
+    process boundary and the JSON tree is never built.
+    """
+    start = time.perf_counter()
+    result: dict = {"source": source}
+    try:
+        # Статистика cProfile сохраняется только для медленных документов
+        with instrumentation.profile(source):
+            if payload is None:
+                result["bytes"] = os.path.getsize(source)
+                doc = Document.from_path(source, count_emoji, first_table_only)
+            else:
+                result["bytes"] = len(payload)
+                doc = Document.from_stream(
+                    io.BytesIO(payload), count_emoji, first_table_only
+                )
+
+            result.update(doc.metrics())
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+
+    result["analyse_seconds"] = time.perf_counter() - start
+    return result
+
+
+def percentile(values: list[float], percent: float) -> float:
+    """Nearest-rank percentile of the values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+class BatchRunner:
+    """Fetch documents with bounded concurrency and analyse them in processes."""
+
+    def __init__(
+        self,
+        output_path: str,
+        credentials_file: Union[str, None] = None,
+        fetch_workers: int = 8,
+        processes: Union[int, None] = None,
+        count_emoji=False,
+        first_table_only=False,
+        max_pending: Union[int, None] = None,
+    ) -> None:
+        self.output_path = output_path
+        self.credentials_file = credentials_file
+        self.fetch_workers = fetch_workers
+        self.processes = processes or os.cpu_count() or 1
+        # Загруженные документы ждут анализа в памяти: их число ограничено
+        self.max_pending = max_pending or self.fetch_workers + 2 * self.processes
+        self.count_emoji = count_emoji
+        self.first_table_only = first_table_only
+
+        self._google_api = per_thread(self._connect)
+        self.results: list[dict] = []
+        self.elapsed = 0.0
+
+    def _connect(self) -> GoogleAPI:
+        google_api = GoogleAPI(self.credentials_file)
+        google_api.authorize()
+        return google_api
+
+    def _fetch(self, document_id: str) -> tuple[Union[bytes, None], float, dict]:
+        start = time.perf_counter()
+        google_api = self._google_api()
+        payload = google_api.get_document_bytes(document_id)
+        if payload is None:
+            error = google_api.last_error
+            failure = {"error": error.message if error else "Документ не получен"}
+            if error is not None:
+                failure.update(status=error.status, retries=error.retries)
+            return None, time.perf_counter() - start, failure
+
+        return payload, time.perf_counter() - start, {}
+
+    def run_ids(self, document_ids: Iterable[str]) -> list[dict]:
+        """Fetch and analyse documents by their URLs or IDs.
+
+        At most `max_pending` documents are fetched or analysed at a time, so
+        downloaded payloads do not pile up when analysis falls behind.
+        """
+        started = time.perf_counter()
+        pending_ids = iter(document_ids)
+        with ThreadPoolExecutor(self.fetch_workers) as fetchers, ProcessPoolExecutor(
+            self.processes
+        ) as workers, open(self.output_path, "w", encoding="utf-8") as output:
+            fetching: dict[Future, str] = {}
+            analysing: dict[Future, float] = {}
+
+            def fill() -> None:
+                while len(fetching) + len(analysing) < self.max_pending:
+                    document_id = next(pending_ids, None)
+                    if document_id is None:
+                        return
+                    fetching[fetchers.submit(self._fetch, document_id)] = document_id
+
+            fill()
+            while fetching or analysing:
+                done, _ = wait(
+                    list(fetching) + list(analysing), return_when=FIRST_COMPLETED
+                )
+                for future in done:
+                    if future in fetching:
+                        document_id = fetching.pop(future)
+                        try:
+                            payload, fetch_seconds, failure = future.result()
+                        except Exception as e:
+                            payload, fetch_seconds = None, 0.0
+                            failure = {"error": f"{type(e).__name__}: {e}"}
+
+                        if payload is None:
+                            self._write(
+                                output,
+                                {"source": document_id, **failure},
+                                fetch_seconds,
+                            )
+                            continue
+
+                        analysing[
+                            workers.submit(
+                                analyse,
+                                document_id,
+                                payload,
+                                self.count_emoji,
+                                self.first_table_only,
+                            )
+                        ] = fetch_seconds
+                    else:
+                        fetch_seconds = analysing.pop(future)
+                        self._write(output, future.result(), fetch_seconds)
+                fill()
+
+        self.elapsed = time.perf_counter() - started
+        return self.results
+
+    def run_directory(self, directory: str) -> list[dict]:
+        """Analyse saved JSON exports from a directory, no credentials needed."""
+        paths = sorted(
+            os.path.join(directory, name)
+            for name in os.listdir(directory)
+            if name.endswith(".json")
+        )
+
+        started = time.perf_counter()
+        with ProcessPoolExecutor(self.processes) as workers, open(
+            self.output_path, "w", encoding="utf-8"
+        ) as output:
+            futures = [
+                workers.submit(
+                    analyse, path, None, self.count_emoji, self.first_table_only
+                )
+                for path in paths
+            ]
+            for future in futures:
+                self._write(output, future.result(), 0.0)
+
+        self.elapsed = time.perf_counter() - started
+        return self.results
+
+    def _write(self, output: io.TextIOBase, result: dict, fetch_seconds: float) -> None:
+        result["fetch_seconds"] = fetch_seconds
+        result["latency_seconds"] = fetch_seconds + result.get("analyse_seconds", 0.0)
+        output.write(json.dumps(result, ensure_ascii=False) + "\n")
+        self.results.append(result)
+
+    def summary(self) -> dict:
+        """Throughput and per-document latency of the last run."""
+        succeeded = [result for result in self.results if "error" not in result]
+        latencies = [result["latency_seconds"] for result in succeeded]
+        total_bytes = sum(result["bytes"] for result in succeeded)
+        elapsed = self.elapsed or 1e-9
+
+        return {
+            "documents": len(self.results),
+            "errors": len(self.results) - len(succeeded),
+            "error_statuses": dict(
+                Counter(
+                    result.get("status") for result in self.results if "error" in result
+                )
+            ),
+            "seconds": self.elapsed,
+            "docs_per_second": len(succeeded) / elapsed,
+            "bytes_per_second": total_bytes / elapsed,
+            "p50_latency_seconds": percentile(latencies, 50),
+            "p95_latency_seconds": percentile(latencies, 95),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Пакетный анализ документов")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--ids", nargs="+", help="URL или ID документов")
+    source.add_argument(
+        "--ids-file", help="файл со списком URL или ID, по одному в строке"
+    )
+    source.add_argument("--dir", help="каталог с сохранёнными JSON документов")
+    parser.add_argument("--output", default="results.jsonl")
+    parser.add_argument("--credentials", default="credentials.json")
+    parser.add_argument("--fetch-workers", type=int, default=8)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument(
+        "--max-pending",
+        type=int,
+        default=None,
+        help="сколько документов одновременно загружается и анализируется",
+    )
+    parser.add_argument("--count-emoji", action="store_true")
+    parser.add_argument("--first-table-only", action="store_true")
+    args = parser.parse_args()
+
+    runner = BatchRunner(
+        args.output,
+        credentials_file=args.credentials,
+        fetch_workers=args.fetch_workers,
+        processes=args.processes,
+        max_pending=args.max_pending,
+        count_emoji=args.count_emoji,
+        first_table_only=args.first_table_only,
+    )
+
+    if args.dir:
+        runner.run_directory(args.dir)
+    else:
+        if args.ids_file:
+            with open(args.ids_file, encoding="utf-8") as f:
+                document_ids = [line.strip() for line in f if line.strip()]
+        else:
+            document_ids = args.ids
+        runner.run_ids(document_ids)
+
+    summary = runner.summary()
+    print(
+        f"Документов: {summary['documents']} (ошибок: {summary['errors']}) "
+        f"за {summary['seconds']:.2f} с"
+    )
+    print(
+        f"{summary['docs_per_second']:.1f} док/с, "
+        f"{summary['bytes_per_second'] / 2**20:.2f} МБ/с"
+    )
+    print(
+        f"Задержка на документ: p50 {summary['p50_latency_seconds'] * 1000:.1f} мс, "
+        f"p95 {summary['p95_latency_seconds'] * 1000:.1f} мс"
+    )
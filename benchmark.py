@@ -0,0 +1,431 @@
+import argparse
+import gc
+import io
+import json
+import os
+import random
+import re
+import string
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict
+from typing import Callable
+
+from docgen import DocSpec, generate_document
+from document import Document
+from emoji_counter import emoji_count
+from tokenizer import iter_words, split_words
+from vectorized import batch_metrics
+
+# Базовые замеры этапов, с которыми сравниваются тесты и CI
+BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json"
+)
+# Параметры документа базовых замеров
+BASELINE_SPEC = DocSpec(size=200_000)
+MIN_REPEAT = 3
+
+SAMPLE_WORDS = [
+    "Привет",
+    "мир",
+    "сцена",
+    "ИНТ.",
+    "КВАРТИРА",
+    "—",
+    "кто-то",
+    "2023–2024",
+    "hello,",
+    "world!",
+    "(ремарка)",
+    "“цитата”",
+    "50%",
+    "#тег",
+    "a/b",
+    "...",
+    "\t",
+    "\n",
+    "\n\n",
+]
+
+
+def generate_text(size: int, seed: int = 0) -> str:
+    """Generate mixed Cyrillic/Latin text of roughly `size` characters."""
+    rng = random.Random(seed)
+    words: list[str] = []
+    length = 0
+    while length < size:
+        word = rng.choice(SAMPLE_WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+def legacy_extract_words(text: str) -> list[str]:
+    # Прежняя реализация Document.extract_words для сравнения
+    words_with_spaces: str = re.sub(r"\n+", " ", text)
+    words_list: list[str] = (
+        words_with_spaces.strip()
+        .replace(",", " ")
+        .replace(".", " ")
+        .replace(":", " ")
+        .replace("#", " ")
+        .replace(">", " ")
+        .replace("<", " ")
+        .replace("(", " ")
+        .replace(")", " ")
+        .replace("[", " ")
+        .replace("]", " ")
+        .replace("\\", " ")
+        .replace("|", " ")
+        .replace("/", " ")
+        .replace("?", " ")
+        .replace("\x0b", " ")
+        .replace("—", " ")
+        .replace("–", "")
+        .replace("-", "")
+        .replace("=", " ")
+        .replace("”", " ")
+        .replace("“", " ")
+        .replace("!", " ")
+        .replace("%", " ")
+        .replace("\t", " ")
+        .split(" ")
+    )
+    return [
+        word
+        for word in words_list
+        if any(char not in string.punctuation for char in word) and not word.isspace()
+    ]
+
+
+def chunked(text: str, size: int) -> list[str]:
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+def measure(func: Callable[[], object], repeat: int, number: int = 1) -> float:
+    """Return the best wall time of one call over `repeat` runs in seconds.
+
+    Each run makes `number` calls, so that very fast stages are measurable.
+    """
+    best = float("inf")
+    # Как и timeit, сборщик мусора отключается: его паузы дают основной шум
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            best = min(best, (time.perf_counter() - start) / number)
+    finally:
+        if enabled:
+            gc.enable()
+    return best
+
+
+def bench_tokenizer(size: int, repeat: int) -> None:
+    text = generate_text(size)
+    chunks = chunked(text, 4096)
+
+    expected = legacy_extract_words(text)
+    if split_words(text) != expected or list(iter_words(chunks)) != expected:
+        raise AssertionError("Tokenizer output differs from the legacy implementation")
+
+    results = {
+        "legacy": measure(lambda: legacy_extract_words(text), repeat),
+        "split_words": measure(lambda: split_words(text), repeat),
+        "iter_words": measure(lambda: sum(1 for _ in iter_words(chunks)), repeat),
+    }
+
+    megabytes = len(text.encode("utf-8")) / 2**20
+    print(f"tokenizer: {len(text)} chars ({megabytes:.1f} MB), {len(expected)} words")
+    for name, seconds in results.items():
+        speedup = results["legacy"] / seconds
+        print(f"  {name:<12} {seconds * 1000:9.1f} ms  x{speedup:.1f}")
+
+
+def measure_peak(func: Callable[[], object]) -> tuple[object, int, int]:
+    """Run `func` and return its result, peak and retained traced memory."""
+    tracemalloc.start()
+    try:
+        result = func()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak, retained
+
+
+def bench_memory(size: int) -> None:
+    document = generate_document(DocSpec(size=size))
+    with tempfile.NamedTemporaryFile(
+        "w", suffix=".json", encoding="utf-8", delete=False
+    ) as f:
+        json.dump(document, f, ensure_ascii=False)
+        path = f.name
+    del document
+
+    def load_full() -> Document:
+        with open(path, encoding="utf-8") as f:
+            doc = Document(json.load(f), count_emoji=True)
+        doc.metrics()
+        doc.text_without_spaces
+        return doc
+
+    try:
+        results = {
+            "full": measure_peak(load_full),
+            "compact": measure_peak(
+                lambda: Document.from_path(path, count_emoji=True, compact=True)
+            ),
+        }
+        megabytes = os.path.getsize(path) / 2**20
+    finally:
+        os.remove(path)
+
+    expected = results["full"][0].metrics()
+    if results["compact"][0].metrics() != expected:
+        raise AssertionError("Compact mode metrics differ from the full document")
+
+    print(f"memory: {megabytes:.1f} MB of JSON, {expected['word_count']} words")
+    full_peak = results["full"][1]
+    for name, (_, peak, retained) in results.items():
+        print(
+            f"  {name:<12} peak {peak / 2**20:7.1f} MB  "
+            f"retained {retained / 2**20:7.1f} MB  x{full_peak / peak:.1f}"
+        )
+
+
+def bench_batch(counts: list[int], repeat: int) -> None:
+    for count in counts:
+        # Обход JSON одинаков для обоих способов, поэтому текст извлекается заранее
+        documents = [
+            Document(
+                generate_document(
+                    DocSpec(size=1000, seed=seed, images=1, headers=False)
+                )
+            )
+            for seed in range(count)
+        ]
+        for doc in documents:
+            doc.raw_content
+            doc.image_count
+
+        def loop() -> list[tuple[int, int, int]]:
+            results = []
+            for doc in documents:
+                doc.invalidate(
+                    "word_list", "total_characters", "characters_without_spaces"
+                )
+                results.append(
+                    (
+                        doc.word_count,
+                        doc.total_characters,
+                        doc.characters_without_spaces,
+                    )
+                )
+            return results
+
+        def vectorized() -> list[tuple[int, int, int]]:
+            table = batch_metrics(documents)
+            return list(
+                zip(
+                    table["word_count"].tolist(),
+                    table["total_characters"].tolist(),
+                    table["characters_without_spaces"].tolist(),
+                )
+            )
+
+        if vectorized() != loop():
+            raise AssertionError("Vectorized metrics differ from the Document loop")
+
+        results = {
+            "loop": measure(loop, repeat),
+            "vectorized": measure(vectorized, repeat),
+        }
+        print(f"batch: {count} documents")
+        for name, seconds in results.items():
+            speedup = results["loop"] / seconds
+            print(f"  {name:<12} {seconds * 1000:9.1f} ms  x{speedup:.1f}")
+
+
+def document_stages(json_data: dict) -> dict[str, tuple[Callable[[], object], int]]:
+    """Stages of the Document pipeline with the number of calls per run."""
+    payload = json.dumps(json_data, ensure_ascii=False).encode("utf-8")
+    doc = Document(json_data, count_emoji=True)
+    plain_text = doc.plain_text
+
+    return {
+        # Конструктор ленивый: без metrics() замерялось бы пустое создание объекта
+        "init": (lambda: Document(json_data, count_emoji=True).metrics(), 1),
+        "extract_text": (lambda: doc.extract_text_content_recursive(doc.data), 1),
+        "extract_words": (doc.extract_words, 1),
+        "find_urls": (doc.find_urls, 1),
+        "find_tables": (doc.find_tables, 1),
+        "find_images": (doc.find_images, 1),
+        "emoji_count": (lambda: emoji_count(plain_text), 1),
+        "stream_metrics": (
+            lambda: Document.from_stream(io.BytesIO(payload), count_emoji=True),
+            1,
+        ),
+    }
+
+
+def calibrate(repeat: int) -> float:
+    """Time a fixed pure-Python workload to scale timings between machines."""
+    text = generate_text(200_000, seed=1)
+    return measure(lambda: legacy_extract_words(text), repeat)
+
+
+def bench_stages(spec: DocSpec, repeat: int) -> dict[str, float]:
+    json_data = generate_document(spec)
+    results = {
+        name: measure(func, repeat, number)
+        for name, (func, number) in document_stages(json_data).items()
+    }
+
+    print(f"stages: {spec}")
+    for name, seconds in results.items():
+        print(f"  {name:<16} {seconds * 1000:9.3f} ms")
+    return results
+
+
+def save_baseline(
+    path: str,
+    spec: DocSpec,
+    results: dict[str, float],
+    calibration: float,
+    repeat: int,
+) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "spec": asdict(spec),
+                "repeat": repeat,
+                "calibration": calibration,
+                "stages": results,
+            },
+            f,
+            indent=4,
+        )
+        f.write("\n")
+
+
+def compare_baseline(
+    baseline: dict,
+    spec: DocSpec,
+    results: dict[str, float],
+    threshold: float,
+    calibration: float,
+    repeat: int,
+) -> list[str]:
+    """Return the stages that got slower than the baseline by over `threshold`.
+
+    Timings are compared relative to the calibration workload of each run,
+    so a baseline taken on another machine stays meaningful.
+    """
+    if baseline["spec"] != asdict(spec):
+        raise ValueError("Базовые замеры сняты на документе с другими параметрами")
+    if repeat < MIN_REPEAT:
+        # Единичный замер слишком шумный: лучший из нескольких устойчивее
+        raise ValueError(f"Для сравнения нужно не меньше {MIN_REPEAT} повторов")
+
+    scale = calibration / baseline["calibration"]
+    regressions = []
+    for name, seconds in results.items():
+        expected = baseline["stages"].get(name)
+        if expected is None:
+            continue
+        change = seconds / (expected * scale) - 1
+        mark = "РЕГРЕССИЯ" if change > threshold else ""
+        print(f"  {name:<16} {change:+8.1%} {mark}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks for the Document pipeline")
+    parser.add_argument(
+        "--size", type=int, default=4_000_000, help="text size in chars"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--doc-size",
+        type=int,
+        default=BASELINE_SPEC.size,
+        help="document text size in chars",
+    )
+    parser.add_argument(
+        "--batch",
+        type=int,
+        nargs="*",
+        default=[1000, 10000],
+        help="numbers of documents for the batch benchmark",
+    )
+    parser.add_argument(
+        "--bench",
+        nargs="+",
+        choices=["tokenizer", "memory", "batch", "stages"],
+        default=["tokenizer", "memory", "batch", "stages"],
+    )
+    parser.add_argument("--seed", type=int, default=BASELINE_SPEC.seed)
+    parser.add_argument("--table-depth", type=int, default=BASELINE_SPEC.table_depth)
+    parser.add_argument("--images", type=int, default=BASELINE_SPEC.images)
+    parser.add_argument(
+        "--emoji-density", type=float, default=BASELINE_SPEC.emoji_density
+    )
+    parser.add_argument(
+        "--cyrillic-ratio", type=float, default=BASELINE_SPEC.cyrillic_ratio
+    )
+    parser.add_argument("--save-baseline", help="сохранить замеры этапов в файл")
+    parser.add_argument(
+        "--baseline",
+        help="сравнить замеры этапов с файлом; документ берётся из его параметров",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="допустимое замедление этапа относительно базовых замеров",
+    )
+    args = parser.parse_args()
+    if (args.baseline or args.save_baseline) and args.repeat < MIN_REPEAT:
+        parser.error(f"для базовых замеров нужно --repeat {MIN_REPEAT} или больше")
+
+    if "tokenizer" in args.bench:
+        bench_tokenizer(args.size, args.repeat)
+    if "memory" in args.bench:
+        bench_memory(args.doc_size)
+    if "batch" in args.bench:
+        bench_batch(args.batch, args.repeat)
+    if "stages" in args.bench:
+        baseline = None
+        if args.baseline:
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)
+            # Сравнивать имеет смысл только на том же документе
+            spec = DocSpec(**baseline["spec"])
+        else:
+            spec = DocSpec(
+                size=args.doc_size,
+                seed=args.seed,
+                table_depth=args.table_depth,
+                images=args.images,
+                emoji_density=args.emoji_density,
+                cyrillic_ratio=args.cyrillic_ratio,
+            )
+        results = bench_stages(spec, args.repeat)
+        calibration = calibrate(args.repeat)
+
+        if args.save_baseline:
+            save_baseline(args.save_baseline, spec, results, calibration, args.repeat)
+
+        if baseline is not None:
+            regressions = compare_baseline(
+                baseline, spec, results, args.threshold, calibration, args.repeat
+            )
+            if regressions:
+                print(f"Замедлились этапы: {', '.join(regressions)}")
+                sys.exit(1)
@@ -0,0 +1,214 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Union
+
+from document import Document
+from googleapi import GoogleAPI
+
+
+class MemoryCache:
+    """In-memory LRU store limited by the total size of its entries."""
+
+    def __init__(self, max_bytes: int = 256 * 2**20) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[str, tuple[Any, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: str, value: Any, size: int) -> None:
+        with self._lock:
+            self._pop(key)
+            if size > self.max_bytes:
+                return
+
+            self._entries[key] = (value, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._pop(key)
+
+    def _pop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+
+class DiskCache:
+    """On-disk store keeping one JSON file per key.
+
+    The files are limited by their total size on disk: after a write the
+    least recently used ones are removed until at most `max_bytes` remain.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 2**30) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        name = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{name}.json")
+
+    def get(self, key: str) -> Any:
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                value = json.load(f)
+            # Время изменения файла служит временем последнего обращения
+            os.utime(path)
+            return value
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def set(self, key: str, value: Any, size: int) -> None:
+        path = self._path(key)
+        # Запись во временный файл и замена, чтобы не оставить файл наполовину
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+        self._evict()
+
+    def _evict(self) -> None:
+        # Размер считается по самим файлам: их могут писать и другие процессы
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class DocumentCache:
+    """Cache of document JSON and computed metrics keyed by revision.
+
+    Before serving a cached entry, a cheap field-masked request checks the
+    document's current `revisionId`; the full document is downloaded and
+    analysed again only when the revision has changed. Stored entries are
+    never modified and callers get copies, so threads may share the cache.
+    """
+
+    def __init__(
+        self,
+        google_api: GoogleAPI,
+        backend: Union[MemoryCache, DiskCache, None] = None,
+    ) -> None:
+        self.google_api = google_api
+        self.backend = backend if backend is not None else MemoryCache()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self) -> dict:
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+        }
+
+    def invalidate(self, file_id: str) -> None:
+        """Drop everything cached for a document."""
+        self.backend.delete(self.google_api.extract_file_id_from_url(file_id))
+
+    def _entry(self, file_id: str) -> Union[dict, None]:
+        """Return a cache entry matching the current revision of the document."""
+        file_id = self.google_api.extract_file_id_from_url(file_id)
+        revision_id = self.google_api.get_revision_id(file_id)
+
+        entry = self.backend.get(file_id)
+        if entry is not None and revision_id and entry["revisionId"] == revision_id:
+            self._count(hit=True)
+            return entry
+
+        self._count(hit=False)
+        payload = self.google_api.get_document_bytes(file_id)
+        if payload is None:
+            return None
+
+        document = json.loads(payload)
+        entry = {
+            "revisionId": document.get("revisionId"),
+            "document": document,
+            "metrics": {},
+            # Размер документа известен по ответу и не пересчитывается
+            "size": len(payload),
+        }
+        self._store(file_id, entry)
+        return entry
+
+    def _store(self, file_id: str, entry: dict) -> None:
+        if entry["revisionId"]:
+            size = entry.get("size", 0) + sum(
+                len(options) + len(json.dumps(metrics))
+                for options, metrics in entry["metrics"].items()
+            )
+            self.backend.set(file_id, entry, size)
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get_document(self, file_id: str) -> Union[dict, None]:
+        """Get the content of a document, downloading it only on a new revision."""
+        entry = self._entry(file_id)
+        return copy.deepcopy(entry["document"]) if entry else None
+
+    def get_metrics(
+        self, file_id: str, count_emoji=False, first_table_only=False
+    ) -> Union[dict, None]:
+        """Get `Document.metrics()`, analysing the document only on a new revision."""
+        entry = self._entry(file_id)
+        if entry is None:
+            return None
+
+        options = f"count_emoji={count_emoji},first_table_only={first_table_only}"
+        metrics = entry["metrics"].get(options)
+        if metrics is None:
+            metrics = Document(
+                entry["document"],
+                count_emoji=count_emoji,
+                first_table_only=first_table_only,
+            ).metrics()
+            # Новая запись вместо изменения той, что могут читать другие потоки
+            entry = dict(entry, metrics={**entry["metrics"], options: metrics})
+            self._store(self.google_api.extract_file_id_from_url(file_id), entry)
+
+        return copy.deepcopy(metrics)
@@ -0,0 +1,104 @@
+from array import array
+from typing import Iterator, Union
+
+from stats import TextStats
+
+# Типы текстовых фрагментов
+RUN_TEXT = 0
+RUN_TABLE = 1
+
+# Сколько символов фрагментов копится перед дописыванием в буфер
+FLUSH_SIZE = 1 << 16
+
+
+class ImageRecord:
+    __slots__ = ("object_id", "offset")
+
+    def __init__(self, object_id: str, offset: int) -> None:
+        self.object_id = object_id
+        self.offset = offset
+
+
+class LinkRecord:
+    __slots__ = ("url", "offset", "length")
+
+    def __init__(self, url: str, offset: int, length: int) -> None:
+        self.url = url
+        self.offset = offset
+        self.length = length
+
+
+class CompactText:
+    """Text runs of a document stored once in a single contiguous string.
+
+    Every run is described by its offset, length and type in `array`
+    columns; images and links are small records pointing into the buffer.
+    Metrics are counted run by run, so no other copy of the text is built.
+    Runs are appended to the buffer in blocks while they arrive, so at no
+    point the buffer and the list of runs both hold the whole text.
+    """
+
+    def __init__(self) -> None:
+        self.buffer = ""
+        self.offsets = array("I")
+        self.lengths = array("I")
+        self.types = array("B")
+        self.images: list[ImageRecord] = []
+        self.links: list[LinkRecord] = []
+
+        self._parts: list[str] = []
+        self._pending = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def append(self, run: str, run_type: int = RUN_TEXT) -> None:
+        self.offsets.append(self._size)
+        self.lengths.append(len(run))
+        self.types.append(run_type)
+        self._parts.append(run)
+        self._pending += len(run)
+        self._size += len(run)
+        if self._pending >= FLUSH_SIZE:
+            self._flush()
+
+    def add_image(self, object_id: str) -> None:
+        self.images.append(ImageRecord(object_id, self._size))
+
+    def add_link(self, url: str) -> None:
+        # Ссылка хранится в стиле текстового фрагмента, идущем после его текста
+        if self.offsets:
+            self.links.append(LinkRecord(url, self.offsets[-1], self.lengths[-1]))
+        else:
+            self.links.append(LinkRecord(url, 0, 0))
+
+    def _flush(self) -> None:
+        # Единственная ссылка на строку позволяет CPython дописать её на месте
+        # вместо копирования всего буфера
+        buffer = self.buffer
+        self.buffer = ""
+        buffer += "".join(self._parts)
+        self.buffer = buffer
+        self._parts = []
+        self._pending = 0
+
+    def close(self) -> "CompactText":
+        self._flush()
+        return self
+
+    def run(self, index: int) -> str:
+        offset = self.offsets[index]
+        return self.buffer[offset : offset + self.lengths[index]]
+
+    def runs(self, run_type: Union[int, None] = None) -> Iterator[str]:
+        buffer = self.buffer
+        for offset, length, current_type in zip(self.offsets, self.lengths, self.types):
+            if run_type is None or current_type == run_type:
+                yield buffer[offset : offset + length]
+
+    def stats(self, count_emoji: bool = False) -> TextStats:
+        stats = TextStats(count_emoji)
+        for run in self.runs():
+            stats.feed(run)
+        return stats.close()
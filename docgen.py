@@ -0,0 +1,336 @@
+import argparse
+import json
+import random
+from dataclasses import asdict, dataclass
+
+CYRILLIC_WORDS = [
+    "сцена",
+    "квартира",
+    "ночь",
+    "день",
+    "Анна",
+    "Пётр",
+    "смотрит",
+    "говорит",
+    "молчит",
+    "окно",
+    "дверь",
+    "кто-то",
+    "что-нибудь",
+    "ИНТ.",
+    "НАТ.",
+    "(шёпотом)",
+    "«да»",
+]
+LATIN_WORDS = [
+    "scene",
+    "room",
+    "night",
+    "Anna",
+    "looks",
+    "says",
+    "window",
+    "door",
+    "self-made",
+    "INT.",
+    "EXT.",
+    "(beat)",
+    "OK",
+]
+PUNCTUATION = [",", ".", ":", "!", "?", " —", "…", ";", "%"]
+# Одиночные эмодзи и последовательности: флаги, оттенки кожи, ZWJ и клавиши
+EMOJI = [
+    "😀",
+    "🎬",
+    "❤️",
+    "👍🏽",
+    "🇷🇺",
+    "👨‍👩‍👧",
+    "#️⃣",
+    "🏳️‍🌈",
+    "✨",
+    "🙂",
+]
+FONTS = ["Arial", "Courier New", "Times New Roman", "Roboto"]
+
+
+def _length(text: str) -> int:
+    # Индексы Docs считаются в кодовых единицах UTF-16
+    return len(text.encode("utf-16-le")) // 2
+
+
+@dataclass
+class DocSpec:
+    """Parameters of a generated document."""
+
+    # Примерный объём текста в символах
+    size: int = 100_000
+    seed: int = 0
+    # Доля абзацев, заменённых таблицей, и глубина вложенных таблиц
+    table_ratio: float = 0.05
+    table_depth: int = 1
+    table_rows: int = 3
+    table_columns: int = 2
+    images: int = 10
+    # Доля слов, после которых стоит эмодзи
+    emoji_density: float = 0.01
+    # Доля кириллических слов, остальные латинские
+    cyrillic_ratio: float = 0.8
+    link_ratio: float = 0.02
+    headers: bool = True
+
+    def __post_init__(self) -> None:
+        if self.size < 0:
+            raise ValueError(
+                f"Объём документа не может быть отрицательным: {self.size}"
+            )
+
+
+class _Generator:
+    def __init__(self, spec: DocSpec) -> None:
+        self.spec = spec
+        self.rng = random.Random(spec.seed)
+        self.index = 1
+        self.length = 0
+        self.inline_objects: dict[str, dict] = {}
+        self.images_left = spec.images
+
+    def sentence(self) -> str:
+        rng = self.rng
+        words = []
+        for _ in range(rng.randint(3, 14)):
+            vocabulary = (
+                CYRILLIC_WORDS
+                if rng.random() < self.spec.cyrillic_ratio
+                else LATIN_WORDS
+            )
+            word = rng.choice(vocabulary)
+            if rng.random() < 0.15:
+                word += rng.choice(PUNCTUATION)
+            if rng.random() < self.spec.emoji_density:
+                word += " " + rng.choice(EMOJI)
+            words.append(word)
+        sentence = " ".join(words)
+        return sentence[:1].upper() + sentence[1:] + rng.choice([".", "!", "?", "…"])
+
+    def text_style(self) -> dict:
+        rng = self.rng
+        style: dict = {}
+        if rng.random() < 0.3:
+            style["bold"] = True
+        if rng.random() < 0.2:
+            style["italic"] = True
+        if rng.random() < 0.5:
+            style["weightedFontFamily"] = {
+                "fontFamily": rng.choice(FONTS),
+                "weight": 400,
+            }
+            style["fontSize"] = {
+                "magnitude": rng.choice([10, 11, 12, 14]),
+                "unit": "PT",
+            }
+        if rng.random() < self.spec.link_ratio:
+            style["link"] = {"url": f"https://example.com/page/{rng.randint(1, 10**6)}"}
+        return style
+
+    def image(self) -> dict:
+        object_id = f"kix.image{len(self.inline_objects)}"
+        self.inline_objects[object_id] = {
+            "objectId": object_id,
+            "inlineObjectProperties": {
+                "embeddedObject": {
+                    "imageProperties": {
+                        "contentUri": f"https://lh3.googleusercontent.com/{object_id}",
+                        "cropProperties": {},
+                    },
+                    "size": {
+                        "height": {"magnitude": 200, "unit": "PT"},
+                        "width": {"magnitude": 300, "unit": "PT"},
+                    },
+                }
+            },
+        }
+        element = {
+            "startIndex": self.index,
+            "endIndex": self.index + 1,
+            "inlineObjectElement": {"inlineObjectId": object_id, "textStyle": {}},
+        }
+        self.index += 1
+        return element
+
+    def paragraph(self) -> dict:
+        rng = self.rng
+        start = self.index
+        elements = []
+        text = " ".join(self.sentence() for _ in range(rng.randint(1, 4))) + "\n"
+        self.length += len(text)
+
+        # Абзац делится на несколько фрагментов с разным стилем
+        while text:
+            cut = len(text) if rng.random() < 0.5 else rng.randint(1, len(text))
+            run, text = text[:cut], text[cut:]
+            elements.append(
+                {
+                    "startIndex": self.index,
+                    "endIndex": self.index + _length(run),
+                    "textRun": {"content": run, "textStyle": self.text_style()},
+                }
+            )
+            self.index += _length(run)
+            # Изображение стоит внутри абзаца, а не после его перевода строки
+            if text and self.images_left and rng.random() < 0.05:
+                self.images_left -= 1
+                elements.append(self.image())
+
+        return {
+            "startIndex": start,
+            "endIndex": self.index,
+            "paragraph": {
+                "elements": elements,
+                "paragraphStyle": {
+                    "namedStyleType": "NORMAL_TEXT",
+                    "direction": "LEFT_TO_RIGHT",
+                    "lineSpacing": 115,
+                },
+            },
+        }
+
+    def table(self, depth: int) -> dict:
+        start = self.index
+        self.index += 1
+        rows = []
+        for _ in range(self.spec.table_rows):
+            # Начало строки и начало каждой ячейки занимают по одному индексу
+            row_start = self.index
+            self.index += 1
+            cells = []
+            for _ in range(self.spec.table_columns):
+                cell_start = self.index
+                self.index += 1
+                content = [self.paragraph()]
+                if depth > 1 and self.rng.random() < 0.3:
+                    content.append(self.table(depth - 1))
+                    content.append(self.paragraph())
+                cells.append(
+                    {
+                        "startIndex": cell_start,
+                        "endIndex": self.index,
+                        "content": content,
+                        "tableCellStyle": {
+                            "rowSpan": 1,
+                            "columnSpan": 1,
+                            "contentAlignment": "TOP",
+                        },
+                    }
+                )
+            rows.append(
+                {
+                    "startIndex": row_start,
+                    "endIndex": self.index,
+                    "tableCells": cells,
+                    "tableRowStyle": {"minRowHeight": {}},
+                }
+            )
+        self.index += 1
+        return {
+            "startIndex": start,
+            "endIndex": self.index,
+            "table": {
+                "rows": self.spec.table_rows,
+                "columns": self.spec.table_columns,
+                "tableRows": rows,
+                "tableStyle": {"tableColumnProperties": []},
+            },
+        }
+
+    def segment(self, size: int) -> list[dict]:
+        content: list[dict] = []
+        target = self.length + size
+        # Даже пустой сегмент, как в Docs, состоит из одного абзаца
+        while not content or self.length < target:
+            # Как в Docs, перед таблицей и после неё всегда есть абзац
+            if (
+                content
+                and "paragraph" in content[-1]
+                and self.spec.table_depth
+                and self.rng.random() < self.spec.table_ratio
+            ):
+                content.append(self.table(self.spec.table_depth))
+            else:
+                content.append(self.paragraph())
+        if "table" in content[-1]:
+            content.append(self.paragraph())
+        return content
+
+    def document(self) -> dict:
+        spec = self.spec
+        document: dict = {
+            "title": f"Сценарий {spec.seed}",
+            "documentId": f"generated-{spec.seed}",
+            "revisionId": f"revision-{spec.seed}",
+            "body": {"content": self.segment(spec.size)},
+        }
+        if spec.headers:
+            # У колонтитулов свой отсчёт индексов, начиная с нуля
+            body_end = self.index
+            self.index = 0
+            document["headers"] = {"kix.header": {"content": self.segment(1)}}
+            self.index = 0
+            document["footers"] = {"kix.footer": {"content": self.segment(1)}}
+            self.index = body_end
+
+        # Оставшиеся изображения добавляются в конец, чтобы их число было точным
+        while self.images_left:
+            self.images_left -= 1
+            image = self.image()
+            paragraph = self.paragraph()
+            paragraph["startIndex"] = image["startIndex"]
+            paragraph["paragraph"]["elements"].insert(0, image)
+            document["body"]["content"].append(paragraph)
+
+        document["inlineObjects"] = self.inline_objects
+        document["documentStyle"] = {
+            "pageSize": {
+                "height": {"magnitude": 841.89, "unit": "PT"},
+                "width": {"magnitude": 595.28, "unit": "PT"},
+            },
+            "marginTop": {"magnitude": 72, "unit": "PT"},
+        }
+        document["namedStyles"] = {
+            "styles": [
+                {
+                    "namedStyleType": name,
+                    "textStyle": {"fontSize": {"magnitude": 11, "unit": "PT"}},
+                }
+                for name in ("NORMAL_TEXT", "HEADING_1", "HEADING_2", "TITLE")
+            ]
+        }
+        return document
+
+
+def generate_document(spec: DocSpec) -> dict:
+    """Generate a realistic Google Docs JSON document, the same for the same spec.
+
+    Paragraphs are split into styled text runs, tables may be nested up to
+    `table_depth`, and the document has exactly `images` inline objects.
+    """
+    return _Generator(spec).document()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Генератор JSON документов Google Docs"
+    )
+    for name, default in asdict(DocSpec()).items():
+        option = "--" + name.replace("_", "-")
+        if isinstance(default, bool):
+            parser.add_argument(option, action=argparse.BooleanOptionalAction)
+        else:
+            parser.add_argument(option, type=type(default), default=default)
+    parser.add_argument("--output", default="generated.json")
+    args = vars(parser.parse_args())
+    output = args.pop("output")
+    spec = DocSpec(**{name: value for name, value in args.items() if value is not None})
+
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(generate_document(spec), f, ensure_ascii=False)
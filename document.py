@@ -1,155 +1,332 @@
 import json
-import re
-import string
+from functools import cached_property
+from typing import IO, Union
 
-import emoji
 from icecream import ic
 
+from compact import CompactText
+from emoji_counter import emoji_count
+from incremental import ElementMetrics, content_key, element_totals, measure_element
+from instrumentation import instrumentation, timed
+from links import Link, collect_links, normalize_url
+from stream import scan_stream
+from table_index import TableIndex, TableMetrics
+from tokenizer import split_words
+from walker import DocumentWalk, walk, walk_structure
+
 
 class Document:
-    def __init__(self, json_data, count_emoji=False, first_table_only=False) -> None:
+    # Таблица и строка, которые считаются в режиме first_table_only
+    FIRST_TABLE = 0
+    FIRST_ROW = 1
+
+    # Зависимости ленивых метрик: метрика вычисляется только при первом обращении,
+    # а сброс метрики через invalidate() сбрасывает и все зависящие от неё
+    DEPENDENCIES: dict[str, tuple[str, ...]] = {
+        "data": (),
+        "_walked": ("data",),
+        "tables": ("_walked",),
+        "table_index": ("tables",),
+        "_first_row": ("table_index",),
+        "images": ("_walked",),
+        "urls": ("_walked", "_first_row"),
+        "table_count": ("tables",),
+        "image_count": ("images", "_first_row"),
+        "raw_content": ("_walked", "_first_row"),
+        "plain_text": ("raw_content",),
+        "text_without_spaces": ("plain_text",),
+        "count_emoji": ("plain_text", "_first_row"),
+        "total_characters": ("raw_content", "image_count", "count_emoji"),
+        "characters_without_spaces": (
+            "raw_content",
+            "image_count",
+            "count_emoji",
+        ),
+        "word_list": ("raw_content",),
+        "word_count": ("word_list", "_first_row"),
+        "element_metrics": ("data",),
+        "links": ("data",),
+    }
+
+    def __init__(
+        self, json_data, count_emoji=False, first_table_only=False, structural=False
+    ) -> None:
         self.json_data = json_data or {}
+        self.first_table_only = first_table_only
+        self._emoji_enabled = count_emoji
+        # Обход по схеме Docs пропускает стили, списки и прочие служебные блоки
+        self._walk = walk_structure if structural else walk
+        self.compact: Union[CompactText, None] = None
 
-        if first_table_only:
-            self.tables = self.find_tables()
-            self.data = self.tables[0]["tableRows"][1]
-            self.image_count = len(self.find_images())
+    def invalidate(self, *names: str) -> None:
+        """Drop cached metrics and everything that depends on them."""
+        pending = list(names or self.DEPENDENCIES)
+        seen: set[str] = set()
+        while pending:
+            name = pending.pop()
+            if name in seen:
+                continue
+            seen.add(name)
+            self.__dict__.pop(name, None)
+            pending.extend(
+                dependent
+                for dependent, requires in self.DEPENDENCIES.items()
+                if name in requires
+            )
 
-        else:
-            self.data = self.json_data.get("body", {}).get("content", None)
-            self.image_count = len(self.json_data.get("inlineObjects", []))
-
-        self.raw_content = self.extract_text_content_recursive(self.data)
-        self.plain_text = self.raw_content.replace("\n", "")
-        self.count_emoji = emoji.emoji_count(self.plain_text) if count_emoji else 0
-        self.total_characters = (
-            len(self.plain_text) + self.image_count + self.count_emoji
-        )
-        self.text_without_spaces = self.plain_text.replace(" ", "")
-        self.characters_without_spaces = (
-            len(self.text_without_spaces) + self.image_count + self.count_emoji
-        )
-        self.word_list = self.extract_words()
-        self.word_count = len(self.word_list)
-        self.urls = self.find_urls()
+    def update(self, json_data) -> int:
+        """Switch to a new revision, recounting only the changed elements.
 
-    def extract_text_content_recursive(self, element) -> str:
-        content_list = []
+        Top-level structural elements whose content is unchanged, even if
+        shifted to other indices, keep their metric contributions. Returns
+        the number of elements that had to be measured again.
+        """
+        previous: dict[tuple, list[ElementMetrics]] = {}
+        if not self.first_table_only:
+            for metrics in self.__dict__.get("element_metrics", []):
+                previous.setdefault(metrics.key, []).append(metrics)
 
-        if (
-            isinstance(element, dict)
-            and "content" in element
-            and isinstance(element["content"], str)
-        ):
-            content_list.append(element["content"])
+        self.json_data = json_data or {}
+        self.invalidate()
+        if self.first_table_only:
+            return 0
 
-        if isinstance(element, (dict, list)):
-            for value in element.values() if isinstance(element, dict) else element:
-                content_list.extend(self.extract_text_content_recursive(value))
+        measured = 0
+        elements: list[ElementMetrics] = []
+        for element in self.data or []:
+            # Обход дешёвый, дорого только разбиение на слова и поиск эмодзи
+            walked = self._walk([element])
+            key = content_key(walked)
+            if reusable := previous.get(key):
+                metrics = reusable.pop()
+                metrics.start_index = element.get("startIndex", 0)
+                metrics.end_index = element.get("endIndex", 0)
+            else:
+                metrics = measure_element(element, walked, self._emoji_enabled)
+                measured += 1
+            elements.append(metrics)
+        self.element_metrics = elements
 
-        return "".join(content_list)
+        totals = element_totals(elements, self._emoji_enabled)
+        if totals is not None:
+            self.table_count = totals["table_count"]
+            self.urls = totals["urls"]
+            self.word_count = totals["word_count"]
+            self.count_emoji = totals["count_emoji"]
+            self.total_characters = (
+                totals["characters"] + self.image_count + self.count_emoji
+            )
+            self.characters_without_spaces = (
+                totals["characters_without_spaces"]
+                + self.image_count
+                + self.count_emoji
+            )
 
-    def extract_words(self) -> list[str]:
-        # Заменить повторяющиеся символы '\n' на одиночный символ '\n'
-        words_with_spaces: str = re.sub(r"\n+", " ", self.raw_content)
-
-        # Разделить текст на слова, заменяя определенные знаки пунктуации на пробелы
-        words_list: list[str] = (
-            words_with_spaces.strip()
-            .replace(",", " ")
-            .replace(".", " ")
-            .replace(":", " ")
-            .replace("#", " ")
-            .replace(">", " ")
-            .replace("<", " ")
-            .replace("(", " ")
-            .replace(")", " ")
-            .replace("[", " ")
-            .replace("]", " ")
-            .replace("\\", " ")
-            .replace("|", " ")
-            .replace("/", " ")
-            .replace("?", " ")
-            .replace("\x0b", " ")
-            .replace("—", " ")
-            .replace("–", "")
-            .replace("-", "")
-            .replace("=", " ")
-            .replace("”", " ")
-            .replace("“", " ")
-            .replace("!", " ")
-            .replace("%", " ")
-            .replace("	", " ")
-            .split(" ")
+        return measured
+
+    @classmethod
+    def from_stream(
+        cls,
+        fp: Union[IO[bytes], IO[str]],
+        count_emoji=False,
+        first_table_only=False,
+        compact=False,
+    ) -> "Document":
+        """Build a document from a Docs JSON file object without loading the tree.
+
+        Only the counters are available: `word_count`, `total_characters`,
+        `characters_without_spaces`, `count_emoji`, `image_count`,
+        `table_count` and `urls`. In `compact` mode the text runs, images and
+        links are also kept in `document.compact` and `raw_content` is
+        available, all with the text stored once.
+        """
+        compact_text = CompactText() if compact else None
+        with instrumentation.timer("document_stage_seconds", stage="stream"):
+            scan = scan_stream(fp, count_emoji, first_table_only, compact_text)
+        if first_table_only and not scan.data_found:
+            raise IndexError("В документе нет второй строки первой таблицы")
+
+        document = cls({}, count_emoji=count_emoji, first_table_only=first_table_only)
+        document.json_data = None
+        document.compact = compact_text
+        if compact_text is not None:
+            document.raw_content = compact_text.buffer
+
+        text = scan.text
+        image_count = scan.image_elements if first_table_only else scan.inline_objects
+        document.__dict__.update(
+            urls=scan.urls,
+            table_count=scan.table_count,
+            image_count=image_count,
+            count_emoji=text.emoji_count,
+            total_characters=text.characters + image_count + text.emoji_count,
+            characters_without_spaces=(
+                text.characters_without_spaces + image_count + text.emoji_count
+            ),
+            word_count=text.word_count,
         )
+        return document
+
+    @classmethod
+    def from_path(
+        cls, file_path: str, count_emoji=False, first_table_only=False, compact=False
+    ):
+        """Build a document from a saved Docs JSON file, see `from_stream`."""
+        with open(file_path, "rb") as f:
+            return cls.from_stream(f, count_emoji, first_table_only, compact)
+
+    @cached_property
+    def data(self):
+        if self.json_data is None:
+            raise ValueError("Документ загружен из потока, исходный JSON недоступен")
+        if self.first_table_only:
+            return self.tables[self.FIRST_TABLE]["tableRows"][self.FIRST_ROW]
+        return self.json_data.get("body", {}).get("content", None)
+
+    @cached_property
+    @timed("walk")
+    def _walked(self) -> DocumentWalk:
+        # Один проход по дереву вместо отдельного обхода для каждой метрики
+        return self._walk(self.data)
+
+    @cached_property
+    @timed("tables")
+    def tables(self) -> list[dict]:
+        if self.first_table_only:
+            return self.find_tables()
+        return self._walked.tables
+
+    @cached_property
+    @timed("table_index")
+    def table_index(self) -> TableIndex:
+        # Ячейки обходятся и метрики считаются только по мере запросов
+        return TableIndex(self.tables, self._walk, self._emoji_enabled)
+
+    @cached_property
+    def _first_row(self) -> TableMetrics:
+        return self.table_index.row(self.FIRST_TABLE, self.FIRST_ROW)
 
-        # Фильтровать слова, оставляя только те, которые не состоят из знаков пунктуации
+    @cached_property
+    def table_count(self) -> int:
+        return len(self.tables)
+
+    @cached_property
+    def images(self) -> list[dict]:
+        return self._walked.images
+
+    @cached_property
+    @timed("urls")
+    def urls(self) -> list[str]:
+        if self.first_table_only:
+            return self._first_row.urls
+        return self._walked.urls
+
+    @cached_property
+    @timed("links")
+    def links(self) -> list[Link]:
+        # Уникальные нормализованные ссылки с местами, где они встречаются
+        if self.first_table_only:
+            return collect_links(self.data, self.FIRST_ROW)
+        return collect_links(self.data)
+
+    @cached_property
+    def image_count(self) -> int:
+        if self.first_table_only:
+            return self._first_row.images
+        return len(self.json_data.get("inlineObjects", []))
+
+    @cached_property
+    def raw_content(self) -> str:
+        if self.first_table_only:
+            return self._first_row.text
+        return self._walked.text
+
+    @cached_property
+    def plain_text(self) -> str:
+        return self.raw_content.replace("\n", "")
+
+    @cached_property
+    def text_without_spaces(self) -> str:
+        return self.plain_text.replace(" ", "")
+
+    @cached_property
+    @timed("emoji")
+    def count_emoji(self) -> int:
+        if self.first_table_only:
+            return self._first_row.emoji
+        return emoji_count(self.plain_text) if self._emoji_enabled else 0
+
+    @cached_property
+    def total_characters(self) -> int:
+        # Длина считается без построения копии текста
+        characters = len(self.raw_content) - self.raw_content.count("\n")
+        return characters + self.image_count + self.count_emoji
+
+    @cached_property
+    def characters_without_spaces(self) -> int:
+        raw_content = self.raw_content
+        characters = len(raw_content) - raw_content.count("\n") - raw_content.count(" ")
+        return characters + self.image_count + self.count_emoji
+
+    @cached_property
+    def element_metrics(self) -> list[ElementMetrics]:
+        # Вклад каждого элемента верхнего уровня, см. update()
+        if self.first_table_only:
+            return []
         return [
-            word
-            for word in words_list
-            if any(char not in string.punctuation for char in word)
-            and not word.isspace()
+            measure_element(element, self._walk([element]), self._emoji_enabled)
+            for element in self.data or []
         ]
 
+    @cached_property
+    @timed("tokenize")
+    def word_list(self) -> list[str]:
+        return self.extract_words()
+
+    @cached_property
+    def word_count(self) -> int:
+        if self.first_table_only:
+            return self._first_row.words
+        return len(self.word_list)
+
+    def metrics(self) -> dict:
+        """Return the document counters as a JSON-serialisable dict."""
+        return {
+            "word_count": self.word_count,
+            "total_characters": self.total_characters,
+            "characters_without_spaces": self.characters_without_spaces,
+            "image_count": self.image_count,
+            "count_emoji": self.count_emoji,
+            "table_count": self.table_count,
+            "urls": self.urls,
+        }
+
+    def extract_text_content_recursive(self, element) -> str:
+        return self._walk(element).text
+
+    def extract_words(self) -> list[str]:
+        return split_words(self.raw_content)
+
     def find_urls(self) -> list[str]:
-        # Рекурсивный поиск всех URL в структуре данных
-        urls: list[str] = []
-
-        def extract_urls(element) -> None:
-            if isinstance(element, dict):
-                for key, value in element.items():
-                    if key == "url" and isinstance(value, str):
-                        urls.append(value)
-                    else:
-                        extract_urls(value)
-            elif isinstance(element, list):
-                for item in element:
-                    extract_urls(item)
-
-        extract_urls(self.data)
-        return urls
+        return self._walk(self.data).urls
 
     def save_json(self, file_path: str, json_data=None) -> None:
         with open(file_path, "w", encoding="utf-8") as f:
             json.dump(json_data or self.json_data, f, ensure_ascii=False, indent=4)
 
     def find_tables(self) -> list[dict]:
-        tables: list[dict] = []
-
-        def extract_tables(element) -> None:
-            if isinstance(element, dict):
-                for key, value in element.items():
-                    if key == "table" and isinstance(value, dict):
-                        tables.append(value)
-                    else:
-                        extract_tables(value)
-            elif isinstance(element, list):
-                for item in element:
-                    extract_tables(item)
-
-        extract_tables(self.json_data)
-        return tables
+        return self._walk(self.json_data).tables
 
     def get_rows_content(self, table: dict) -> list[str]:
-        rows = list(table["tableRows"])
-        return [self.extract_text_content_recursive(row) for row in rows]
+        try:
+            position = self.table_index.position(table)
+        except KeyError:
+            rows = list(table["tableRows"])
+            return [self.extract_text_content_recursive(row) for row in rows]
+        return [row.text for row in self.table_index.rows(position)]
 
     def find_images(self) -> list[dict]:
-        images: list[dict] = []
-
-        def extract_images(element) -> None:
-            if isinstance(element, dict):
-                for key, value in element.items():
-                    if key == "inlineObjectElement" and isinstance(value, dict):
-                        images.append(value)
-                    else:
-                        extract_images(value)
-            elif isinstance(element, list):
-                for item in element:
-                    extract_images(item)
-
-        extract_images(self.data)
-        return images
+        return self._walk(self.data).images
 
     def info(self) -> None:
         ic("Количество слов", self.word_count)
@@ -157,3 +334,8 @@ class Document:
         ic("Количество знаков без пробелов", self.characters_without_spaces)
         ic("Количество изображений", self.image_count)
         ic(len(self.urls), self.urls)
+        if self.json_data is not None:
+            ic("Уникальных ссылок", len(self.links))
+        else:
+            # У документа из потока нет дерева, но адреса ссылок собраны
+            ic("Уникальных ссылок", len({normalize_url(url) for url in self.urls}))
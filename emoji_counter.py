@@ -0,0 +1,101 @@
+import re
+
+import emoji
+
+
+def _candidate_pattern() -> "re.Pattern[str]":
+    # Все не-ASCII кодовые точки, встречающиеся в эмодзи: сами эмодзи, ZWJ,
+    # селекторы вариантов, модификаторы цвета кожи, флаги и теги. ASCII-символы
+    # бывают только первым символом эмодзи (#, * и цифры в keycap-последовательностях)
+    codepoints = sorted(
+        {ord(char) for key in emoji.EMOJI_DATA for char in key if ord(char) > 0x7F}
+    )
+
+    ranges: list[str] = []
+    start = previous = codepoints[0]
+    for codepoint in codepoints[1:] + [-1]:
+        if codepoint == previous + 1:
+            previous = codepoint
+            continue
+        ranges.append(
+            re.escape(chr(start))
+            if start == previous
+            else f"{re.escape(chr(start))}-{re.escape(chr(previous))}"
+        )
+        start = previous = codepoint
+
+    return re.compile(f"[{''.join(ranges)}]")
+
+
+_CANDIDATE_RE = _candidate_pattern()
+_CANDIDATE_RUN_RE = re.compile(f"{_CANDIDATE_RE.pattern}+")
+# Грубый надкласс кандидатов: поиск по нему в разы быстрее точного класса,
+# а кириллица, латиница и типографские знаки (—, «», “”) в него не попадают
+_COARSE_RE = re.compile("[\u00a9\u00ae\u200d\u203c-\u3299\ufe0f\U0001f000-\U000e007f]")
+
+
+def emoji_count(text: str) -> int:
+    """Return `emoji.emoji_count(text)`, passing only spans around candidates to it."""
+    count = 0
+    end = 0
+    for match in _COARSE_RE.finditer(text):
+        start = match.start()
+        if start < end or not _CANDIDATE_RE.match(text, start):
+            continue
+
+        # Серия кандидатов вместе с одним предшествующим символом
+        # (основа keycap-последовательности, например "#" в "#️⃣")
+        stop = _CANDIDATE_RUN_RE.match(text, start).end()
+        count += emoji.emoji_count(text[max(start - 1, end) : stop])
+        end = stop
+
+    return count
+
+
+def candidate_edges(text: str) -> tuple[str, str]:
+    """Return the leading candidate run and the trailing span of the text.
+
+    The trailing span is the last candidate run with its preceding character,
+    or just the last character when the text does not end with a candidate.
+    Joining one text's trailing span with the next text's leading run gives
+    the only span whose emoji can differ from counting the texts separately.
+    """
+    head_match = _CANDIDATE_RUN_RE.match(text)
+    head = head_match[0] if head_match else ""
+
+    cut = len(text)
+    while cut and _CANDIDATE_RE.match(text, cut - 1):
+        cut -= 1
+    return head, text[max(cut - 1, 0) :]
+
+
+class EmojiCounter:
+    """Incremental emoji counter fed with consecutive pieces of one text.
+
+    After `close()` the `count` equals `emoji_count` of the joined text: a
+    sequence split between two pieces is held back until it is complete.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self._carry = ""
+
+    def feed(self, text: str) -> None:
+        text = self._carry + text
+        if not text:
+            return
+
+        # Хвост из кандидатов может продолжиться в следующем фрагменте
+        cut = len(text)
+        while cut and _CANDIDATE_RE.match(text, cut - 1):
+            cut -= 1
+
+        split_at = max(cut - 1, 0)
+        self._carry = text[split_at:]
+        if split_at:
+            self.count += emoji_count(text[:split_at])
+
+    def close(self) -> int:
+        self.count += emoji_count(self._carry)
+        self._carry = ""
+        return self.count
@@ -0,0 +1,407 @@
+import json
+import re
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import count
+from typing import Union
+from urllib.parse import parse_qs, urlparse
+
+from icecream import ic
+
+from async_googleapi import AsyncGoogleAPI
+from googleapi import GoogleAPI
+from scheduler import RequestScheduler
+
+_DOCUMENTS_RE = re.compile(r"^/v1/documents$")
+_DOCUMENT_RE = re.compile(r"^/v1/documents/([^/:]+)$")
+_BATCH_UPDATE_RE = re.compile(r"^/v1/documents/([^/:]+):batchUpdate$")
+_FILES_RE = re.compile(r"^/drive/v3/files$")
+_FILE_RE = re.compile(r"^/drive/v3/files/([^/]+)$")
+_PERMISSIONS_RE = re.compile(r"^/drive/v3/files/([^/]+)/permissions$")
+_PERMISSION_RE = re.compile(r"^/drive/v3/files/([^/]+)/permissions/([^/]+)$")
+_BATCH_RE = re.compile(r"^/batch/")
+
+
+class FakeGoogleServer:
+    """Local in-memory stand-in for the Docs and Drive REST endpoints.
+
+    Serves documents, files, permissions, document writes, Drive batch
+    requests and service account tokens on a random local port, so that
+    the API clients can be exercised and load-tested offline. Throttling is
+    simulated with `max_rate` requests per second and with errors queued by
+    `inject()`.
+    """
+
+    def __init__(
+        self,
+        documents: Union[dict[str, dict], None] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        max_rate: Union[float, None] = None,
+    ) -> None:
+        self.documents: dict[str, dict] = dict(documents or {})
+        self.files: dict[str, dict] = {
+            document_id: {
+                "id": document_id,
+                "name": document.get("title", document_id),
+                "mimeType": "application/vnd.google-apps.document",
+            }
+            for document_id, document in self.documents.items()
+        }
+        self.permissions: dict[str, list[dict]] = {}
+        # Запросы batchUpdate по документам: сам текст документов не меняется
+        self.updates: dict[str, list[dict]] = {}
+        self.requests = 0
+        self.throttled = 0
+        # Выданные токены и заголовки Authorization запросов к API
+        self.tokens = 0
+        self.authorizations: list[Union[str, None]] = []
+
+        self.max_rate = max_rate
+        self._faults: list[int] = []
+        self._window_start = 0.0
+        self._window_requests = 0
+
+        self._ids = count(1)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Union[threading.Thread, None] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeGoogleServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeGoogleServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def inject(self, status: int, count: int = 1) -> None:
+        """Answer the next `count` requests with the error `status`."""
+        with self._lock:
+            self._faults.extend([status] * count)
+
+    def _throttle(self) -> Union[tuple[int, dict], None]:
+        if self._faults:
+            status = self._faults.pop(0)
+            self.throttled += 1
+            return _error(status, HTTPStatus(status).phrase)
+
+        if self.max_rate is not None:
+            now = time.monotonic()
+            if now - self._window_start >= 1.0:
+                self._window_start = now
+                self._window_requests = 0
+            self._window_requests += 1
+            if self._window_requests > self.max_rate:
+                self.throttled += 1
+                return _error(429, "Rate Limit Exceeded")
+
+        return None
+
+    def handle(
+        self,
+        method: str,
+        path: str,
+        query: dict[str, list[str]],
+        body: Union[dict, None],
+    ) -> tuple[int, Union[dict, None]]:
+        """Route one request and return the status code and JSON body."""
+        with self._lock:
+            self.requests += 1
+            if throttled := self._throttle():
+                return throttled
+
+            if method == "GET" and (match := _DOCUMENT_RE.match(path)):
+                document = self.documents.get(match[1])
+                if document is None:
+                    return _error(404, "Not Found")
+                if fields := query.get("fields"):
+                    # Поддерживается только маска из полей верхнего уровня
+                    names = [name.strip() for name in fields[0].split(",")]
+                    document = {
+                        name: document[name] for name in names if name in document
+                    }
+                return 200, document
+
+            if method == "POST" and _DOCUMENTS_RE.match(path):
+                document_id = f"created-{next(self._ids)}"
+                title = (body or {}).get("title", "")
+                self.documents[document_id] = {
+                    "documentId": document_id,
+                    "title": title,
+                    "revisionId": "1",
+                    "body": {
+                        "content": [
+                            {"startIndex": 0, "endIndex": 1, "sectionBreak": {}},
+                            {
+                                "startIndex": 1,
+                                "endIndex": 2,
+                                "paragraph": {
+                                    "elements": [
+                                        {
+                                            "startIndex": 1,
+                                            "endIndex": 2,
+                                            "textRun": {"content": "\n"},
+                                        }
+                                    ]
+                                },
+                            },
+                        ]
+                    },
+                }
+                self.files[document_id] = {
+                    "id": document_id,
+                    "name": title,
+                    "mimeType": "application/vnd.google-apps.document",
+                }
+                return 200, self.documents[document_id]
+
+            if method == "POST" and (match := _BATCH_UPDATE_RE.match(path)):
+                document = self.documents.get(match[1])
+                if document is None:
+                    return _error(404, "Not Found")
+                body = body or {}
+                required = body.get("writeControl", {}).get("requiredRevisionId")
+                if required and required != document.get("revisionId"):
+                    return _error(
+                        400,
+                        "The required revision ID does not match the latest revision",
+                    )
+                requests = body.get("requests", [])
+                self.updates.setdefault(match[1], []).extend(requests)
+                document["revisionId"] = str(next(self._ids))
+                return 200, {
+                    "documentId": match[1],
+                    "replies": [{} for _ in requests],
+                    "writeControl": {"requiredRevisionId": document["revisionId"]},
+                }
+
+            if method == "GET" and _FILES_RE.match(path):
+                files = list(self.files.values())
+                offset = int(query.get("pageToken", ["0"])[0])
+                size = int(query.get("pageSize", ["100"])[0])
+                page: dict = {"files": files[offset : offset + size]}
+                if offset + size < len(files):
+                    page["nextPageToken"] = str(offset + size)
+                return 200, page
+
+            if match := _FILE_RE.match(path):
+                file = self.files.get(match[1])
+                if file is None:
+                    return _error(404, "File not found")
+                if method == "DELETE":
+                    del self.files[match[1]]
+                    self.documents.pop(match[1], None)
+                    return 204, None
+                return 200, file
+
+            if match := _PERMISSIONS_RE.match(path):
+                if match[1] not in self.files:
+                    return _error(404, "File not found")
+                permissions = self.permissions.setdefault(match[1], [])
+                if method == "POST":
+                    permission = {"id": str(next(self._ids)), **(body or {})}
+                    permissions.append(permission)
+                    return 200, permission
+                return 200, {"permissions": permissions}
+
+            if method == "DELETE" and (match := _PERMISSION_RE.match(path)):
+                permissions = self.permissions.get(match[1], [])
+                for permission in permissions:
+                    if permission["id"] == match[2]:
+                        permissions.remove(permission)
+                        return 204, None
+                return _error(404, "Permission not found")
+
+        return _error(404, "Not Found")
+
+    def issue_token(self) -> dict:
+        """Answer an OAuth token request of a service account."""
+        with self._lock:
+            self.tokens += 1
+            return {
+                "access_token": f"fake-token-{self.tokens}",
+                "expires_in": 3600,
+                "token_type": "Bearer",
+            }
+
+    def handle_batch(self, content_type: str, body: bytes) -> tuple[str, bytes]:
+        """Answer a multipart/mixed batch request part by part."""
+        message = BytesParser().parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode("utf-8") + body
+        )
+        boundary = "batch_response"
+        parts: list[str] = []
+
+        for part in message.get_payload():
+            request = part.get_payload().replace("\r\n", "\n")
+            head, _, part_body = request.partition("\n\n")
+            method, target = head.split(" ", 2)[:2]
+            url = urlparse(target)
+
+            status, payload = self.handle(
+                method,
+                url.path,
+                parse_qs(url.query),
+                json.loads(part_body) if part_body.strip() else None,
+            )
+            content_id = part["Content-ID"].strip("<>")
+            data = "" if payload is None else json.dumps(payload)
+            parts.append(
+                f"--{boundary}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                "Content-Type: application/json; charset=UTF-8\r\n"
+                f"Content-Length: {len(data.encode('utf-8'))}\r\n\r\n"
+                f"{data}\r\n"
+            )
+
+        parts.append(f"--{boundary}--\r\n")
+        return f"multipart/mixed; boundary={boundary}", "".join(parts).encode("utf-8")
+
+    def _handler(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _respond(self) -> None:
+                url = urlparse(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length)
+
+                if self.command == "POST" and url.path == "/token":
+                    # Тело запроса токена закодировано как форма, а не JSON
+                    status = 200
+                    content_type = "application/json; charset=UTF-8"
+                    data = json.dumps(server.issue_token()).encode("utf-8")
+                elif self.command == "POST" and _BATCH_RE.match(url.path):
+                    status = 200
+                    content_type, data = server.handle_batch(
+                        self.headers["Content-Type"], raw
+                    )
+                else:
+                    server.authorizations.append(self.headers.get("Authorization"))
+                    status, payload = server.handle(
+                        self.command,
+                        url.path,
+                        parse_qs(url.query),
+                        json.loads(raw) if raw else None,
+                    )
+                    content_type = "application/json; charset=UTF-8"
+                    data = (
+                        b"" if payload is None else json.dumps(payload).encode("utf-8")
+                    )
+
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_DELETE = _respond
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        return Handler
+
+
+def fake_service_account(url: str) -> dict:
+    """Service account key with a new RSA key, using the token endpoint at `url`."""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_key = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    return {
+        "type": "service_account",
+        "project_id": "fake",
+        "private_key_id": uuid.uuid4().hex,
+        "private_key": private_key.decode("ascii"),
+        "client_email": "service@fake.iam.gserviceaccount.com",
+        "token_uri": url + "/token",
+    }
+
+
+def fake_google_api(url: str, credentials_json: Union[dict, None] = None) -> GoogleAPI:
+    """Synchronous client of a `FakeGoogleServer`, without quotas.
+
+    Without `credentials_json` the services are built right away and send
+    no credentials. With a key from `fake_service_account` the client is
+    authorized and builds its services on first use, as with Google.
+    """
+    import httplib2
+    from googleapiclient.discovery import build
+
+    if credentials_json is not None:
+        google_api = GoogleAPI(
+            credentials_json=credentials_json,
+            scheduler=RequestScheduler(quotas={}),
+        )
+        google_api.endpoints = {"docs": url, "drive": url + "/drive/v3/"}
+        google_api.batch_uri = url + "/batch/drive/v3"
+        google_api.authorize()
+        return google_api
+
+    google_api = GoogleAPI(scheduler=RequestScheduler(quotas={}))
+    google_api.doc_service = build(
+        "docs",
+        "v1",
+        http=httplib2.Http(),
+        client_options={"api_endpoint": url},
+        static_discovery=True,
+    )
+    google_api.drive_service = build(
+        "drive",
+        "v3",
+        http=httplib2.Http(),
+        client_options={"api_endpoint": url + "/drive/v3/"},
+        static_discovery=True,
+    )
+    google_api.batch_uri = url + "/batch/drive/v3"
+    return google_api
+
+
+def fake_reader(url: str) -> AsyncGoogleAPI:
+    """Async client of a `FakeGoogleServer`, with a static access token and no quotas."""
+    from google.oauth2.credentials import Credentials
+
+    return AsyncGoogleAPI(
+        credentials=Credentials(token="fake"),
+        docs_url=url,
+        drive_url=url,
+        scheduler=RequestScheduler(quotas={}),
+    )
+
+
+def _error(status: int, message: str) -> tuple[int, dict]:
+    return status, {"error": {"code": status, "message": message}}
+
+
+if __name__ == "__main__":
+    with FakeGoogleServer({"demo": {"title": "demo", "body": {"content": []}}}) as fake:
+        ic(fake.url)
+        threading.Event().wait()
@@ -1,14 +1,119 @@
 import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from enum import Enum
-from typing import Union
+from functools import partial
+from typing import TYPE_CHECKING, Any, Callable, Iterator, TypeVar, Union
 
-from google.oauth2 import service_account
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
 from icecream import ic
 
+from instrumentation import instrumentation
+from scheduler import (
+    BULK,
+    INTERACTIVE,
+    RequestScheduler,
+    default_scheduler,
+    error_status,
+    http_error_type,
+    is_retryable,
+    request_is_idempotent,
+    service_of,
+)
+from writer import diff_requests, document_requests, split_batches
+
+if TYPE_CHECKING:
+    from google.oauth2.service_account import Credentials
+
+    from document import Document
+
 AUTH_TYPE_SERVICE_ACCOUNT = "service_account"
+# Google принимает не более 100 вызовов в одном пакетном HTTP-запросе
+BATCH_LIMIT = 100
+# Признаки ответа batchUpdate на requiredRevisionId, который уже устарел
+REVISION_CONFLICT_MARKERS = (b"failed_precondition", b"revision")
+# A complete list of scopes can be found at: https://developers.google.com/identity/protocols/googlescopes#drive
+SCOPES: list[str] = [
+    "https://www.googleapis.com/auth/documents",
+    "https://www.googleapis.com/auth/drive",
+    "https://www.googleapis.com/auth/drive.file",
+    "https://www.googleapis.com/auth/drive.appdata",
+    "https://www.googleapis.com/auth/drive.metadata",
+]
+
+# Учётные данные и описания API общие для всех клиентов процесса, а сами
+# клиенты googleapiclient не потокобезопасны и хранятся отдельно в каждом потоке
+_lock = threading.Lock()
+_credentials_cache: dict[str, tuple["Credentials", str]] = {}
+_discovery_documents: dict[tuple[str, str], str] = {}
+_services = threading.local()
+
+T = TypeVar("T")
+
+
+def _discovery_document(api: str, version: str) -> str:
+    """Discovery document bundled with googleapiclient, read once per process."""
+    key = (api, version)
+    with _lock:
+        document = _discovery_documents.get(key)
+        if document is None:
+            from googleapiclient.discovery_cache import get_static_doc
+
+            document = get_static_doc(api, version)
+            if document is None:
+                raise ValueError(f"Нет встроенного описания API {api} {version}")
+            _discovery_documents[key] = document
+    return document
+
+
+def _build_service(
+    api: str,
+    version: str,
+    credentials: "Credentials",
+    credentials_key: str,
+    endpoint: Union[str, None] = None,
+) -> Any:
+    """API client for the credentials, built once per thread without network."""
+    key = (credentials_key, api, version, endpoint)
+    services = _services.__dict__
+    service = services.get(key)
+    if service is None:
+        from googleapiclient.discovery import build_from_document
+
+        service = services[key] = build_from_document(
+            _discovery_document(api, version),
+            credentials=credentials,
+            client_options={"api_endpoint": endpoint} if endpoint else None,
+        )
+    return service
+
+
+def per_thread(factory: Callable[[], T]) -> Callable[[], T]:
+    """Wrap a client factory so that each calling thread gets its own client.
+
+    A `GoogleAPI` keeps its services and `last_error` on the instance, so
+    threads that call it concurrently must not share one.
+    """
+    local = threading.local()
+
+    def client() -> T:
+        instance = getattr(local, "instance", None)
+        if instance is None:
+            instance = local.instance = factory()
+        return instance
+
+    return client
+
+
+def _is_revision_conflict(error: Exception) -> bool:
+    # Отказ из-за устаревшей ревизии отличается от ошибки в самих запросах
+    # только текстом ответа с тем же статусом 400
+    content = (getattr(error, "content", None) or b"").lower()
+    return error_status(error) == 400 and any(
+        marker in content for marker in REVISION_CONFLICT_MARKERS
+    )
 
 
 class Permissions(Enum):
@@ -29,6 +134,30 @@ class MimeTypes(Enum):
     PRESENTATION = "application/vnd.google-apps.presentation"
 
 
+@dataclass
+class BatchItem:
+    """Result of one call inside a batch request."""
+
+    key: Any
+    response: Any = None
+    error: Union[Exception, None] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class ApiError:
+    """Failure of the last call of a `GoogleAPI` method."""
+
+    method: str
+    message: str
+    status: Union[int, None] = None
+    retries: int = 0
+    error: Union[Exception, None] = None
+
+
 class GoogleAPI:
     def __init__(
         self,
@@ -36,6 +165,7 @@ class GoogleAPI:
         credentials_json=None,
         auto_ownership=False,
         default_owner_email="",
+        scheduler: Union[RequestScheduler, None] = None,
     ) -> None:
         self.CREDENTIALS = credentials_file
         self.CREDENTIALS_JSON = credentials_json
@@ -47,10 +177,21 @@ class GoogleAPI:
         self.auto_owner = auto_ownership
         self.default_owner_email = default_owner_email
 
-        self.drive_service = None
-        self.doc_service = None
+        self.credentials: Union["Credentials", None] = None
+        self._credentials_key: Union[str, None] = None
+        self._drive_service: Any = None
+        self._doc_service: Any = None
         self._drive_version = "v3"
         self._doc_version = "v1"
+        # Адреса API по имени ("drive", "docs") и адрес пакетных запросов Drive,
+        # если они отличаются от адресов по умолчанию
+        self.endpoints: dict[str, str] = {}
+        self.batch_uri: Union[str, None] = None
+
+        # Квоты и повторы общие для всех клиентов процесса
+        self.scheduler = scheduler or default_scheduler
+        # Ошибка последнего вызова вместо сообщения в консоли
+        self.last_error: Union[ApiError, None] = None
 
     def authorize(self, authentication_type: Union[str, None] = None) -> bool:
         """Authorize the Google API client."""
@@ -67,16 +208,48 @@ class GoogleAPI:
         credentials = self._get_credentials(authentication_type)
 
         self.auth_type = authentication_type
+        self.credentials = credentials
+        # Клиенты Drive и Docs создаются при первом обращении к ним
+        self._drive_service = None
+        self._doc_service = None
 
-        self.drive_service = build(
-            "drive", self._drive_version, credentials=credentials
-        )
+        return True
 
-        self.doc_service = build("docs", self._doc_version, credentials=credentials)
+    @property
+    def drive_service(self) -> Any:
+        """Drive API client, built on first use after `authorize()`."""
+        if self._drive_service is None and self.credentials is not None:
+            self._drive_service = _build_service(
+                "drive",
+                self._drive_version,
+                self.credentials,
+                self._credentials_key,
+                self.endpoints.get("drive"),
+            )
+        return self._drive_service
+
+    @drive_service.setter
+    def drive_service(self, service: Any) -> None:
+        self._drive_service = service
+
+    @property
+    def doc_service(self) -> Any:
+        """Docs API client, built on first use after `authorize()`."""
+        if self._doc_service is None and self.credentials is not None:
+            self._doc_service = _build_service(
+                "docs",
+                self._doc_version,
+                self.credentials,
+                self._credentials_key,
+                self.endpoints.get("docs"),
+            )
+        return self._doc_service
 
-        return True
+    @doc_service.setter
+    def doc_service(self, service: Any) -> None:
+        self._doc_service = service
 
-    def _get_credentials(self, authentication_type: str) -> Credentials:
+    def _get_credentials(self, authentication_type: str) -> "Credentials":
         """Get the appropriate credentials based on the authentication type."""
         if authentication_type == AUTH_TYPE_SERVICE_ACCOUNT:
             return self._get_service_account_credentials()
@@ -85,34 +258,32 @@ class GoogleAPI:
                 f"Unsupported authentication type: `{authentication_type}`"
             )
 
-    def _get_service_account_credentials(self) -> Credentials:
-        """Get the service account credentials."""
-        # A complete list of scopes can be found at: https://developers.google.com/identity/protocols/googlescopes#drive
-        SCOPES: list[str] = [
-            "https://www.googleapis.com/auth/documents",
-            "https://www.googleapis.com/auth/drive",
-            "https://www.googleapis.com/auth/drive.file",
-            "https://www.googleapis.com/auth/drive.appdata",
-            "https://www.googleapis.com/auth/drive.metadata",
-        ]
-
+    def _get_service_account_credentials(self) -> "Credentials":
+        """Get the service account credentials, shared by clients of the process."""
         if self.CREDENTIALS:
-            credentials: Credentials = (
-                service_account.Credentials.from_service_account_file(
-                    self.CREDENTIALS, scopes=SCOPES
-                )
-            )
-            with open(self.CREDENTIALS) as f:
-                cred_obj = json.load(f)
-                self.service_email = cred_obj["client_email"]
+            key = os.path.abspath(self.CREDENTIALS)
         elif self.CREDENTIALS_JSON:
-            credentials = service_account.Credentials.from_service_account_info(
-                self.CREDENTIALS_JSON, scopes=SCOPES
-            )
-            self.service_email = self.CREDENTIALS_JSON["client_email"]
+            key = "{client_email}/{private_key_id}".format_map(self.CREDENTIALS_JSON)
         else:
             raise FileNotFoundError("No service account credentials provided.")
 
+        with _lock:
+            cached = _credentials_cache.get(key)
+            if cached is None:
+                from google.oauth2 import service_account
+
+                if self.CREDENTIALS:
+                    with open(self.CREDENTIALS) as f:
+                        info = json.load(f)
+                else:
+                    info = self.CREDENTIALS_JSON
+                credentials = service_account.Credentials.from_service_account_info(
+                    info, scopes=SCOPES
+                )
+                cached = _credentials_cache[key] = (credentials, info["client_email"])
+
+        credentials, self.service_email = cached
+        self._credentials_key = key
         return credentials
 
     def extract_file_id_from_url(self, file_id: str) -> str:
@@ -124,34 +295,121 @@ class GoogleAPI:
         try:
             file_id = self.extract_file_id_from_url(file_id)
             if self.drive_service:
-                return (
-                    self.drive_service.files()
-                    .get(fileId=file_id, fields="name")
-                    .execute()["name"]
-                )
-        except HttpError as e:
+                return self._execute(
+                    self.drive_service.files().get(fileId=file_id, fields="name")
+                )["name"]
+        except http_error_type() as e:
             if e.resp.status == 404:
-                print(f"Файл с ID {file_id} не найден.")
+                self._fail("get_file_name", f"Файл с ID {file_id} не найден.", e)
             else:
-                print(f"Ошибка при получении имени файла: {e}")
+                self._fail("get_file_name", f"Ошибка при получении имени файла: {e}", e)
 
         return None
 
+    def iter_files(
+        self,
+        query: Union[str, None] = None,
+        fields: str = "id, name, mimeType",
+        page_size: int = 1000,
+        prefetch: bool = False,
+    ) -> Iterator[dict]:
+        """Iterate over all files, requesting pages lazily with only `fields`.
+
+        With `prefetch` the next page is downloaded in a background thread,
+        over a separate HTTP connection, while the current one is processed.
+        A failed page sets `last_error` in the calling thread and is raised.
+        """
+        if not self.drive_service:
+            return
+
+        def fetch_page(
+            page_token: Union[str, None], http=None
+        ) -> tuple[Union[dict, None], Union[Exception, None]]:
+            params = {
+                "pageSize": page_size,
+                "fields": f"nextPageToken, files({fields})",
+            }
+            if query:
+                params["q"] = query
+            if page_token:
+                params["pageToken"] = page_token
+            # Страница может загружаться в фоновом потоке, поэтому last_error
+            # здесь не меняется: ошибка возвращается вызывающему потоку
+            try:
+                return (
+                    self._schedule(
+                        self.drive_service.files().list(**params), http, priority=BULK
+                    ),
+                    None,
+                )
+            except Exception as e:
+                return None, e
+
+        def checked(result: tuple[Union[dict, None], Union[Exception, None]]) -> dict:
+            page, error = result
+            if error is not None:
+                self._fail(
+                    "iter_files", f"Ошибка при получении списка файлов: {error}", error
+                )
+                raise error
+            return page
+
+        self.last_error = None
+        if not prefetch:
+            page_token = None
+            while True:
+                page = checked(fetch_page(page_token))
+                yield from page.get("files", [])
+                page_token = page.get("nextPageToken")
+                if not page_token:
+                    return
+
+        http = self._new_http()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            page = checked(fetch_page(None))
+            while True:
+                page_token = page.get("nextPageToken")
+                next_page = (
+                    executor.submit(fetch_page, page_token, http)
+                    if page_token
+                    else None
+                )
+                yield from page.get("files", [])
+                if next_page is None:
+                    return
+                page = checked(next_page.result())
+
+    def _new_http(self) -> Any:
+        """Create a separate authorized HTTP connection for background requests."""
+        import httplib2
+        from google_auth_httplib2 import AuthorizedHttp
+
+        http = httplib2.Http()
+        if self.credentials is None:
+            return http
+        return AuthorizedHttp(self.credentials, http=http)
+
     def get_files(self) -> Union[dict, None]:
         """Get a list of all files."""
         if self.drive_service:
-            return self.drive_service.files().list().execute()
+            return {"files": list(self.iter_files())}
 
         return None
 
     def delete_all_files(self) -> bool:
         """Delete all files."""
         if self.drive_service:
-            if files := self.get_files():
-                file_ids = [file["id"] for file in files.get("files", [])]
-                for file_id in file_ids:
-                    self.delete_file(file_id)
-                return True
+            # Сначала собрать все ID: удаление во время листания сдвигает страницы
+            file_ids = [file["id"] for file in self.iter_files(fields="id")]
+            failed = [item for item in self.delete_files(file_ids) if not item.ok]
+            if failed:
+                self._fail(
+                    "delete_all_files",
+                    f"Не удалено файлов: {len(failed)} из {len(file_ids)}",
+                    failed[0].error,
+                )
+                return False
+            return True
 
         return False
 
@@ -159,44 +417,169 @@ class GoogleAPI:
         """Delete a file by its ID."""
         file_id = self.extract_file_id_from_url(file_id)
         if self.drive_service:
-            return self.drive_service.files().delete(fileId=file_id).execute()
+            return self._execute(
+                self.drive_service.files().delete(fileId=file_id), priority=BULK
+            )
 
         return None
 
     def get_document(self, file_id: str) -> Union[None, dict]:
         """Get the content of a document by its ID."""
+        return self._get_document("get_document", file_id, raw=False)
+
+    def get_document_bytes(self, file_id: str) -> Union[None, bytes]:
+        """Get the undecoded JSON of a document by its ID."""
+        return self._get_document("get_document_bytes", file_id, raw=True)
+
+    def _get_document(self, method: str, file_id: str, raw: bool) -> Any:
+        try:
+            file_id = self.extract_file_id_from_url(file_id)
+            if self.doc_service:
+                request = self.doc_service.documents().get(documentId=file_id)
+                if raw:
+                    # Тело ответа не разбирается: его разберёт потоковый парсер
+                    request.postproc = lambda resp, content: content
+                return self._execute(request)
+        except http_error_type() as e:
+            if e.resp.status == 403:
+                self._fail(
+                    method,
+                    f"У вас нет прав для просмотра документа с ID {file_id}. Проверьте права доступа.",
+                    e,
+                )
+            else:
+                self._fail(method, f"Ошибка при получении документа: {e}", e)
+
+        return None
+
+    def get_revision_id(self, file_id: str) -> Union[None, str]:
+        """Get only the current revision ID of a document."""
         try:
             file_id = self.extract_file_id_from_url(file_id)
             if self.doc_service:
-                return self.doc_service.documents().get(documentId=file_id).execute()
-        except HttpError as e:
+                return self._execute(
+                    self.doc_service.documents().get(
+                        documentId=file_id, fields="revisionId"
+                    )
+                ).get("revisionId")
+        except http_error_type() as e:
             if e.resp.status == 403:
-                print(
-                    f"У вас нет прав для просмотра документа с ID {file_id}. Проверьте права доступа."
+                self._fail(
+                    "get_revision_id",
+                    f"У вас нет прав для просмотра документа с ID {file_id}. Проверьте права доступа.",
+                    e,
+                )
+            else:
+                self._fail(
+                    "get_revision_id", f"Ошибка при получении ревизии документа: {e}", e
+                )
+
+        return None
+
+    def create_document(self, title: str) -> Union[None, str]:
+        """Create an empty document and return its ID."""
+        try:
+            if self.doc_service:
+                return self._execute(
+                    self.doc_service.documents().create(body={"title": title})
+                )["documentId"]
+        except http_error_type() as e:
+            self._fail("create_document", f"Ошибка при создании документа: {e}", e)
+
+        return None
+
+    def batch_update(
+        self,
+        file_id: str,
+        requests: list[dict],
+        revision_id: Union[str, None] = None,
+    ) -> Union[None, str]:
+        """Apply requests in size-bounded batches, return the new revision ID.
+
+        With `revision_id` the first batch fails if the document has changed
+        since that revision; every next batch requires the revision left by
+        the previous one.
+        """
+        try:
+            file_id = self.extract_file_id_from_url(file_id)
+            if not self.doc_service:
+                return None
+            for batch in split_batches(requests):
+                body: dict = {"requests": batch}
+                if revision_id:
+                    body["writeControl"] = {"requiredRevisionId": revision_id}
+                response = self._execute(
+                    self.doc_service.documents().batchUpdate(
+                        documentId=file_id, body=body
+                    )
+                )
+                revision_id = response.get("writeControl", {}).get("requiredRevisionId")
+            return revision_id
+        except http_error_type() as e:
+            if revision_id and _is_revision_conflict(e):
+                self._fail(
+                    "batch_update",
+                    f"Документ с ID {file_id} изменился с ревизии {revision_id}.",
+                    e,
                 )
             else:
-                print(f"Ошибка при получении документа: {e}")
+                self._fail("batch_update", f"Ошибка при записи документа: {e}", e)
 
         return None
 
+    def write_document(
+        self,
+        document: "Document",
+        file_id: Union[str, None] = None,
+        title: Union[str, None] = None,
+    ) -> Union[None, str]:
+        """Write a document into a new doc or over an existing one, return its ID.
+
+        An existing document is read first and only the changed part of its
+        body is rewritten, guarded by the revision that was read.
+        """
+        if file_id is None:
+            file_id = self.create_document(
+                title or document.json_data.get("title") or "Без названия"
+            )
+            if file_id is None:
+                return None
+            requests = document_requests(document)
+            revision_id = None
+        else:
+            file_id = self.extract_file_id_from_url(file_id)
+            current = self.get_document(file_id)
+            if current is None:
+                return None
+            requests = diff_requests(current, document)
+            revision_id = current.get("revisionId")
+
+        if requests and self.batch_update(file_id, requests, revision_id) is None:
+            return None
+        return file_id
+
     # More about permissions: https://developers.google.com/drive/api/reference/rest/v3/permissions?hl=ru
     def get_permissions(self, file_id: str) -> Union[None, list[dict]]:
         """Get the permissions of a file by its ID."""
         try:
             file_id = self.extract_file_id_from_url(file_id)
             if self.drive_service:
-                return (
-                    self.drive_service.permissions()
-                    .list(fileId=file_id, fields="*")
-                    .execute()
+                return self._execute(
+                    self.drive_service.permissions().list(fileId=file_id, fields="*")
                 ).get("permissions", [])
-        except HttpError as e:
+        except http_error_type() as e:
             if e.resp.status == 403:
-                print(
-                    f"У вас нет прав для просмотра документа с ID {file_id}. Проверьте права доступа."
+                self._fail(
+                    "get_permissions",
+                    f"У вас нет прав для просмотра документа с ID {file_id}. Проверьте права доступа.",
+                    e,
                 )
             else:
-                print(f"Ошибка при получении разрешений для документа: {e}")
+                self._fail(
+                    "get_permissions",
+                    f"Ошибка при получении разрешений для документа: {e}",
+                    e,
+                )
 
         return None
 
@@ -210,25 +593,30 @@ class GoogleAPI:
         try:
             file_id = self.extract_file_id_from_url(file_id)
             if self.drive_service:
-                return (
-                    self.drive_service.permissions()
-                    .create(
+                return self._execute(
+                    self.drive_service.permissions().create(
                         fileId=file_id,
                         body={
                             "type": "user",
                             "role": role.value,
                             "emailAddress": user_email,
                         },
-                    )
-                    .execute()
+                    ),
+                    priority=BULK,
                 )
-        except HttpError as e:
+        except http_error_type() as e:
             if e.resp.status == 403:
-                print(
-                    f"У вас нет прав для просмотра документа с ID {file_id}. Проверьте права доступа."
+                self._fail(
+                    "add_permissions",
+                    f"У вас нет прав для просмотра документа с ID {file_id}. Проверьте права доступа.",
+                    e,
                 )
             else:
-                print(f"Ошибка при добавлении разрешений для документа: {e}")
+                self._fail(
+                    "add_permissions",
+                    f"Ошибка при добавлении разрешений для документа: {e}",
+                    e,
+                )
 
         return None
 
@@ -247,8 +635,10 @@ class GoogleAPI:
             permissions_list = self.get_permissions(file_id)
 
             if permissions_list is None:
-                print(
-                    f"Не удалось получить список разрешений для файла с ID {file_id}."
+                self._fail(
+                    "delete_permissions",
+                    f"Не удалось получить список разрешений для файла с ID {file_id}.",
+                    self.last_error.error if self.last_error else None,
                 )
                 return None
 
@@ -263,28 +653,291 @@ class GoogleAPI:
                 )
 
                 if not matching_permissions:
-                    print(f"Не найдено разрешение для email: {user_email}")
+                    self._fail(
+                        "delete_permissions",
+                        f"Не найдено разрешение для email: {user_email}",
+                    )
                     return None
 
                 user_id = matching_permissions
 
             if self.drive_service:
-                return (
-                    self.drive_service.permissions()
-                    .delete(fileId=file_id, permissionId=user_id)
-                    .execute()
+                return self._execute(
+                    self.drive_service.permissions().delete(
+                        fileId=file_id, permissionId=user_id
+                    ),
+                    priority=BULK,
                 )
 
-        except HttpError as e:
+        except http_error_type() as e:
             if e.resp.status == 403:
-                print(
-                    f"У вас нет прав для просмотра документа с ID {file_id}. Проверьте права доступа."
+                self._fail(
+                    "delete_permissions",
+                    f"У вас нет прав для просмотра документа с ID {file_id}. Проверьте права доступа.",
+                    e,
                 )
             else:
-                print(f"Ошибка при удалении разрешений для документа: {e}")
+                self._fail(
+                    "delete_permissions",
+                    f"Ошибка при удалении разрешений для документа: {e}",
+                    e,
+                )
 
         return None
 
+    def _fail(
+        self, method: str, message: str, error: Union[Exception, None] = None
+    ) -> None:
+        self.last_error = ApiError(
+            method,
+            message,
+            status=error.resp.status if isinstance(error, http_error_type()) else None,
+            retries=getattr(error, "retries", 0),
+            error=error,
+        )
+
+    def _execute(
+        self, request: Any, http: Any = None, priority: int = INTERACTIVE
+    ) -> Any:
+        """Execute one API request through the scheduler: quotas and retries."""
+        self.last_error = None
+        return self._schedule(request, http, priority)
+
+    def _schedule(
+        self, request: Any, http: Any = None, priority: int = INTERACTIVE
+    ) -> Any:
+        """Run `request` through the scheduler without touching `last_error`."""
+        return self.scheduler.execute(
+            lambda: self._execute_once(request, http),
+            service_of(request),
+            request.methodId,
+            priority,
+            idempotent=request_is_idempotent(request),
+        )
+
+    def _execute_once(self, request: Any, http: Any = None) -> Any:
+        """Execute one API request, recording its latency and response size."""
+        if not instrumentation.enabled:
+            return request.execute(http=http)
+
+        received = 0
+        postproc = request.postproc
+
+        def measure_response(resp: Any, content: bytes) -> Any:
+            nonlocal received
+            received = len(content or b"")
+            return postproc(resp, content)
+
+        request.postproc = measure_response
+        status: Union[int, str] = 200
+        start = time.perf_counter()
+        try:
+            return request.execute(http=http)
+        except http_error_type() as e:
+            status = e.resp.status
+            received = len(e.content or b"")
+            raise
+        except Exception as e:
+            status = type(e).__name__
+            raise
+        finally:
+            instrumentation.record_request(
+                request.methodId, status, time.perf_counter() - start, received
+            )
+
+    def _execute_batch(self, calls: list[tuple[Any, Any]]) -> list[BatchItem]:
+        """Send (key, request) pairs in batch HTTP requests of up to BATCH_LIMIT.
+
+        Calls throttled inside a batch, and batches rejected as a whole with
+        a retryable status, are sent again after a backoff.
+        """
+        from googleapiclient.http import BatchHttpRequest
+
+        results = [BatchItem(key) for key, _ in calls]
+
+        def store(index: int, request_id: str, response: Any, exception) -> None:
+            results[index].response = response
+            results[index].error = exception
+
+        pending = list(range(len(calls)))
+        retries = [0] * len(calls)
+        attempt = 0
+        while pending:
+            for offset in range(0, len(pending), BATCH_LIMIT):
+                chunk = pending[offset : offset + BATCH_LIMIT]
+                # Каждый вызов внутри пакета расходует квоту отдельно
+                self.scheduler.acquire(service_of(calls[chunk[0]][1]), len(chunk), BULK)
+                batch = (
+                    BatchHttpRequest(batch_uri=self.batch_uri)
+                    if self.batch_uri
+                    else self.drive_service.new_batch_http_request()
+                )
+                for index in chunk:
+                    results[index].error = None
+                    batch.add(
+                        calls[index][1],
+                        callback=partial(store, index),
+                        request_id=str(index),
+                    )
+
+                status: Union[int, str] = 200
+                start = time.perf_counter()
+                try:
+                    batch.execute()
+                except http_error_type() as e:
+                    status = e.resp.status
+                    # Отклонён весь пакет: ошибка относится к каждому вызову в нём
+                    for index in chunk:
+                        results[index].error = e
+                except Exception as e:
+                    status = type(e).__name__
+                    raise
+                finally:
+                    instrumentation.record_request(
+                        "batch", status, time.perf_counter() - start
+                    )
+
+            retry = [
+                index
+                for index in pending
+                if results[index].error is not None
+                and is_retryable(
+                    results[index].error, request_is_idempotent(calls[index][1])
+                )
+            ]
+            if not retry or attempt >= self.scheduler.max_retries:
+                break
+
+            self.scheduler.sleep(
+                self.scheduler.backoff(attempt, results[retry[0]].error)
+            )
+            attempt += 1
+            instrumentation.increment("api_retries_total", len(retry), method="batch")
+            for index in retry:
+                retries[index] += 1
+            pending = retry
+
+        # Повторы считаются для каждого вызова: ошибки вне повтора их не получают
+        for item, count in zip(results, retries):
+            if item.error is not None:
+                item.error.retries = count
+        return results
+
+    def get_file_names(self, file_ids: list[str]) -> list[BatchItem]:
+        """Get the names of many files; `response` of each item is the name."""
+        if not self.drive_service:
+            return []
+
+        calls = []
+        for file_id in file_ids:
+            file_id = self.extract_file_id_from_url(file_id)
+            calls.append(
+                (file_id, self.drive_service.files().get(fileId=file_id, fields="name"))
+            )
+
+        results = self._execute_batch(calls)
+        for item in results:
+            if item.ok:
+                item.response = item.response["name"]
+        return results
+
+    def delete_files(self, file_ids: list[str]) -> list[BatchItem]:
+        """Delete many files by their IDs."""
+        if not self.drive_service:
+            return []
+
+        calls = []
+        for file_id in file_ids:
+            file_id = self.extract_file_id_from_url(file_id)
+            calls.append((file_id, self.drive_service.files().delete(fileId=file_id)))
+
+        return self._execute_batch(calls)
+
+    def add_permissions_bulk(
+        self, permissions: list[tuple[str, str, Permissions]]
+    ) -> list[BatchItem]:
+        """Add many permissions given as (file_id, user_email, role) tuples."""
+        if not self.drive_service:
+            return []
+
+        calls = []
+        for file_id, user_email, role in permissions:
+            file_id = self.extract_file_id_from_url(file_id)
+            request = self.drive_service.permissions().create(
+                fileId=file_id,
+                body={"type": "user", "role": role.value, "emailAddress": user_email},
+            )
+            calls.append(((file_id, user_email), request))
+
+        return self._execute_batch(calls)
+
+    def delete_permissions_bulk(
+        self, permissions: list[tuple[str, str]]
+    ) -> list[BatchItem]:
+        """Delete many permissions given as (file_id, user_email) tuples.
+
+        Permission lists of all affected files are fetched in one batch and the
+        deletions are sent in another, instead of two round-trips per user.
+        """
+        if not self.drive_service:
+            return []
+
+        keys = [
+            (self.extract_file_id_from_url(file_id), user_email)
+            for file_id, user_email in permissions
+        ]
+        file_ids = list(dict.fromkeys(file_id for file_id, _ in keys))
+        listed = {
+            item.key: item
+            for item in self._execute_batch(
+                [
+                    (
+                        file_id,
+                        self.drive_service.permissions().list(
+                            fileId=file_id, fields="permissions(id,emailAddress)"
+                        ),
+                    )
+                    for file_id in file_ids
+                ]
+            )
+        }
+
+        results: list[Union[BatchItem, None]] = []
+        calls = []
+        for file_id, user_email in keys:
+            item = listed[file_id]
+            if not item.ok:
+                results.append(BatchItem((file_id, user_email), error=item.error))
+                continue
+
+            permission_id = next(
+                (
+                    permission["id"]
+                    for permission in item.response.get("permissions", [])
+                    if permission.get("emailAddress") == user_email
+                ),
+                None,
+            )
+            if permission_id is None:
+                results.append(
+                    BatchItem(
+                        (file_id, user_email),
+                        error=LookupError(
+                            f"Не найдено разрешение для email: {user_email}"
+                        ),
+                    )
+                )
+                continue
+
+            request = self.drive_service.permissions().delete(
+                fileId=file_id, permissionId=permission_id
+            )
+            calls.append(((file_id, user_email), request))
+            results.append(None)
+
+        deleted = iter(self._execute_batch(calls))
+        return [item if item is not None else next(deleted) for item in results]
+
     def get_file_link(self, file: dict) -> str:
         """Get the shareable link for a file."""
         link: str = ""
@@ -0,0 +1,137 @@
+from typing import Union
+
+from emoji_counter import candidate_edges, emoji_count
+from tokenizer import SEPARATORS, split_words
+from walker import DocumentWalk
+
+
+class ElementMetrics:
+    """Metric contribution of one top-level structural element."""
+
+    __slots__ = (
+        "start_index",
+        "end_index",
+        "text",
+        "characters",
+        "characters_without_spaces",
+        "words",
+        "blank",
+        "splittable",
+        "emoji",
+        "emoji_head",
+        "emoji_tail",
+        "emoji_whole",
+        "tables",
+        "images",
+        "urls",
+    )
+
+    def __init__(self, element: dict, text: str) -> None:
+        self.start_index: int = element.get("startIndex", 0)
+        self.end_index: int = element.get("endIndex", 0)
+        self.text = text
+
+    @property
+    def key(self) -> tuple:
+        return self.text, self.tables, self.images, tuple(self.urls)
+
+
+def content_key(walked: DocumentWalk) -> tuple:
+    """Everything the metrics of an element depend on, without its position."""
+    return walked.text, len(walked.tables), len(walked.images), tuple(walked.urls)
+
+
+def measure_element(
+    element: dict, walked: DocumentWalk, count_emoji: bool
+) -> ElementMetrics:
+    """Count the contribution of one walked element to the document totals."""
+    text = walked.text
+    metrics = ElementMetrics(element, text)
+    plain_text = text.replace("\n", "")
+
+    metrics.characters = len(plain_text)
+    metrics.characters_without_spaces = len(plain_text) - plain_text.count(" ")
+    # Слова считаются без обрезки пробелов: элемент — середина общего текста
+    metrics.words = len(split_words(text, strip=False))
+    metrics.blank = not text.strip()
+    # Слова не переходят через границу, только если текст кончается разделителем
+    metrics.splittable = not text or text[-1] in SEPARATORS or text[-1] == " "
+
+    metrics.emoji = emoji_count(plain_text) if count_emoji else 0
+    metrics.emoji_head, metrics.emoji_tail = (
+        candidate_edges(plain_text) if count_emoji and plain_text else ("", "")
+    )
+    metrics.emoji_whole = bool(plain_text) and metrics.emoji_head == plain_text
+
+    metrics.tables = len(walked.tables)
+    metrics.images = len(walked.images)
+    metrics.urls = walked.urls
+    return metrics
+
+
+def element_totals(
+    elements: list[ElementMetrics], count_emoji: bool
+) -> Union[dict, None]:
+    """Sum element contributions into document totals.
+
+    Words of the first and the last non-blank elements are counted again,
+    as they depend on the whitespace stripped at the ends of the whole text.
+    Returns None when the totals cannot be combined exactly and a full
+    recount is needed.
+    """
+    if any(not metrics.splittable for metrics in elements[:-1]):
+        return None
+
+    words = sum(metrics.words for metrics in elements)
+    non_blank = [i for i, metrics in enumerate(elements) if not metrics.blank]
+    if non_blank:
+        first, last = non_blank[0], non_blank[-1]
+        if first == last:
+            text = elements[first].text
+            words += len(split_words(text)) - elements[first].words
+        else:
+            text = elements[first].text
+            words += (
+                len(split_words(text.lstrip(), strip=False)) - elements[first].words
+            )
+            text = elements[last].text
+            words += len(split_words(text.rstrip(), strip=False)) - elements[last].words
+
+    emoji = 0
+    if count_emoji:
+        emoji = sum(metrics.emoji for metrics in elements)
+
+        # Последовательность эмодзи, открытая в конце уже пройденного текста,
+        # и сумма её частей, посчитанных по отдельности в своих элементах
+        span = ""
+        span_separate = 0
+        for metrics in elements:
+            if not metrics.emoji_tail:
+                # Пустой без переводов строк элемент не разделяет соседей
+                continue
+
+            if metrics.emoji_whole:
+                span += metrics.emoji_head
+                span_separate += metrics.emoji
+                continue
+
+            if metrics.emoji_head:
+                span += metrics.emoji_head
+                span_separate += emoji_count(metrics.emoji_head)
+            emoji += emoji_count(span) - span_separate
+
+            span = metrics.emoji_tail
+            span_separate = emoji_count(span)
+
+        emoji += emoji_count(span) - span_separate
+
+    return {
+        "characters": sum(metrics.characters for metrics in elements),
+        "characters_without_spaces": sum(
+            metrics.characters_without_spaces for metrics in elements
+        ),
+        "word_count": words,
+        "count_emoji": emoji,
+        "table_count": sum(metrics.tables for metrics in elements),
+        "urls": [url for metrics in elements for url in metrics.urls],
+    }
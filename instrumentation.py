@@ -0,0 +1,259 @@
+import cProfile
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Iterator, Union
+
+# Границы корзин гистограмм: секунды и байты
+SECONDS_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+BYTES_BUCKETS = tuple(2**power for power in range(10, 28, 2))
+
+_Labels = tuple[tuple[str, str], ...]
+
+# Время вложенных этапов каждого потока, вычитаемое из внешнего этапа
+_stages = threading.local()
+
+
+def _escape_label(value: str) -> str:
+    # Формат Prometheus экранирует в значениях меток только эти три символа
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """Counts of observed values per bucket, with their sum and total count."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        # Последняя корзина — значения больше всех границ (+Inf)
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[int]:
+        total = 0
+        result = []
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+
+class Instrumentation:
+    """In-process histograms and counters of document stages and API calls.
+
+    Disabled by default: then every hook is a single attribute check.
+    Set `DOCS_INSTRUMENTATION=1` to enable it at import, which also applies
+    to worker processes, and `DOCS_PROFILE_SLOW=<seconds>` with
+    `DOCS_PROFILE_DIR` to keep cProfile stats of slow documents.
+    """
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self.profile_threshold: Union[float, None] = None
+        self.profile_dir = "profiles"
+        self.histograms: dict[tuple[str, _Labels], Histogram] = {}
+        self.counters: dict[tuple[str, _Labels], float] = {}
+        self._buckets: dict[str, tuple[float, ...]] = {}
+        self._lock = threading.Lock()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        buckets: tuple[float, ...] = SECONDS_BUCKETS,
+        **labels: Any,
+    ) -> None:
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(
+                    self._buckets.setdefault(name, buckets)
+                )
+            histogram.observe(value)
+
+    def increment(self, name: str, amount: float = 1, **labels: Any) -> None:
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    @contextmanager
+    def timer(self, name: str, **labels: Any) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def record_request(
+        self,
+        method: str,
+        status: Union[int, str],
+        seconds: float,
+        received: int = 0,
+        retries: int = 0,
+    ) -> None:
+        """Record one API call: its latency, response size and retries."""
+        if not self.enabled:
+            return
+        self.observe("api_request_seconds", seconds, method=method, status=status)
+        self.observe("api_response_bytes", received, BYTES_BUCKETS, method=method)
+        if retries:
+            self.increment("api_retries_total", retries, method=method)
+
+    @contextmanager
+    def profile(self, name: str) -> Iterator[None]:
+        """Profile the block and keep the stats only if it was slow."""
+        if self.profile_threshold is None:
+            yield
+            return
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - start
+            if elapsed >= self.profile_threshold:
+                os.makedirs(self.profile_dir, exist_ok=True)
+                file_name = re.sub(r"[^\w.-]+", "_", name)[-100:] or "document"
+                profiler.dump_stats(os.path.join(self.profile_dir, f"{file_name}.prof"))
+                self.increment("slow_documents_total")
+
+    def to_json(self) -> dict:
+        """Export all histograms and counters as a JSON-serialisable dict."""
+        with self._lock:
+            return {
+                "histograms": [
+                    {
+                        "name": name,
+                        "labels": dict(labels),
+                        "buckets": dict(
+                            zip(
+                                [str(bound) for bound in histogram.buckets] + ["+Inf"],
+                                histogram.cumulative(),
+                            )
+                        ),
+                        "sum": histogram.sum,
+                        "count": histogram.count,
+                    }
+                    for (name, labels), histogram in self.histograms.items()
+                ],
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in self.counters.items()
+                ],
+            }
+
+    def to_prometheus(self) -> str:
+        """Export all histograms and counters in the Prometheus text format."""
+        lines: list[str] = []
+        typed: set[str] = set()
+
+        def label_text(labels: _Labels, *extra: tuple[str, str]) -> str:
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            escaped = (f'{key}="{_escape_label(value)}"' for key, value in pairs)
+            return "{" + ",".join(escaped) + "}"
+
+        with self._lock:
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE {name} histogram")
+                bounds = [repr(float(bound)) for bound in histogram.buckets] + ["+Inf"]
+                for bound, count in zip(bounds, histogram.cumulative()):
+                    lines.append(
+                        f"{name}_bucket{label_text(labels, ('le', bound))} {count}"
+                    )
+                lines.append(f"{name}_sum{label_text(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{label_text(labels)} {histogram.count}")
+
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE {name} counter")
+                lines.append(f"{name}{label_text(labels)} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+instrumentation = Instrumentation(os.environ.get("DOCS_INSTRUMENTATION") == "1")
+if profile_slow := os.environ.get("DOCS_PROFILE_SLOW"):
+    instrumentation.profile_threshold = float(profile_slow)
+    instrumentation.profile_dir = os.environ.get("DOCS_PROFILE_DIR", "profiles")
+
+
+def timed(stage: str) -> Callable[[Callable], Callable]:
+    """Record the duration of each call in the `document_stage_seconds` histogram.
+
+    Time spent in stages called from inside the call is recorded by those
+    stages and left out of this one.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not instrumentation.enabled:
+                return func(*args, **kwargs)
+            nested = _stages.__dict__.setdefault("nested", [])
+            nested.append(0.0)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                own = elapsed - nested.pop()
+                if nested:
+                    nested[-1] += elapsed
+                instrumentation.observe("document_stage_seconds", own, stage=stage)
+
+        return wrapper
+
+    return decorator
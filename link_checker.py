@@ -0,0 +1,227 @@
+import argparse
+import asyncio
+import json
+import time
+from typing import Iterable, Union
+from urllib.parse import urlsplit
+
+import httpx
+
+from document import Document
+from instrumentation import instrumentation
+from links import DEFAULT_PORTS, Link, normalize_url
+
+# Серверы, которые не умеют HEAD, отвечают на него этими кодами
+HEAD_UNSUPPORTED = frozenset((400, 403, 404, 405, 501))
+
+
+class LinkStatus:
+    """Result of checking one link."""
+
+    __slots__ = ("url", "status", "final_url", "redirects", "method", "error")
+
+    def __init__(
+        self,
+        url: str,
+        status: Union[int, None] = None,
+        final_url: Union[str, None] = None,
+        redirects: int = 0,
+        method: Union[str, None] = None,
+        error: Union[str, None] = None,
+    ) -> None:
+        self.url = url
+        self.status = status
+        self.final_url = final_url
+        self.redirects = redirects
+        self.method = method
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.status is not None and self.status < 400
+
+    def to_dict(self) -> dict:
+        result = {name: getattr(self, name) for name in self.__slots__}
+        result["ok"] = self.ok
+        return result
+
+
+class LinkCache:
+    """Results of link checks kept for a limited time, shared by checkers.
+
+    Failed checks expire sooner, so a temporarily broken link is checked
+    again before a working one.
+    """
+
+    def __init__(self, ttl: float = 3600.0, error_ttl: float = 300.0) -> None:
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self._items: dict[str, tuple[float, LinkStatus]] = {}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, url: str) -> Union[LinkStatus, None]:
+        item = self._items.get(url)
+        if item is None:
+            return None
+        expires, status = item
+        if expires <= time.monotonic():
+            del self._items[url]
+            return None
+        return status
+
+    def set(self, status: LinkStatus) -> None:
+        ttl = self.ttl if status.ok else self.error_ttl
+        self._items[status.url] = (time.monotonic() + ttl, status)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+
+class LinkChecker:
+    """Checks links asynchronously with a connection pool per host.
+
+    Every host gets its own keep-alive client limited to `per_host`
+    concurrent requests, so one slow site does not hold the others up.
+    A link is requested with HEAD first and with GET when the server
+    rejects HEAD. Checks of the same link are shared while in flight and
+    their results are kept in `cache` for the next documents.
+    """
+
+    def __init__(
+        self,
+        per_host: int = 4,
+        timeout: float = 10.0,
+        max_redirects: int = 10,
+        cache: Union[LinkCache, None] = None,
+        user_agent: str = "docs-link-checker",
+    ) -> None:
+        self.per_host = per_host
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self.cache = cache if cache is not None else LinkCache()
+        self.user_agent = user_agent
+        self._clients: dict[str, httpx.AsyncClient] = {}
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self._running: dict[str, asyncio.Future] = {}
+
+    async def __aenter__(self) -> "LinkChecker":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        clients = list(self._clients.values())
+        self._clients.clear()
+        self._semaphores.clear()
+        for client in clients:
+            await client.aclose()
+
+    def _client(self, host: str) -> tuple[httpx.AsyncClient, asyncio.Semaphore]:
+        client = self._clients.get(host)
+        if client is None:
+            limits = httpx.Limits(
+                max_connections=self.per_host, max_keepalive_connections=self.per_host
+            )
+            client = self._clients[host] = httpx.AsyncClient(
+                limits=limits,
+                timeout=self.timeout,
+                follow_redirects=True,
+                max_redirects=self.max_redirects,
+                headers={"User-Agent": self.user_agent},
+            )
+            self._semaphores[host] = asyncio.Semaphore(self.per_host)
+        return client, self._semaphores[host]
+
+    async def _request(
+        self, client: httpx.AsyncClient, method: str, url: str
+    ) -> httpx.Response:
+        start = time.perf_counter()
+        # Тело ответа на GET не читается: важен только код ответа
+        async with client.stream(method, url) as response:
+            instrumentation.observe(
+                "link_check_seconds", time.perf_counter() - start, method=method
+            )
+            return response
+
+    async def _check(self, url: str) -> LinkStatus:
+        method = None
+        try:
+            client, semaphore = self._client(urlsplit(url).netloc)
+            async with semaphore:
+                method = "HEAD"
+                response = await self._request(client, method, url)
+                if response.status_code in HEAD_UNSUPPORTED:
+                    method = "GET"
+                    response = await self._request(client, method, url)
+        except Exception as e:
+            # Некорректный адрес ломает одну проверку, а не весь документ
+            return LinkStatus(url, method=method, error=f"{type(e).__name__}: {e}")
+
+        return LinkStatus(
+            url,
+            response.status_code,
+            str(response.url),
+            len(response.history),
+            method,
+        )
+
+    async def check(self, url: str) -> LinkStatus:
+        """Check one normalised http(s) link, using the cache when possible."""
+        status = self.cache.get(url)
+        if status is not None:
+            instrumentation.increment("link_cache_hits_total")
+            return status
+        try:
+            scheme = urlsplit(url).scheme
+        except ValueError as e:
+            return LinkStatus(url, error=f"{type(e).__name__}: {e}")
+        if scheme not in DEFAULT_PORTS:
+            return LinkStatus(url, error="Ссылка не ведёт на http(s) адрес")
+
+        future = self._running.get(url)
+        if future is None:
+            future = asyncio.ensure_future(self._check(url))
+            self._running[url] = future
+            future.add_done_callback(lambda done: self._finish(url, done))
+        return await asyncio.shield(future)
+
+    def _finish(self, url: str, future: asyncio.Future) -> None:
+        self._running.pop(url, None)
+        if not future.cancelled() and future.exception() is None:
+            self.cache.set(future.result())
+
+    async def check_all(self, urls: Iterable[str]) -> dict[str, LinkStatus]:
+        """Check distinct links concurrently, keyed by their normalised form."""
+        unique = list(dict.fromkeys(normalize_url(url) for url in urls))
+        statuses = await asyncio.gather(*(self.check(url) for url in unique))
+        return dict(zip(unique, statuses))
+
+    async def check_links(self, links: list[Link]) -> list[tuple[Link, LinkStatus]]:
+        """Check the links of a document, e.g. `Document.links`."""
+        statuses = await self.check_all(link.url for link in links)
+        return [(link, statuses[link.url]) for link in links]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Проверка ссылок документов")
+    parser.add_argument("paths", nargs="+", help="сохранённые JSON документов")
+    parser.add_argument("--per-host", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    args = parser.parse_args()
+
+    async def main() -> None:
+        # Один кэш на все документы: общие ссылки проверяются один раз
+        async with LinkChecker(args.per_host, args.timeout) as checker:
+            for path in args.paths:
+                with open(path, encoding="utf-8") as f:
+                    document = Document(json.load(f))
+                for link, status in await checker.check_links(document.links):
+                    result = status.to_dict()
+                    result["source"] = path
+                    result["locations"] = len(link.locations)
+                    print(json.dumps(result, ensure_ascii=False))
+
+    asyncio.run(main())
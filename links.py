@@ -0,0 +1,158 @@
+from typing import Any, Union
+from urllib.parse import urlsplit, urlunsplit
+
+from walker import collect_element_urls
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a link used to find duplicates.
+
+    The scheme and host are lowercased, the host is IDNA-encoded, the
+    default port and the fragment are dropped and an empty path becomes
+    `/`. Links that are not http(s) are only stripped of whitespace.
+    """
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return url
+
+    host = parts.hostname.lower()
+    try:
+        host = host.encode("idna").decode("ascii")
+    except UnicodeError:
+        pass
+    if ":" in host:
+        host = f"[{host}]"
+    netloc = host if port in (None, DEFAULT_PORTS[scheme]) else f"{host}:{port}"
+    if parts.username is not None:
+        userinfo = parts.netloc.rpartition("@")[0]
+        netloc = f"{userinfo}@{netloc}"
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+
+
+class LinkLocation:
+    """Place of a link: top-level element, table cell and index range."""
+
+    __slots__ = ("element", "row", "column", "start_index", "end_index")
+
+    def __init__(
+        self,
+        element: Union[int, None],
+        row: Union[int, None],
+        column: Union[int, None],
+        start_index: Union[int, None],
+        end_index: Union[int, None],
+    ) -> None:
+        self.element = element
+        self.row = row
+        self.column = column
+        self.start_index = start_index
+        self.end_index = end_index
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class Link:
+    """Unique normalised link of a document and every place it appears."""
+
+    __slots__ = ("url", "original", "locations")
+
+    def __init__(self, url: str, original: str) -> None:
+        self.url = url
+        self.original = original
+        self.locations: list[LinkLocation] = []
+
+    def add(self, location: LinkLocation) -> None:
+        last = self.locations[-1] if self.locations else None
+        # Ссылка из нескольких текстовых фрагментов с разным стилем — одно место
+        if (
+            last is not None
+            and last.end_index is not None
+            and last.end_index == location.start_index
+            and (last.element, last.row, last.column)
+            == (location.element, location.row, location.column)
+        ):
+            last.end_index = location.end_index
+        else:
+            self.locations.append(location)
+
+    def to_dict(self) -> dict:
+        return {
+            "url": self.url,
+            "original": self.original,
+            "locations": [location.to_dict() for location in self.locations],
+        }
+
+
+def collect_links(element: Any, row: Union[int, None] = None) -> list[Link]:
+    """Deduplicate the links of `body.content` or of a table row, in order.
+
+    Locations point to the top-level element and, inside a table, to the
+    row and column of its top-level cell; nested tables report the cell
+    that contains them. For a table row, `row` is its index in the table.
+    """
+    links: dict[str, Link] = {}
+    stack: list[tuple[dict, Union[int, None], Union[int, None], Union[int, None]]] = []
+
+    if isinstance(element, dict) and "tableCells" in element:
+        for column, cell in reversed(list(enumerate(element["tableCells"]))):
+            for item in reversed(cell.get("content", [])):
+                stack.append((item, None, row, column))
+    elif isinstance(element, list):
+        for number, item in reversed(list(enumerate(element))):
+            stack.append((item, number, None, None))
+
+    while stack:
+        node, number, row_index, column = stack.pop()
+
+        paragraph = node.get("paragraph")
+        if paragraph is not None:
+            for paragraph_element in paragraph.get("elements", []):
+                urls: list[str] = []
+                collect_element_urls(paragraph_element, urls)
+                for url in urls:
+                    key = normalize_url(url)
+                    link = links.get(key)
+                    if link is None:
+                        link = links[key] = Link(key, url)
+                    link.add(
+                        LinkLocation(
+                            number,
+                            row_index,
+                            column,
+                            paragraph_element.get("startIndex"),
+                            paragraph_element.get("endIndex"),
+                        )
+                    )
+            continue
+
+        table = node.get("table")
+        if table is not None:
+            rows = list(enumerate(table.get("tableRows", [])))
+            for index, table_row in reversed(rows):
+                cells = list(enumerate(table_row.get("tableCells", [])))
+                for cell_column, cell in reversed(cells):
+                    # Во вложенной таблице остаётся ячейка внешней
+                    place = (
+                        (row_index, column)
+                        if row_index is not None
+                        else (index, cell_column)
+                    )
+                    for item in reversed(cell.get("content", [])):
+                        stack.append((item, number, *place))
+            continue
+
+        table_of_contents = node.get("tableOfContents")
+        if table_of_contents is not None:
+            for item in reversed(table_of_contents.get("content", [])):
+                stack.append((item, number, row_index, column))
+
+    return list(links.values())
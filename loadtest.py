@@ -0,0 +1,208 @@
+import argparse
+import asyncio
+import json
+import random
+import socket
+import threading
+import time
+from collections import Counter
+from typing import Union
+
+import httpx
+import uvicorn
+
+from batch import percentile
+from docgen import DocSpec, generate_document
+from fake_google import FakeGoogleServer, fake_google_api, fake_reader
+from instrumentation import instrumentation
+from server import DocumentService, create_app
+
+KINDS = ("analyse", "analyse_document", "write")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _load(
+    url: str,
+    documents: dict[str, dict],
+    requests: int,
+    concurrency: int,
+    mix: dict[str, float],
+    hot: int,
+    seed: int,
+) -> list[tuple[str, int, float]]:
+    rng = random.Random(seed)
+    ids = list(documents)
+    # Часть запросов приходится на несколько популярных документов
+    hot_ids = ids[:hot]
+    bodies = {
+        document_id: json.dumps(document, ensure_ascii=False).encode("utf-8")
+        for document_id, document in documents.items()
+    }
+    plan = rng.choices(list(mix), weights=list(mix.values()), k=requests)
+    queue: asyncio.Queue = asyncio.Queue()
+    for kind in plan:
+        queue.put_nowait(kind)
+    samples: list[tuple[str, int, float]] = []
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        while not queue.empty():
+            kind = queue.get_nowait()
+            document_id = rng.choice(hot_ids if rng.random() < 0.5 else ids)
+            start = time.perf_counter()
+            if kind == "analyse":
+                response = await client.post(
+                    "/analyse", json={"document_ids": [document_id]}
+                )
+            elif kind == "analyse_document":
+                response = await client.post(
+                    "/analyse/document", content=bodies[document_id]
+                )
+            else:
+                response = await client.post(
+                    "/write",
+                    json={"document": documents[document_id], "title": document_id},
+                )
+            samples.append((kind, response.status_code, time.perf_counter() - start))
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=120) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return samples
+
+
+def summarise(samples: list[tuple[str, int, float]], seconds: float) -> dict:
+    """Throughput, status codes and tail latency of successful requests."""
+    summary: dict = {"seconds": seconds}
+    for kind in ("all",) + KINDS:
+        selected = [sample for sample in samples if kind in ("all", sample[0])]
+        if not selected:
+            continue
+        latencies = [latency for _, status, latency in selected if status == 200]
+        summary[kind] = {
+            "requests": len(selected),
+            "statuses": dict(Counter(status for _, status, _ in selected)),
+            "requests_per_second": len(latencies) / (seconds or 1e-9),
+            "p50_latency_seconds": percentile(latencies, 50),
+            "p95_latency_seconds": percentile(latencies, 95),
+            "p99_latency_seconds": percentile(latencies, 99),
+        }
+    return summary
+
+
+def run(
+    documents: int = 20,
+    size: int = 20_000,
+    requests: int = 500,
+    concurrency: int = 32,
+    processes: Union[int, None] = None,
+    max_pending: Union[int, None] = None,
+    mix: Union[dict[str, float], None] = None,
+    hot: int = 3,
+    fake_max_rate: Union[float, None] = None,
+    seed: int = 0,
+) -> dict:
+    """Load-test the service against a local fake Google backend."""
+    generated = {
+        f"doc-{number}": generate_document(DocSpec(size=size, seed=seed + number))
+        for number in range(documents)
+    }
+    mix = mix or {"analyse": 0.6, "analyse_document": 0.3, "write": 0.1}
+
+    instrumentation.enable()
+    instrumentation.reset()
+    with FakeGoogleServer(generated, max_rate=fake_max_rate) as fake:
+        service = DocumentService(
+            fake_reader(fake.url),
+            lambda: fake_google_api(fake.url),
+            processes=processes,
+            max_pending=max_pending,
+        )
+        port = _free_port()
+        server = uvicorn.Server(
+            uvicorn.Config(
+                create_app(service), host="127.0.0.1", port=port, log_level="warning"
+            )
+        )
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.01)
+
+        try:
+            start = time.perf_counter()
+            samples = asyncio.run(
+                _load(
+                    f"http://127.0.0.1:{port}",
+                    generated,
+                    requests,
+                    concurrency,
+                    mix,
+                    hot,
+                    seed,
+                )
+            )
+            summary = summarise(samples, time.perf_counter() - start)
+        finally:
+            server.should_exit = True
+            thread.join()
+
+        summary["backend_requests"] = fake.requests
+        summary["backend_throttled"] = fake.throttled
+
+    counters = {name: value for (name, _), value in instrumentation.counters.items()}
+    summary["coalesced"] = counters.get("service_coalesced_total", 0)
+    summary["rejected"] = counters.get("service_rejected_total", 0)
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Нагрузочный тест HTTP API на локальной имитации Google"
+    )
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--size", type=int, default=20_000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--max-pending", type=int, default=None)
+    parser.add_argument(
+        "--hot", type=int, default=3, help="число популярных документов"
+    )
+    parser.add_argument(
+        "--mix",
+        default="analyse=0.6,analyse_document=0.3,write=0.1",
+        help="доли видов запросов",
+    )
+    parser.add_argument("--fake-max-rate", type=float, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    mix = {}
+    for part in args.mix.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in KINDS:
+            parser.error(f"неизвестный вид запроса: {kind}")
+        mix[kind] = float(weight)
+
+    print(
+        json.dumps(
+            run(
+                documents=args.documents,
+                size=args.size,
+                requests=args.requests,
+                concurrency=args.concurrency,
+                processes=args.processes,
+                max_pending=args.max_pending,
+                mix=mix,
+                hot=args.hot,
+                fake_max_rate=args.fake_max_rate,
+                seed=args.seed,
+            ),
+            indent=2,
+        )
+    )
@@ -1,3 +1,5 @@
+import argparse
+
 from icecream import ic
 
 from document import Document
@@ -5,6 +7,14 @@ from googleapi import GoogleAPI
 
 # 1. Чтение гуглодока (первый ендпоинт) без АПИ. Тестировать будем чисто на сервере во время звонка с тобой. Будем закидывать идентификаторы гуглодока и сверять количество всяких значений. Наверное, только джейсон текста не сможем потестить с точки зрения применимости при вставке
 
+parser = argparse.ArgumentParser(description="Чтение тестового гуглодока")
+parser.add_argument(
+    "--write-copy",
+    action="store_true",
+    help="записать прочитанный документ в новый гуглодок",
+)
+args = parser.parse_args()
+
 credentials_file = "credentials.json"
 google_api = GoogleAPI(credentials_file)
 
@@ -20,6 +30,14 @@ if google_api.authorize():
         # ic(document.plain_text)
         doc.info()
 
+        # 2. Запись JSON прочитанного документа в новый гуглодок, только по флагу:
+        # каждый запуск создаёт в Drive новый документ
+        if args.write_copy:
+            if new_doc_id := google_api.write_document(doc):
+                ic(f"https://docs.google.com/document/d/{new_doc_id}/edit")
+            else:
+                ic(google_api.last_error)
+
 else:
     ic("Ошибка авторизации.")
 
@@ -27,62 +45,3 @@ else:
 # 2. Запись в гуглодок (второй ендпоинт) без АПИ. Также на звонке симулируем вызов чтения, возьмем оттуда джейсом, сделаем запись в гуглодок новый или существующий этого джейсона
 
 # 3. Два метода АПИ. Тут я уже смогу асинхронно тестировать, дергая ручки
-
-# from datetime import datetime
-
-# from google.oauth2 import service_account
-# from googleapiclient.discovery import build
-# from icecream import ic
-
-# # Путь к файлу с учетными данными
-# credentials_file = "credentials.json"
-
-# # Создаем объект учетных данных
-# credentials = service_account.Credentials.from_service_account_file(
-#     credentials_file,
-#     scopes=[
-#         "https://www.googleapis.com/auth/documents",
-#         "https://www.googleapis.com/auth/drive",
-#     ],
-# )
-
-# # Создаем объекты API для работы с Google Docs и Google Drive
-# docs_service = build("docs", "v1", credentials=credentials)
-# drive_service = build("drive", "v3", credentials=credentials)
-
-# # Форматируем текущую дату и время в нужный формат
-# formatted_datetime = datetime.now().strftime("%Y.%m.%d %H:%M:%S")
-
-# # Создаем новый документ с именем в формате YYYY.MM.DD HH:mm:ss
-# document = docs_service.documents().create(body={"title": formatted_datetime}).execute()
-# document_id = document["documentId"]
-
-# # Добавляем текст в документ
-# requests = [
-#     {
-#         "insertText": {
-#             "location": {
-#                 "index": 1,
-#             },
-#             "text": "Привет, мир!",
-#         },
-#     },
-# ]
-
-# docs_service.documents().batchUpdate(
-#     documentId=document_id, body={"requests": requests}
-# ).execute()
-
-# # Добавляем разрешения для доступа всем по ссылке
-# drive_service.permissions().create(
-#     fileId=document_id,
-#     body={
-#         "role": "reader",
-#         "type": "anyone",
-#     },
-#     fields="id",
-# ).execute()
-
-# print(
-#     f"Документ создан и доступен по ссылке: https://docs.google.com/document/d/{document_id}/edit"
-# )
@@ -0,0 +1,296 @@
+import asyncio
+import heapq
+import json
+import random
+import sys
+import threading
+import time
+from itertools import count
+from typing import Any, Awaitable, Callable, TypeVar, Union
+
+from instrumentation import instrumentation
+
+T = TypeVar("T")
+
+# Приоритеты запросов: меньше — раньше
+INTERACTIVE = 0
+BULK = 1
+
+# Квоты по умолчанию на пользователя, запросов в секунду
+QUOTAS = {
+    "docs": 300 / 60,
+    "docs_write": 60 / 60,
+    "drive": 12_000 / 60,
+}
+# Запись в Docs ограничена отдельной, более строгой квотой
+WRITE_METHODS = frozenset(("docs.documents.create", "docs.documents.batchUpdate"))
+# Повтор этих вызовов после потерянного ответа выполнил бы их дважды
+NON_IDEMPOTENT_METHODS = frozenset(
+    (
+        "docs.documents.create",
+        "docs.documents.batchUpdate",
+        "drive.files.create",
+        "drive.files.copy",
+        "drive.permissions.create",
+    )
+)
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+# Google сообщает о превышении квоты и кодом 403 с одной из этих причин
+RATE_LIMIT_REASONS = ("rateLimitExceeded", "userRateLimitExceeded")
+
+
+class TokenBucket:
+    """Token bucket limiter that hands tokens out by priority, then in order."""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Union[float, None] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.tokens = self.capacity
+        self._clock = clock
+        self._updated = clock()
+        self._waiting: list[tuple[int, int]] = []
+        self._sequence = count()
+        self._condition = threading.Condition()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def try_acquire(self, amount: float = 1) -> bool:
+        """Take `amount` tokens without blocking if nobody is waiting for them."""
+        amount = min(amount, self.capacity)
+        with self._condition:
+            if self._waiting:
+                return False
+            self._refill()
+            if self.tokens < amount:
+                return False
+            self.tokens -= amount
+            return True
+
+    def acquire(self, amount: float = 1, priority: int = INTERACTIVE) -> None:
+        """Block until `amount` tokens are available for this caller."""
+        amount = min(amount, self.capacity)
+        ticket = (priority, next(self._sequence))
+        with self._condition:
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    self._refill()
+                    if self._waiting[0] != ticket:
+                        # Токены достаются первому в очереди по приоритету
+                        self._condition.wait()
+                    elif self.tokens >= amount:
+                        self.tokens -= amount
+                        return
+                    else:
+                        self._condition.wait((amount - self.tokens) / self.rate)
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._condition.notify_all()
+
+
+def http_error_type() -> type:
+    """`HttpError` of googleapiclient, imported only when an error is handled."""
+    from googleapiclient.errors import HttpError
+
+    return HttpError
+
+
+def _error_response(error: Exception) -> tuple[Union[int, None], bytes, Any]:
+    # Статус, тело и заголовки ответа из ошибки googleapiclient или httpx;
+    # googleapiclient уже загружен, если ошибка пришла из него
+    errors = sys.modules.get("googleapiclient.errors")
+    if errors is not None and isinstance(error, errors.HttpError):
+        return error.resp.status, error.content or b"", error.resp
+    response = getattr(error, "response", None)
+    if response is None:
+        return None, b"", {}
+    return response.status_code, response.content, response.headers
+
+
+def error_status(error: Union[Exception, None]) -> Union[int, None]:
+    """HTTP status of a failed googleapiclient or httpx request, if it has one."""
+    return None if error is None else _error_response(error)[0]
+
+
+def _is_connection_error(error: Exception) -> bool:
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    # httpx уже загружен, если ошибка пришла из него
+    httpx = sys.modules.get("httpx")
+    return httpx is not None and isinstance(error, httpx.TransportError)
+
+
+def is_throttled(error: Exception) -> bool:
+    """Whether the request was rejected by a quota and so never executed."""
+    status, content, _ = _error_response(error)
+    if status == 429:
+        return True
+    return status == 403 and any(
+        reason.encode("utf-8") in content for reason in RATE_LIMIT_REASONS
+    )
+
+
+def is_retryable(error: Exception, idempotent: bool = True) -> bool:
+    """Whether a failed request may be sent again.
+
+    A server error or a lost connection leaves it unknown whether the request
+    was executed, so only idempotent requests are retried after them.
+    """
+    if is_throttled(error):
+        return True
+    if not idempotent:
+        return False
+    status = error_status(error)
+    if status is not None:
+        return status in RETRY_STATUSES
+    return _is_connection_error(error)
+
+
+def is_idempotent(method: str, body: Union[dict, None] = None) -> bool:
+    """Whether repeating a request with this method and body is harmless.
+
+    A `batchUpdate` guarded by `requiredRevisionId` is safe: if the first
+    attempt was applied, the repeat is rejected as a stale revision.
+    """
+    if method == "docs.documents.batchUpdate":
+        return bool((body or {}).get("writeControl", {}).get("requiredRevisionId"))
+    return method not in NON_IDEMPOTENT_METHODS
+
+
+class RequestScheduler:
+    """Rate limits, prioritises and retries API requests of all clients.
+
+    Each quota (`docs`, `docs_write`, `drive`) has its own token bucket
+    matching the per-user limit. Throttled and failed requests (429, 5xx) are
+    retried with full jitter exponential backoff, honouring `Retry-After`
+    when it is given; writes that may have been applied are not repeated.
+    """
+
+    def __init__(
+        self,
+        quotas: Union[dict[str, float], None] = None,
+        max_retries: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 32.0,
+        sleep: Callable[[float], None] = time.sleep,
+        async_sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ) -> None:
+        self.buckets = {
+            service: TokenBucket(rate) for service, rate in (quotas or QUOTAS).items()
+        }
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.async_sleep = async_sleep
+        self._random = random.Random()
+
+    def acquire(self, service: str, amount: float = 1, priority=INTERACTIVE) -> None:
+        bucket = self.buckets.get(service)
+        if bucket is not None:
+            bucket.acquire(amount, priority)
+
+    def backoff(self, attempt: int, error: Union[Exception, None] = None) -> float:
+        """Delay before the retry number `attempt`, counting from zero."""
+        delay = self._random.uniform(
+            0, min(self.max_delay, self.base_delay * 2**attempt)
+        )
+        if error is not None:
+            retry_after = _error_response(error)[2].get("retry-after")
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+        return delay
+
+    def execute(
+        self,
+        call: Callable[[], T],
+        service: str,
+        method: str = "",
+        priority: int = INTERACTIVE,
+        amount: float = 1,
+        idempotent: bool = True,
+    ) -> T:
+        """Run `call` within the quota of `service`, retrying throttled calls.
+
+        Calls that are not `idempotent` are retried only when throttled. The
+        last error is raised with the number of retries made stored in its
+        `retries` attribute.
+        """
+        attempt = 0
+        while True:
+            self.acquire(service, amount, priority)
+            try:
+                return call()
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e, idempotent):
+                    e.retries = attempt
+                    raise
+                self.sleep(self.backoff(attempt, e))
+                attempt += 1
+                instrumentation.increment("api_retries_total", method=method)
+
+    async def acquire_async(
+        self, service: str, amount: float = 1, priority=INTERACTIVE
+    ) -> None:
+        """`acquire` for coroutines: only a caller that must wait uses a thread."""
+        bucket = self.buckets.get(service)
+        if bucket is not None and not bucket.try_acquire(amount):
+            await asyncio.to_thread(bucket.acquire, amount, priority)
+
+    async def execute_async(
+        self,
+        call: Callable[[], Awaitable[T]],
+        service: str,
+        method: str = "",
+        priority: int = INTERACTIVE,
+        amount: float = 1,
+        idempotent: bool = True,
+    ) -> T:
+        """Await `call` under the same quotas and retry policy as `execute`."""
+        attempt = 0
+        while True:
+            await self.acquire_async(service, amount, priority)
+            try:
+                return await call()
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e, idempotent):
+                    e.retries = attempt
+                    raise
+                await self.async_sleep(self.backoff(attempt, e))
+                attempt += 1
+                instrumentation.increment("api_retries_total", method=method)
+
+
+def request_is_idempotent(request: Any) -> bool:
+    """`is_idempotent` for a googleapiclient request."""
+    body = None
+    if request.methodId == "docs.documents.batchUpdate" and request.body:
+        body = json.loads(request.body)
+    return is_idempotent(request.methodId, body)
+
+
+def method_service(method: str) -> str:
+    """Quota (`docs`, `docs_write` or `drive`) of a method like `drive.files.get`."""
+    if method in WRITE_METHODS:
+        return "docs_write"
+    return method.split(".", 1)[0]
+
+
+def service_of(request: Any) -> str:
+    """Quota a googleapiclient request uses, see `method_service`."""
+    return method_service(request.methodId)
+
+
+# Общий планировщик всех клиентов процесса: квоты считаются на пользователя
+default_scheduler = RequestScheduler()
@@ -0,0 +1,331 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Hashable, TypeVar, Union
+
+import httpx
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from async_googleapi import AsyncGoogleAPI
+from batch import analyse
+from document import Document
+from googleapi import GoogleAPI, per_thread
+from instrumentation import instrumentation
+
+T = TypeVar("T")
+
+
+class Overloaded(Exception):
+    """More work is pending than the service accepts."""
+
+
+class TooLarge(Exception):
+    """One request holds more tasks than the service ever queues."""
+
+
+class Coalescer:
+    """Runs one task per key at a time; concurrent callers share its result."""
+
+    def __init__(self) -> None:
+        self._running: dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._running)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._running
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        future = self._running.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._running[key] = future
+            future.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            instrumentation.increment("service_coalesced_total")
+        # Отмена одного ожидающего клиента не отменяет общую задачу
+        return await asyncio.shield(future)
+
+    def _finish(self, key: Hashable, future: asyncio.Future) -> None:
+        self._running.pop(key, None)
+        if not future.cancelled():
+            # Ошибка уже получена ожидающими или больше никому не нужна
+            future.exception()
+
+
+class DocumentService:
+    """Reads, analyses and writes documents for the HTTP endpoints.
+
+    Analysis runs in a bounded process pool and writes in a bounded thread
+    pool, so the event loop only moves bytes. Identical concurrent requests
+    share one task, and at most `max_pending` tasks of each kind are
+    queued: beyond that requests are rejected with 429, and requests that
+    alone hold more than `max_pending` tasks with 413.
+    """
+
+    def __init__(
+        self,
+        reader: AsyncGoogleAPI,
+        writer_factory: Callable[[], GoogleAPI],
+        processes: Union[int, None] = None,
+        write_workers: int = 4,
+        max_pending: Union[int, None] = None,
+    ) -> None:
+        self.reader = reader
+        self.writer_factory = writer_factory
+        self.processes = processes or os.cpu_count() or 1
+        self.write_workers = write_workers
+        self.max_pending = max_pending or self.processes * 4
+
+        self.analyses = Coalescer()
+        self.writes = Coalescer()
+        self._google_api = per_thread(writer_factory)
+        self._workers: Union[ProcessPoolExecutor, None] = None
+        self._writers: Union[ThreadPoolExecutor, None] = None
+
+    def start(self) -> None:
+        self._workers = ProcessPoolExecutor(self.processes)
+        self._writers = ThreadPoolExecutor(self.write_workers)
+
+    async def stop(self) -> None:
+        for pool in (self._workers, self._writers):
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+        await self.reader.aclose()
+
+    def _admit(self, coalescer: Coalescer, keys: list[Hashable]) -> None:
+        new = len({key for key in keys if key not in coalescer})
+        if new > self.max_pending:
+            # Такой запрос не пройдёт и на простаивающем сервисе: повтор бесполезен
+            instrumentation.increment("service_too_large_total")
+            raise TooLarge()
+        if new and len(coalescer) + new > self.max_pending:
+            instrumentation.increment("service_rejected_total")
+            raise Overloaded()
+
+    async def _analyse(
+        self,
+        source: str,
+        payload: Union[bytes, None],
+        count_emoji: bool,
+        first_table_only: bool,
+    ) -> dict:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._workers, analyse, source, payload, count_emoji, first_table_only
+        )
+
+    async def _fetch_and_analyse(
+        self, document_id: str, count_emoji: bool, first_table_only: bool
+    ) -> dict:
+        try:
+            payload = await self.reader.get_document_bytes(document_id)
+        except httpx.HTTPStatusError as e:
+            return {
+                "source": document_id,
+                "error": f"Ошибка при получении документа: {e}",
+                "status": e.response.status_code,
+                "retries": getattr(e, "retries", 0),
+            }
+        except httpx.HTTPError as e:
+            return {
+                "source": document_id,
+                "error": f"{type(e).__name__}: {e}",
+                "retries": getattr(e, "retries", 0),
+            }
+        return await self._analyse(document_id, payload, count_emoji, first_table_only)
+
+    async def analyse_ids(
+        self, document_ids: list[str], count_emoji=False, first_table_only=False
+    ) -> list[dict]:
+        """Fetch and analyse documents, one task per distinct document."""
+        keys = [("id", id_, count_emoji, first_table_only) for id_ in document_ids]
+        self._admit(self.analyses, keys)
+        return list(
+            await asyncio.gather(
+                *(
+                    self.analyses.run(
+                        key,
+                        lambda id_=key[1]: self._fetch_and_analyse(
+                            id_, count_emoji, first_table_only
+                        ),
+                    )
+                    for key in keys
+                )
+            )
+        )
+
+    async def analyse_document(
+        self, payload: bytes, count_emoji=False, first_table_only=False
+    ) -> dict:
+        """Analyse raw Docs JSON; the bytes are parsed only in a worker process."""
+        digest = hashlib.sha1(payload).hexdigest()
+        key = ("document", digest, count_emoji, first_table_only)
+        self._admit(self.analyses, [key])
+        return await self.analyses.run(
+            key,
+            lambda: self._analyse(digest, payload, count_emoji, first_table_only),
+        )
+
+    def _write(self, body: bytes) -> dict:
+        request = json.loads(body)
+        if not isinstance(request, dict) or not isinstance(
+            request.get("document"), dict
+        ):
+            raise ValueError('Ожидается JSON вида {"document": {...}}')
+        document = Document(request["document"])
+        google_api = self._google_api()
+        document_id = google_api.write_document(
+            document, request.get("document_id"), request.get("title")
+        )
+        if document_id is None:
+            error = google_api.last_error
+            return {
+                "error": error.message if error else "Документ не записан",
+                "status": error.status if error else None,
+            }
+        return {"document_id": document_id}
+
+    async def write(self, body: bytes) -> dict:
+        """Write a document from a `/write` request body, parsed in a thread."""
+        key = hashlib.sha1(body).hexdigest()
+        self._admit(self.writes, [key])
+        loop = asyncio.get_running_loop()
+        return await self.writes.run(
+            key, lambda: loop.run_in_executor(self._writers, self._write, body)
+        )
+
+
+def _flag(request: Request, name: str) -> bool:
+    return request.query_params.get(name, "").lower() in ("1", "true", "yes")
+
+
+def _overloaded() -> JSONResponse:
+    return JSONResponse(
+        {"error": "Сервис перегружен, повторите запрос позже"},
+        status_code=429,
+        headers={"Retry-After": "1"},
+    )
+
+
+def _too_large(service: DocumentService) -> JSONResponse:
+    return JSONResponse(
+        {
+            "error": "В запросе больше документов, чем сервис принимает за раз: "
+            f"не больше {service.max_pending}"
+        },
+        status_code=413,
+    )
+
+
+def create_app(service: DocumentService) -> Starlette:
+    """HTTP API over the service: `/analyse`, `/analyse/document`, `/write`.
+
+    `/analyse` takes document IDs and `/analyse/document` raw Docs JSON: a
+    separate route lets the raw body go to a worker process unparsed.
+    """
+
+    async def analyse_ids(request: Request) -> JSONResponse:
+        try:
+            body = await request.json()
+            document_ids = body["document_ids"]
+            if not isinstance(document_ids, list) or not all(
+                isinstance(document_id, str) for document_id in document_ids
+            ):
+                raise TypeError(document_ids)
+        except (ValueError, KeyError, TypeError):
+            return JSONResponse(
+                {"error": 'Ожидается JSON вида {"document_ids": ["...", ...]}'},
+                status_code=400,
+            )
+        try:
+            results = await service.analyse_ids(
+                document_ids,
+                bool(body.get("count_emoji")),
+                bool(body.get("first_table_only")),
+            )
+        except Overloaded:
+            return _overloaded()
+        except TooLarge:
+            return _too_large(service)
+        return JSONResponse({"results": results})
+
+    async def analyse_document(request: Request) -> JSONResponse:
+        try:
+            result = await service.analyse_document(
+                await request.body(),
+                _flag(request, "count_emoji"),
+                _flag(request, "first_table_only"),
+            )
+        except Overloaded:
+            return _overloaded()
+        return JSONResponse(result, status_code=400 if "error" in result else 200)
+
+    async def write(request: Request) -> JSONResponse:
+        try:
+            result = await service.write(await request.body())
+        except Overloaded:
+            return _overloaded()
+        except (ValueError, KeyError, TypeError) as e:
+            return JSONResponse(
+                {"error": f"Некорректный запрос: {type(e).__name__}: {e}"},
+                status_code=400,
+            )
+        return JSONResponse(result, status_code=502 if "error" in result else 200)
+
+    async def metrics(request: Request) -> PlainTextResponse:
+        return PlainTextResponse(instrumentation.to_prometheus())
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette) -> AsyncIterator[None]:
+        service.start()
+        try:
+            yield
+        finally:
+            await service.stop()
+
+    return Starlette(
+        routes=[
+            Route("/analyse", analyse_ids, methods=["POST"]),
+            Route("/analyse/document", analyse_document, methods=["POST"]),
+            Route("/write", write, methods=["POST"]),
+            Route("/metrics", metrics, methods=["GET"]),
+        ],
+        lifespan=lifespan,
+    )
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="HTTP API чтения и записи документов")
+    parser.add_argument("--credentials", default="credentials.json")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--write-workers", type=int, default=4)
+    parser.add_argument("--max-pending", type=int, default=None)
+    args = parser.parse_args()
+
+    def writer_factory() -> GoogleAPI:
+        google_api = GoogleAPI(args.credentials)
+        google_api.authorize()
+        return google_api
+
+    reader = AsyncGoogleAPI(args.credentials)
+    reader.authorize()
+    service = DocumentService(
+        reader,
+        writer_factory,
+        processes=args.processes,
+        write_workers=args.write_workers,
+        max_pending=args.max_pending,
+    )
+    uvicorn.run(create_app(service), host=args.host, port=args.port)
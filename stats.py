@@ -0,0 +1,33 @@
+from emoji_counter import EmojiCounter
+from tokenizer import WordSplitter
+
+
+class TextStats:
+    """Text metrics accumulated from consecutive text runs of one document.
+
+    After `close()` the counts equal the ones `Document` computes from the
+    joined `raw_content`, but the joined text is never built.
+    """
+
+    def __init__(self, count_emoji: bool = False) -> None:
+        self.characters = 0
+        self.characters_without_spaces = 0
+        self.word_count = 0
+        self.emoji_count = 0
+
+        self._words = WordSplitter()
+        self._emoji = EmojiCounter() if count_emoji else None
+
+    def feed(self, run: str) -> None:
+        characters = len(run) - run.count("\n")
+        self.characters += characters
+        self.characters_without_spaces += characters - run.count(" ")
+        self.word_count += len(self._words.feed(run))
+        if self._emoji is not None:
+            self._emoji.feed(run.replace("\n", ""))
+
+    def close(self) -> "TextStats":
+        self.word_count += len(self._words.close())
+        if self._emoji is not None:
+            self.emoji_count = self._emoji.close()
+        return self
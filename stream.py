@@ -0,0 +1,136 @@
+from typing import IO, Union
+
+import ijson
+
+from compact import RUN_TABLE, RUN_TEXT, CompactText
+from stats import TextStats
+
+# Флаги уровня вложенности
+_IN_DATA = 1
+_IN_TABLE = 2
+_IN_IMAGE = 4
+_INHERITED = _IN_DATA | _IN_TABLE | _IN_IMAGE
+
+# Отметки отдельных узлов
+_ROOT = 8
+_BODY = 16
+_INLINE_OBJECTS = 32
+_FIRST_TABLE = 64
+_TABLE_ROWS = 128
+
+
+class _Frame:
+    __slots__ = ("is_map", "key", "index", "flags")
+
+    def __init__(self, is_map: bool, flags: int) -> None:
+        self.is_map = is_map
+        self.key: Union[str, None] = None
+        self.index = 0
+        self.flags = flags
+
+
+class StreamScan:
+    """Document metrics counted from Docs JSON parsing events."""
+
+    def __init__(self, count_emoji: bool = False) -> None:
+        self.text = TextStats(count_emoji)
+        self.urls: list[str] = []
+        self.table_count = 0
+        # Изображения внутри анализируемых данных и объекты из inlineObjects
+        self.image_elements = 0
+        self.inline_objects = 0
+        self.data_found = False
+
+
+def scan_stream(
+    fp: Union[IO[bytes], IO[str]],
+    count_emoji=False,
+    first_table_only=False,
+    compact: Union[CompactText, None] = None,
+) -> StreamScan:
+    """Count text runs, images, URLs and tables as JSON parsing events arrive.
+
+    Only one string token is held in memory at a time, so memory use does not
+    grow with the document size. The counts follow the generic walker: the
+    analysed data is `body.content`, or the second row of the first table
+    when `first_table_only` is set.
+
+    With `compact` the text runs, images and links of the analysed data are
+    also kept in it, and the text metrics are counted from its columns.
+    """
+    scan = StreamScan(count_emoji)
+    stack: list[_Frame] = []
+
+    for event, value in ijson.basic_parse(fp, use_float=True):
+        if event == "map_key":
+            frame = stack[-1]
+            frame.key = value
+            if frame.flags & _INLINE_OBJECTS:
+                scan.inline_objects += 1
+            continue
+
+        if event in ("end_map", "end_array"):
+            stack.pop()
+            continue
+
+        # Начало значения: определить, чем оно является для родителя
+        if not stack:
+            parent_flags, key, index = _ROOT, None, 0
+        else:
+            parent = stack[-1]
+            parent_flags, key, index = parent.flags, parent.key, parent.index
+            if not parent.is_map:
+                parent.index += 1
+
+        flags = parent_flags & _INHERITED
+
+        if event == "start_map":
+            if not stack:
+                flags |= _ROOT
+            elif key is not None and stack[-1].is_map:
+                if key == "body" and parent_flags & _ROOT:
+                    flags |= _BODY
+                elif key == "inlineObjects" and parent_flags & _ROOT:
+                    flags |= _INLINE_OBJECTS
+                elif key == "table" and not flags & _IN_TABLE:
+                    if first_table_only or flags & _IN_DATA:
+                        scan.table_count += 1
+                    if first_table_only and scan.table_count == 1:
+                        flags |= _FIRST_TABLE
+                    flags |= _IN_TABLE
+                elif key == "inlineObjectElement" and not flags & _IN_IMAGE:
+                    if flags & _IN_DATA:
+                        scan.image_elements += 1
+                    flags |= _IN_IMAGE
+            elif parent_flags & _TABLE_ROWS and index == 1:
+                flags |= _IN_DATA
+                scan.data_found = True
+            stack.append(_Frame(True, flags))
+
+        elif event == "start_array":
+            if key == "content" and parent_flags & _BODY and not first_table_only:
+                flags |= _IN_DATA
+                scan.data_found = True
+            elif key == "tableRows" and parent_flags & _FIRST_TABLE:
+                flags |= _TABLE_ROWS
+            stack.append(_Frame(False, flags))
+
+        elif event == "string" and flags & _IN_DATA and stack and stack[-1].is_map:
+            if key == "content":
+                if compact is None:
+                    scan.text.feed(value)
+                else:
+                    compact.append(value, RUN_TABLE if flags & _IN_TABLE else RUN_TEXT)
+            elif key == "url":
+                scan.urls.append(value)
+                if compact is not None:
+                    compact.add_link(value)
+            elif key == "inlineObjectId" and compact is not None:
+                if flags & _IN_IMAGE:
+                    compact.add_image(value)
+
+    if compact is None:
+        scan.text.close()
+    else:
+        scan.text = compact.close().stats(count_emoji)
+    return scan
@@ -0,0 +1,190 @@
+from typing import Any, Callable, Union
+
+from emoji_counter import emoji_count
+from tokenizer import split_words
+from walker import DocumentWalk, walk_structure
+
+
+class TableMetrics:
+    """Counters of a table cell or of a row, column or table of cells.
+
+    Characters, images and URLs are known right away; words and emoji need
+    the text to be tokenized or scanned and are counted on first access.
+    """
+
+    __slots__ = (
+        "text",
+        "characters",
+        "characters_without_spaces",
+        "images",
+        "urls",
+        "_count_emoji",
+        "_words",
+        "_emoji",
+    )
+
+    def __init__(
+        self, text: str, images: int, urls: list[str], count_emoji: bool
+    ) -> None:
+        newlines = text.count("\n")
+        self.text = text
+        self.characters = len(text) - newlines
+        self.characters_without_spaces = self.characters - text.count(" ")
+        self.images = images
+        self.urls = urls
+        self._count_emoji = count_emoji
+        self._words: Union[int, None] = None
+        self._emoji: Union[int, None] = None
+
+    @property
+    def words(self) -> int:
+        if self._words is None:
+            self._words = len(split_words(self.text))
+        return self._words
+
+    @property
+    def emoji(self) -> int:
+        if self._emoji is None:
+            self._emoji = (
+                emoji_count(self.text.replace("\n", "")) if self._count_emoji else 0
+            )
+        return self._emoji
+
+    @classmethod
+    def join(cls, parts: list["TableMetrics"], count_emoji: bool) -> "TableMetrics":
+        # Слова и эмодзи считаются заново по общему тексту: они не складываются
+        return cls(
+            "".join(part.text for part in parts),
+            sum(part.images for part in parts),
+            [url for part in parts for url in part.urls],
+            count_emoji,
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "word_count": self.words,
+            "total_characters": self.characters + self.images + self.emoji,
+            "characters_without_spaces": (
+                self.characters_without_spaces + self.images + self.emoji
+            ),
+            "image_count": self.images,
+            "count_emoji": self.emoji,
+            "urls": self.urls,
+        }
+
+
+class TableIndex:
+    """Metrics of every table, row, column and cell of a document.
+
+    Nothing is walked up front: the cells of a row are walked on the first
+    query that needs them, and row, column and table aggregates are built
+    from the cells when first queried. Every result is cached, so repeated
+    queries are dictionary lookups. Tables nested in a cell are counted as
+    part of the cell. Negative numbers of tables, rows and columns count
+    from the end, and numbers out of range raise `IndexError`.
+    """
+
+    def __init__(
+        self,
+        tables: list[dict],
+        walk: Callable[[Any], DocumentWalk] = walk_structure,
+        count_emoji: bool = False,
+    ) -> None:
+        self.tables = tables
+        self.walk = walk
+        self.count_emoji = count_emoji
+        self._positions = {id(table): position for position, table in enumerate(tables)}
+        self._cells: dict[tuple[int, int], list[TableMetrics]] = {}
+        self._rows: dict[tuple[int, int], TableMetrics] = {}
+        self._columns: dict[tuple[int, int], TableMetrics] = {}
+        self._totals: dict[int, TableMetrics] = {}
+
+    def __len__(self) -> int:
+        return len(self.tables)
+
+    def position(self, table: dict) -> int:
+        """Return the number of an indexed table by its JSON object."""
+        return self._positions[id(table)]
+
+    def _row_count(self, table: int) -> int:
+        return len(self.tables[table].get("tableRows", []))
+
+    def _width(self, table: int) -> int:
+        return max(
+            (
+                len(row.get("tableCells", []))
+                for row in self.tables[table].get("tableRows", [])
+            ),
+            default=0,
+        )
+
+    def _checked(self, number: int, count: int, name: str) -> int:
+        # Отрицательные номера считаются с конца, как у списков
+        if not -count <= number < count:
+            raise IndexError(f"Нет такого номера {name}: {number}")
+        return number % count
+
+    def _table(self, table: int) -> int:
+        return self._checked(table, len(self.tables), "таблицы")
+
+    def _row_cells(self, table: int, row: int) -> list[TableMetrics]:
+        row = self._checked(row, self._row_count(table), "строки")
+        cells = self._cells.get((table, row))
+        if cells is None:
+            table_row = self.tables[table]["tableRows"][row]
+            cells = self._cells[table, row] = []
+            for cell in table_row.get("tableCells", []):
+                walked = self.walk(cell.get("content", []))
+                cells.append(
+                    TableMetrics(
+                        walked.text, len(walked.images), walked.urls, self.count_emoji
+                    )
+                )
+        return cells
+
+    def table(self, table: int) -> TableMetrics:
+        table = self._table(table)
+        totals = self._totals.get(table)
+        if totals is None:
+            totals = self._totals[table] = TableMetrics.join(
+                self.rows(table), self.count_emoji
+            )
+        return totals
+
+    def row(self, table: int, row: int) -> TableMetrics:
+        table = self._table(table)
+        row = self._checked(row, self._row_count(table), "строки")
+        metrics = self._rows.get((table, row))
+        if metrics is None:
+            metrics = self._rows[table, row] = TableMetrics.join(
+                self._row_cells(table, row), self.count_emoji
+            )
+        return metrics
+
+    def column(self, table: int, column: int) -> TableMetrics:
+        table = self._table(table)
+        column = self._checked(column, self._width(table), "столбца")
+        metrics = self._columns.get((table, column))
+        if metrics is None:
+            cells = [
+                row_cells[column]
+                for row in range(self._row_count(table))
+                if column < len(row_cells := self._row_cells(table, row))
+            ]
+            metrics = self._columns[table, column] = TableMetrics.join(
+                cells, self.count_emoji
+            )
+        return metrics
+
+    def cell(self, table: int, row: int, column: int) -> TableMetrics:
+        # Строка может быть короче самой широкой строки таблицы
+        cells = self._row_cells(self._table(table), row)
+        return cells[self._checked(column, len(cells), "столбца")]
+
+    def rows(self, table: int) -> list[TableMetrics]:
+        table = self._table(table)
+        return [self.row(table, row) for row in range(self._row_count(table))]
+
+    def columns(self, table: int) -> list[TableMetrics]:
+        table = self._table(table)
+        return [self.column(table, column) for column in range(self._width(table))]
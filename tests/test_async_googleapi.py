@@ -0,0 +1,154 @@
+import asyncio
+import json
+import time
+
+from fake_google import FakeGoogleServer, fake_reader
+from googleapi import Permissions
+from scheduler import RequestScheduler
+
+
+def test_get_files_follows_pages():
+    with FakeGoogleServer() as fake:
+        for number in range(250):
+            fake.files[f"file-{number}"] = {"id": f"file-{number}", "name": str(number)}
+
+        async def main():
+            async with fake_reader(fake.url) as google_api:
+                files, error = await google_api.get_files()
+                assert error is None
+                small_pages = [
+                    file async for file in google_api.iter_files(page_size=40)
+                ]
+            return files, small_pages
+
+        files, small_pages = asyncio.run(main())
+        requests = fake.requests
+
+    expected = [f"file-{number}" for number in range(250)]
+    assert [file["id"] for file in files["files"]] == expected
+    assert [file["id"] for file in small_pages] == expected
+    # Одна страница по умолчанию и семь страниц по 40 файлов
+    assert requests == 1 + 7
+
+
+def _reader(fake, **kwargs):
+    google_api = fake_reader(fake.url)
+    google_api.scheduler = RequestScheduler(quotas={}, **kwargs)
+    return google_api
+
+
+async def _no_wait(seconds):
+    pass
+
+
+def test_reads_are_retried_with_backoff():
+    delays = []
+
+    async def sleep(seconds):
+        delays.append(seconds)
+
+    with FakeGoogleServer({"doc": {"title": "Документ"}}) as fake:
+        fake.inject(429)
+        fake.inject(503)
+
+        async def main():
+            async with _reader(fake, async_sleep=sleep) as google_api:
+                return await google_api.get_document_bytes("doc")
+
+        payload = asyncio.run(main())
+        assert json.loads(payload)["title"] == "Документ"
+        assert fake.requests == 3
+    assert len(delays) == 2
+
+
+def test_failures_are_recorded_instead_of_printed(capsys):
+    with FakeGoogleServer({"doc": {"title": "Документ"}}) as fake:
+        fake.inject(503, 3)
+
+        async def main():
+            async with _reader(fake, async_sleep=_no_wait, max_retries=2) as google_api:
+                document, failed = await google_api.get_document("doc")
+                name, missing = await google_api.get_file_name("missing")
+                return document, failed, name, missing
+
+        document, failed, name, missing = asyncio.run(main())
+
+    assert document is None and name is None
+    assert (failed.method, failed.status, failed.retries) == ("get_document", 503, 2)
+    assert (missing.method, missing.status) == ("get_file_name", 404)
+    assert capsys.readouterr().out == ""
+
+
+def test_concurrent_calls_keep_their_own_errors():
+    with FakeGoogleServer({"doc": {"title": "Документ"}}) as fake:
+
+        async def main():
+            async with _reader(fake, async_sleep=_no_wait) as google_api:
+                return await asyncio.gather(
+                    *(
+                        google_api.get_file_name(file_id)
+                        for file_id in ["doc", "missing", "doc", "gone"] * 5
+                    ),
+                    google_api.delete_file("missing"),
+                )
+
+        *names, deleted = asyncio.run(main())
+
+    for (name, error), file_id in zip(names, ["doc", "missing", "doc", "gone"] * 5):
+        if file_id == "doc":
+            assert (name, error) == ("Документ", None)
+        else:
+            assert name is None and file_id in error.message
+    assert deleted[0] is None and deleted[1].status == 404
+
+
+def test_transport_errors_are_returned():
+    with FakeGoogleServer() as fake:
+        url = fake.url
+    # Сервер остановлен: соединение отклоняется
+
+    async def main():
+        google_api = fake_reader(url)
+        google_api.scheduler = RequestScheduler(
+            quotas={}, async_sleep=_no_wait, max_retries=1
+        )
+        async with google_api:
+            return await google_api.delete_file("doc"), await google_api.get_files()
+
+    (deleted, error), (files, files_error) = asyncio.run(main())
+    assert deleted is None and error.method == "delete_file" and error.status is None
+    assert files is None and files_error.method == "get_files"
+
+
+def test_writes_are_retried_only_when_throttled():
+    with FakeGoogleServer({"doc": {"title": "Документ"}}) as fake:
+
+        async def main(status):
+            fake.inject(status)
+            async with _reader(fake, async_sleep=_no_wait) as google_api:
+                return await google_api.add_permissions(
+                    "doc", "a@example.com", Permissions.READ
+                )
+
+        assert asyncio.run(main(503))[1].status == 503
+        assert fake.requests == 1
+        assert asyncio.run(main(429))[0]["emailAddress"] == "a@example.com"
+        assert fake.requests == 3
+
+
+def test_quota_is_shared_with_waiting_callers():
+    with FakeGoogleServer({"doc": {"title": "Документ"}}) as fake:
+
+        async def main():
+            google_api = fake_reader(fake.url)
+            google_api.scheduler = RequestScheduler(quotas={"docs": 20})
+            async with google_api:
+                start = time.perf_counter()
+                await asyncio.gather(
+                    *(google_api.get_document("doc") for _ in range(30))
+                )
+                return time.perf_counter() - start
+
+        # 20 запросов сразу из запаса, остальные 10 — по 20 в секунду
+        assert asyncio.run(main()) >= 0.4
+        assert fake.requests == 30
@@ -0,0 +1,69 @@
+import json
+import threading
+
+import pytest
+
+from batch import BatchRunner
+from docgen import DocSpec, generate_document
+from document import Document
+from fake_google import FakeGoogleServer, fake_google_api
+from googleapi import per_thread
+
+
+@pytest.fixture()
+def documents():
+    return {
+        f"doc-{number}": generate_document(DocSpec(size=3_000, seed=number))
+        for number in range(12)
+    }
+
+
+def _runner(tmp_path, fake, **kwargs) -> BatchRunner:
+    runner = BatchRunner(str(tmp_path / "results.jsonl"), processes=2, **kwargs)
+    runner._google_api = per_thread(lambda: fake_google_api(fake.url))
+    return runner
+
+
+def test_run_ids_counts_fetched_documents(tmp_path, documents):
+    with FakeGoogleServer(documents) as fake:
+        runner = _runner(tmp_path, fake, fetch_workers=3)
+        results = runner.run_ids(list(documents) + ["missing"])
+
+    by_source = {result["source"]: result for result in results}
+    for document_id, document in documents.items():
+        result = by_source[document_id]
+        expected = Document(document).metrics()
+        assert {name: result[name] for name in expected} == expected
+        assert result["bytes"] == len(json.dumps(document).encode("utf-8"))
+    assert by_source["missing"]["status"] == 404
+    assert runner.summary()["errors"] == 1
+
+    with open(tmp_path / "results.jsonl", encoding="utf-8") as f:
+        assert len(f.readlines()) == len(documents) + 1
+
+
+def test_run_ids_bounds_documents_in_flight(tmp_path, documents):
+    with FakeGoogleServer(documents) as fake:
+        runner = _runner(tmp_path, fake, fetch_workers=4, max_pending=3)
+        fetch = runner._fetch
+        write = runner._write
+        lock = threading.Lock()
+        in_flight = [0, 0]
+
+        def counted_fetch(document_id):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight)
+            return fetch(document_id)
+
+        def counted_write(*args):
+            with lock:
+                in_flight[0] -= 1
+            write(*args)
+
+        runner._fetch = counted_fetch
+        runner._write = counted_write
+        results = runner.run_ids(iter(documents))
+
+    assert len(results) == len(documents)
+    assert 0 < in_flight[1] <= 3
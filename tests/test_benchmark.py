@@ -0,0 +1,84 @@
+import json
+import os
+from dataclasses import asdict
+
+import pytest
+
+from benchmark import (
+    BASELINE_PATH,
+    BASELINE_SPEC,
+    MIN_REPEAT,
+    bench_batch,
+    bench_memory,
+    bench_stages,
+    bench_tokenizer,
+    calibrate,
+    compare_baseline,
+)
+
+# Замеры времени на общих машинах CI шумят, поэтому включаются явно:
+# RUN_BENCHMARKS=1 pytest tests/test_benchmark.py
+RUN_BENCHMARKS = bool(os.environ.get("RUN_BENCHMARKS"))
+# Допуск шире, чем у CLI: замеры идут рядом с другими задачами
+THRESHOLD = float(os.environ.get("BENCHMARK_THRESHOLD", "1.0"))
+
+
+@pytest.fixture(scope="module")
+def baseline():
+    with open(BASELINE_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_baseline_matches_stages(baseline):
+    assert baseline["spec"] == asdict(BASELINE_SPEC)
+    assert baseline["repeat"] >= MIN_REPEAT
+    assert set(baseline["stages"]) == {
+        "init",
+        "extract_text",
+        "extract_words",
+        "find_urls",
+        "find_tables",
+        "find_images",
+        "emoji_count",
+        "stream_metrics",
+    }
+
+
+def test_fast_paths_match_reference():
+    # Каждый замер сначала сверяет результат с эталонной реализацией
+    bench_tokenizer(20_000, 1)
+    bench_memory(20_000)
+    bench_batch([20], 1)
+
+
+@pytest.mark.skipif(not RUN_BENCHMARKS, reason="замеры времени включает RUN_BENCHMARKS")
+def test_stages_are_not_slower_than_baseline(baseline):
+    repeat = max(baseline["repeat"], MIN_REPEAT)
+    results = bench_stages(BASELINE_SPEC, repeat)
+    regressions = compare_baseline(
+        baseline, BASELINE_SPEC, results, THRESHOLD, calibrate(repeat), repeat
+    )
+    assert regressions == []
+
+
+def test_compare_baseline_flags_slow_stages(baseline):
+    calibration = baseline["calibration"]
+    results = dict(baseline["stages"])
+    results["find_urls"] *= 1.5
+    # На вдвое более медленной машине всё замедляется одинаково
+    doubled = {name: seconds * 2 for name, seconds in results.items()}
+    assert compare_baseline(
+        baseline, BASELINE_SPEC, doubled, 0.2, calibration * 2, MIN_REPEAT
+    ) == ["find_urls"]
+
+
+def test_compare_baseline_requires_repeats(baseline):
+    with pytest.raises(ValueError):
+        compare_baseline(
+            baseline,
+            BASELINE_SPEC,
+            baseline["stages"],
+            0.2,
+            baseline["calibration"],
+            MIN_REPEAT - 1,
+        )
@@ -0,0 +1,108 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import DiskCache, DocumentCache, MemoryCache
+from docgen import DocSpec, generate_document
+from document import Document
+from fake_google import FakeGoogleServer, fake_google_api
+
+
+def test_document_cache_checks_revision():
+    document = generate_document(DocSpec(size=5_000))
+    with FakeGoogleServer({"doc": document}) as fake:
+        cache = DocumentCache(fake_google_api(fake.url))
+        metrics = cache.get_metrics("doc")
+        assert metrics == Document(document).metrics()
+        assert cache.get_metrics("doc") == metrics
+        assert cache.get_document("doc") == document
+        assert cache.stats["misses"] == 1 and cache.stats["hits"] == 2
+
+        fake.documents["doc"] = dict(document, revisionId="changed", body={})
+        assert cache.get_metrics("doc")["word_count"] == 0
+        assert cache.stats["misses"] == 2
+
+
+def test_document_cache_sizes_entries_by_payload():
+    document = generate_document(DocSpec(size=5_000))
+    with FakeGoogleServer({"doc": document}) as fake:
+        backend = MemoryCache()
+        cache = DocumentCache(fake_google_api(fake.url), backend)
+        cache.get_document("doc")
+        payload_size = len(json.dumps(document).encode("utf-8"))
+        assert backend.size == payload_size
+
+        cache.get_metrics("doc", count_emoji=True)
+        assert payload_size < backend.size < payload_size + 500
+
+
+def test_document_cache_hands_out_copies():
+    document = generate_document(DocSpec(size=5_000))
+    with FakeGoogleServer({"doc": document}) as fake:
+        backend = MemoryCache()
+        cache = DocumentCache(fake_google_api(fake.url), backend)
+        cache.get_document("doc")["body"]["content"].clear()
+        assert cache.get_document("doc") == document
+
+        cache.get_metrics("doc")["urls"].clear()
+        assert cache.get_metrics("doc") == Document(document).metrics()
+
+        # Уже выданная запись не меняется при добавлении метрик
+        stored = backend.get("doc")
+        cache.get_metrics("doc", count_emoji=True)
+        assert list(stored["metrics"]) == ["count_emoji=False,first_table_only=False"]
+        assert len(backend.get("doc")["metrics"]) == 2
+
+
+def test_document_cache_is_shared_between_threads():
+    document = generate_document(DocSpec(size=5_000))
+    options = [
+        {"count_emoji": count_emoji, "first_table_only": first_table_only}
+        for count_emoji in (False, True)
+        for first_table_only in (False, True)
+    ]
+    expected = [Document(document, **option).metrics() for option in options]
+    with FakeGoogleServer({"doc": document}) as fake:
+        google_api = fake_google_api(fake.url)
+        cache = DocumentCache(google_api)
+        cache.get_document("doc")
+        # Клиент googleapiclient не потокобезопасен, а проверка ревизии тут не важна
+        google_api.get_revision_id = lambda file_id: document["revisionId"]
+        with ThreadPoolExecutor(8) as executor:
+            results = list(
+                executor.map(
+                    lambda number: cache.get_metrics("doc", **options[number % 4]),
+                    range(200),
+                )
+            )
+    assert results == [expected[number % 4] for number in range(200)]
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_bytes=10)
+    cache.set("a", 1, 4)
+    cache.set("b", 2, 4)
+    assert cache.get("a") == 1
+    cache.set("c", 3, 4)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    cache.set("d", 4, 11)
+    assert cache.get("d") is None and cache.size == 8
+
+
+def test_disk_cache_is_bounded(tmp_path):
+    value = {"text": "x" * 1000}
+    file_size = len(json.dumps(value))
+    cache = DiskCache(str(tmp_path), max_bytes=3 * file_size)
+    for number in range(3):
+        cache.set(f"key-{number}", value, 0)
+        # Разные времена изменения, чтобы порядок вытеснения был однозначным
+        path = cache._path(f"key-{number}")
+        os.utime(path, (number, number))
+    cache.get("key-0")
+    cache.set("key-3", value, 0)
+
+    assert cache.get("key-1") is None
+    assert cache.get("key-0") == value
+    assert cache.get("key-3") == value
+    assert len(os.listdir(tmp_path)) == 3
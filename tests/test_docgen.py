@@ -0,0 +1,51 @@
+import pytest
+
+from docgen import DocSpec, generate_document
+
+
+def _check_indices(content: list, start: int) -> int:
+    for block in content:
+        assert block["startIndex"] == start
+        if "paragraph" in block:
+            for element in block["paragraph"]["elements"]:
+                assert element["startIndex"] == start
+                if "textRun" in element:
+                    text = element["textRun"]["content"]
+                    start += len(text.encode("utf-16-le")) // 2
+                else:
+                    start += 1
+                assert element["endIndex"] == start
+        else:
+            # Таблица, каждая строка и ячейка начинаются со своего индекса
+            start += 1
+            for row in block["table"]["tableRows"]:
+                assert row["startIndex"] == start
+                start += 1
+                for cell in row["tableCells"]:
+                    assert cell["startIndex"] == start
+                    start = _check_indices(cell["content"], start + 1)
+                    assert cell["endIndex"] == start
+                assert row["endIndex"] == start
+            start += 1
+        assert block["endIndex"] == start
+    return start
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_indices_are_utf16_code_units(seed):
+    spec = DocSpec(
+        size=5000, seed=seed, table_ratio=0.2, table_depth=2, emoji_density=0.2
+    )
+    data = generate_document(spec)
+    _check_indices(data["body"]["content"], 1)
+
+
+def test_empty_document_has_one_paragraph():
+    data = generate_document(DocSpec(size=0, images=0, headers=False))
+    (block,) = data["body"]["content"]
+    assert block["paragraph"]["elements"][-1]["textRun"]["content"].endswith("\n")
+
+
+def test_negative_size():
+    with pytest.raises(ValueError):
+        DocSpec(size=-1)
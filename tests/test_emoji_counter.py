@@ -0,0 +1,88 @@
+import random
+
+import emoji
+import pytest
+
+from emoji_counter import EmojiCounter, candidate_edges, emoji_count
+
+CASES = [
+    "",
+    "Обычный текст без эмодзи — «кавычки», “quotes” и … многоточие",
+    "😀",
+    "смайл😀в середине",
+    # ZWJ-последовательности
+    "👨‍👩‍👧",
+    "👨‍👩‍👧‍👦 семья и 👩‍💻 программист",
+    "🏳️‍🌈🏳️‍⚧️",
+    "👨‍❤️‍💋‍👨",
+    "оборванная ZWJ 👨‍ последовательность",
+    "‍‍",
+    # Флаги, в том числе подряд и с непарным региональным индикатором
+    "🇷🇺",
+    "🇷🇺🇺🇸🇯🇵",
+    "🇷🇺🇺",
+    "🇷",
+    "🏴󠁧󠁢󠁳󠁣󠁴󠁿",
+    # Модификаторы цвета кожи, в том числе без основы
+    "👍🏽",
+    "👍🏻👍🏼👍🏽👍🏾👍🏿",
+    "🧑🏽‍🤝‍🧑🏻",
+    "🏽",
+    "а🏽б",
+    # Селекторы вариантов и keycap-последовательности
+    "❤️ ❤ ♥️",
+    "#️⃣ *️⃣ 1️⃣ 1⃣",
+    "©️ ® ™",
+    "️",
+    "Текст 🎬 сцена ✨ и 🙂\n",
+]
+
+
+@pytest.mark.parametrize("text", CASES)
+def test_emoji_count_matches_emoji_library(text):
+    assert emoji_count(text) == emoji.emoji_count(text)
+
+
+def _split(rng: random.Random, text: str) -> list[str]:
+    cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, 4)))
+    bounds = [0] + cuts + [len(text)]
+    return [text[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+@pytest.mark.parametrize("text", CASES)
+def test_emoji_counter_matches_on_every_split(text):
+    # Разрез между любыми двумя символами, включая середину последовательности
+    for cut in range(len(text) + 1):
+        counter = EmojiCounter()
+        counter.feed(text[:cut])
+        counter.feed(text[cut:])
+        assert counter.close() == emoji.emoji_count(text), cut
+
+
+def test_emoji_counter_matches_on_random_runs():
+    rng = random.Random(0)
+    alphabet = [case for case in CASES if case] + ["а", "b", " ", "\n", "#", "1"]
+    for _ in range(300):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 12)))
+        counter = EmojiCounter()
+        for run in _split(rng, text):
+            counter.feed(run)
+        assert counter.close() == emoji.emoji_count(text), text
+        assert emoji_count(text) == emoji.emoji_count(text), text
+
+
+@pytest.mark.parametrize("text", CASES)
+def test_candidate_edges_restore_joined_count(text):
+    # Сумма по частям плюс поправка на стыке равна счёту всего текста
+    for cut in range(len(text) + 1):
+        left, right = text[:cut], text[cut:]
+        tail = candidate_edges(left)[1]
+        head = candidate_edges(right)[0]
+        joined = (
+            emoji_count(left)
+            + emoji_count(right)
+            - emoji_count(tail)
+            - emoji_count(head)
+            + emoji_count(tail + head)
+        )
+        assert joined == emoji.emoji_count(text), cut
@@ -0,0 +1,289 @@
+import datetime
+import json
+import threading
+
+import pytest
+
+import googleapi
+from fake_google import FakeGoogleServer, fake_google_api, fake_service_account
+from googleapi import BATCH_LIMIT, GoogleAPI, Permissions
+from scheduler import RequestScheduler, http_error_type
+
+
+@pytest.fixture()
+def fake():
+    documents = {
+        f"doc-{number}": {"title": f"Документ {number}", "body": {"content": []}}
+        for number in range(5)
+    }
+    with FakeGoogleServer(documents) as server:
+        yield server
+
+
+@pytest.fixture()
+def google_api(fake):
+    google_api = fake_google_api(fake.url)
+    # Повторы без ожидания
+    google_api.scheduler = RequestScheduler(quotas={}, sleep=lambda seconds: None)
+    return google_api
+
+
+def _status(item):
+    assert isinstance(item.error, http_error_type())
+    return item.error.resp.status
+
+
+def test_get_file_names(google_api):
+    items = google_api.get_file_names(
+        ["doc-1", "https://docs.google.com/document/d/doc-2/edit", "missing"]
+    )
+    assert [item.key for item in items] == ["doc-1", "doc-2", "missing"]
+    assert [item.response for item in items[:2]] == ["Документ 1", "Документ 2"]
+    assert items[0].ok and items[1].ok
+    assert _status(items[2]) == 404
+
+
+def test_batches_are_split_and_keep_order(fake, google_api):
+    for number in range(5, BATCH_LIMIT + 20):
+        fake.files[f"doc-{number}"] = {"id": f"doc-{number}", "name": str(number)}
+    file_ids = [f"doc-{number}" for number in range(5, BATCH_LIMIT + 20)]
+    items = google_api.get_file_names(file_ids)
+    assert [item.key for item in items] == file_ids
+    assert [item.response for item in items] == [
+        str(number) for number in range(5, BATCH_LIMIT + 20)
+    ]
+
+
+def test_throttled_calls_are_retried(fake, google_api):
+    fake.inject(429, 2)
+    items = google_api.get_file_names(["doc-0", "doc-1", "doc-2"])
+    assert all(item.ok for item in items)
+    assert fake.throttled == 2
+
+
+def test_failed_calls_keep_their_error(fake, google_api):
+    google_api.scheduler.max_retries = 1
+    fake.inject(503, 4)
+    items = google_api.get_file_names(["doc-0", "doc-1"])
+    assert [_status(item) for item in items] == [503, 503]
+    assert all(item.error.retries == 1 for item in items)
+
+
+def test_only_retried_calls_count_retries(fake, google_api):
+    fake.inject(429)
+    items = google_api.get_file_names(["doc-0", "missing"])
+    assert items[0].ok
+    # Ошибка 404 не повторялась, хотя первый вызов пакета повторён
+    assert _status(items[1]) == 404
+    assert items[1].error.retries == 0
+
+
+def test_batch_update_tells_stale_revisions_from_bad_requests(fake, google_api):
+    revision = google_api.batch_update("doc-0", [{"insertText": {}}])
+    assert revision is not None
+    assert google_api.batch_update("doc-0", [{"insertText": {}}], "stale") is None
+    assert "изменился" in google_api.last_error.message
+
+    fake.inject(400)
+    assert google_api.batch_update("doc-0", [{"insertText": {}}], revision) is None
+    assert google_api.last_error.status == 400
+    assert "изменился" not in google_api.last_error.message
+
+
+def test_delete_files(fake, google_api):
+    items = google_api.delete_files(["doc-0", "doc-1", "missing"])
+    assert [item.ok for item in items] == [True, True, False]
+    assert _status(items[2]) == 404
+    assert "doc-0" not in fake.files and "doc-2" in fake.files
+
+
+def test_delete_all_files(fake, google_api):
+    assert google_api.delete_all_files() is True
+    assert fake.files == {}
+
+
+def test_delete_all_files_reports_failures(fake, google_api):
+    listed = [{"id": "doc-0"}, {"id": "missing"}]
+    google_api.iter_files = lambda **kwargs: iter(listed)
+    assert google_api.delete_all_files() is False
+    assert google_api.last_error.method == "delete_all_files"
+    assert google_api.last_error.status == 404
+    assert "doc-0" not in fake.files
+
+
+def test_permissions_bulk(fake, google_api):
+    added = google_api.add_permissions_bulk(
+        [
+            ("doc-0", "a@example.com", Permissions.READ),
+            ("doc-0", "b@example.com", Permissions.WRITE),
+            ("doc-1", "a@example.com", Permissions.COMMENT),
+            ("missing", "a@example.com", Permissions.READ),
+        ]
+    )
+    assert [item.ok for item in added] == [True, True, True, False]
+    assert added[1].response["role"] == "writer"
+    assert _status(added[3]) == 404
+    assert [p["emailAddress"] for p in fake.permissions["doc-0"]] == [
+        "a@example.com",
+        "b@example.com",
+    ]
+
+    deleted = google_api.delete_permissions_bulk(
+        [
+            ("doc-0", "a@example.com"),
+            ("doc-0", "nobody@example.com"),
+            ("doc-1", "a@example.com"),
+            ("missing", "a@example.com"),
+        ]
+    )
+    assert [item.key for item in deleted] == [
+        ("doc-0", "a@example.com"),
+        ("doc-0", "nobody@example.com"),
+        ("doc-1", "a@example.com"),
+        ("missing", "a@example.com"),
+    ]
+    assert [item.ok for item in deleted] == [True, False, True, False]
+    assert isinstance(deleted[1].error, LookupError)
+    assert _status(deleted[3]) == 404
+    assert [p["emailAddress"] for p in fake.permissions["doc-0"]] == ["b@example.com"]
+    assert fake.permissions["doc-1"] == []
+
+
+@pytest.mark.parametrize("prefetch", [False, True])
+def test_iter_files_pages(fake, google_api, prefetch):
+    for number in range(5, 25):
+        fake.files[f"file-{number}"] = {"id": f"file-{number}", "name": str(number)}
+    files = list(google_api.iter_files(page_size=7, prefetch=prefetch))
+    assert [file["id"] for file in files] == list(fake.files)
+    assert google_api.last_error is None
+
+
+@pytest.mark.parametrize("prefetch", [False, True])
+def test_iter_files_failed_page_sets_last_error(fake, google_api, prefetch):
+    for number in range(5, 25):
+        fake.files[f"file-{number}"] = {"id": f"file-{number}", "name": str(number)}
+    files = google_api.iter_files(page_size=10, prefetch=prefetch)
+    first = [next(files) for _ in range(10)]
+    # Следующая страница уже может загружаться в фоне
+    fake.inject(404)
+    with pytest.raises(http_error_type()):
+        list(files)
+    assert len(first) == 10
+    assert (google_api.last_error.method, google_api.last_error.status) == (
+        "iter_files",
+        404,
+    )
+
+
+@pytest.fixture()
+def discovery(monkeypatch):
+    """Discovery documents read during the test, with a fresh process cache."""
+    from googleapiclient import discovery_cache
+
+    reads = []
+    get_static_doc = discovery_cache.get_static_doc
+
+    def counted(api, version):
+        reads.append((api, version))
+        return get_static_doc(api, version)
+
+    monkeypatch.setattr(googleapi, "_discovery_documents", {})
+    monkeypatch.setattr(discovery_cache, "get_static_doc", counted)
+    return reads
+
+
+@pytest.fixture()
+def service_account(fake):
+    return fake_service_account(fake.url)
+
+
+def test_authorize_builds_services_lazily(fake, discovery, service_account):
+    google_api = fake_google_api(fake.url, service_account)
+    # Авторизация не читает описания API и не обращается к сети
+    assert google_api._doc_service is None and google_api._drive_service is None
+    assert discovery == [] and fake.tokens == 0 and fake.requests == 0
+    assert google_api.service_email == service_account["client_email"]
+
+    assert google_api.get_document("doc-1")["title"] == "Документ 1"
+    assert discovery == [("docs", "v1")]
+    assert fake.tokens == 1
+    assert fake.authorizations == ["Bearer fake-token-1"]
+
+    assert google_api.get_file_name("doc-2") == "Документ 2"
+    assert discovery == [("docs", "v1"), ("drive", "v3")]
+    assert fake.tokens == 1
+
+
+def test_services_are_cached_per_thread(fake, discovery, service_account):
+    first = fake_google_api(fake.url, service_account)
+    second = fake_google_api(fake.url, service_account)
+    # Клиенты одного потока с одними учётными данными делят сервис
+    assert first.doc_service is second.doc_service
+    first.get_document("doc-0")
+
+    services = []
+    titles = []
+
+    def build():
+        google_api = fake_google_api(fake.url, service_account)
+        other = fake_google_api(fake.url, service_account)
+        services.append((google_api.doc_service, other.doc_service))
+        titles.append(google_api.get_document("doc-1")["title"])
+
+    threads = [threading.Thread(target=build) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # В каждом потоке свой сервис, общий для клиентов этого потока
+    assert all(service is other for service, other in services)
+    assert len({id(service) for service, _ in services} | {id(first.doc_service)}) == 4
+    assert titles == ["Документ 1"] * 3
+    # Описание API читается один раз на процесс, а токен один на всех
+    assert discovery == [("docs", "v1")]
+    assert fake.tokens == 1
+    assert set(fake.authorizations) == {"Bearer fake-token-1"}
+
+
+def test_credentials_are_shared_and_refreshed(fake, service_account):
+    first = fake_google_api(fake.url, service_account)
+    second = fake_google_api(fake.url, service_account)
+    assert first.credentials is second.credentials
+    first.get_document("doc-0")
+    second.get_document("doc-1")
+    assert fake.tokens == 1
+
+    # Истёкший токен обновляется один раз для всех клиентов процесса
+    first.credentials.expiry = datetime.datetime.utcnow() - datetime.timedelta(
+        minutes=1
+    )
+    second.get_document("doc-2")
+    first.get_document("doc-3")
+    assert fake.tokens == 2
+    assert fake.authorizations[-2:] == ["Bearer fake-token-2"] * 2
+
+    # Новый ключ сервисного аккаунта даёт новые учётные данные и сервисы
+    rotated = fake_google_api(fake.url, dict(service_account, private_key_id="new"))
+    assert rotated.credentials is not first.credentials
+    assert rotated.doc_service is not first.doc_service
+
+
+def test_credentials_file_is_read_once(fake, service_account, tmp_path, monkeypatch):
+    path = tmp_path / "credentials.json"
+    path.write_text(json.dumps(service_account))
+    monkeypatch.chdir(tmp_path)
+
+    first = GoogleAPI(credentials_file=str(path))
+    first.authorize()
+    path.unlink()
+    # Тот же файл по относительному пути уже не читается с диска
+    second = GoogleAPI(credentials_file="credentials.json")
+    second.authorize()
+    assert first.credentials is second.credentials
+    assert second.service_email == service_account["client_email"]
+
+    with pytest.raises(FileNotFoundError):
+        GoogleAPI().authorize()
+    with pytest.raises(AttributeError):
+        GoogleAPI(credentials_json=service_account).authorize("oauth")
@@ -0,0 +1,129 @@
+import copy
+import random
+
+import pytest
+
+from docgen import DocSpec, generate_document
+from document import Document
+
+# Вставки, которые задевают границы слов, эмодзи и переводы строк
+SNIPPETS = [
+    "слово",
+    " ",
+    "  ",
+    "\n",
+    "-",
+    "кто-",
+    "то",
+    "word",
+    ".",
+    "—",
+    "😀",
+    "👍",
+    "🏽",
+    "‍",
+    "👩",
+    "🇷",
+    "🇺",
+    "️",
+    "#",
+    "⃣",
+]
+
+
+def _text_runs(content: list) -> list[dict]:
+    runs = []
+    stack = list(content)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if "textRun" in node:
+                runs.append(node["textRun"])
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return runs
+
+
+def _edit(rng: random.Random, document: dict) -> dict:
+    document = copy.deepcopy(document)
+    content = document["body"]["content"]
+    for _ in range(rng.randint(1, 4)):
+        action = rng.randrange(6)
+        if action == 0 and content:
+            del content[rng.randrange(len(content))]
+        elif action == 1 and content:
+            element = copy.deepcopy(rng.choice(content))
+            content.insert(rng.randrange(len(content) + 1), element)
+        elif action == 2 and len(content) > 1:
+            element = content.pop(rng.randrange(len(content)))
+            content.insert(rng.randrange(len(content) + 1), element)
+        elif action == 3:
+            runs = _text_runs(content)
+            if runs:
+                run = rng.choice(runs)
+                text = run["content"]
+                at = rng.randint(0, len(text))
+                snippet = "".join(rng.choices(SNIPPETS, k=rng.randint(1, 3)))
+                run["content"] = text[:at] + snippet + text[at:]
+        elif action == 4:
+            runs = _text_runs(content)
+            if runs:
+                run = rng.choice(runs)
+                text = run["content"]
+                start = rng.randint(0, len(text))
+                run["content"] = text[:start] + text[rng.randint(start, len(text)) :]
+        else:
+            runs = _text_runs(content)
+            if runs:
+                style = rng.choice(runs).setdefault("textStyle", {})
+                if "link" in style and rng.random() < 0.5:
+                    del style["link"]
+                else:
+                    style["link"] = {"url": f"https://example.com/{rng.randrange(5)}"}
+    return document
+
+
+@pytest.mark.parametrize("count_emoji", [False, True])
+@pytest.mark.parametrize("structural", [False, True])
+def test_update_matches_full_recount(count_emoji, structural):
+    rng = random.Random(f"{count_emoji}-{structural}")
+    for case in range(150):
+        spec = DocSpec(
+            # Первый документ пустой: один абзац с переводом строки
+            size=0 if case == 0 else rng.randint(1, 1_500),
+            seed=case,
+            table_ratio=0.2,
+            table_depth=2,
+            emoji_density=0.1,
+            link_ratio=0.1,
+            images=rng.randint(0, 2),
+        )
+        revision = generate_document(spec)
+        document = Document(revision, count_emoji=count_emoji, structural=structural)
+        document.metrics()
+
+        # Несколько правок подряд над одним и тем же объектом
+        for _ in range(3):
+            revision = _edit(rng, revision)
+            document.update(revision)
+            expected = Document(
+                revision, count_emoji=count_emoji, structural=structural
+            ).metrics()
+            assert document.metrics() == expected, (case, revision)
+
+
+def test_update_measures_only_changed_elements():
+    revision = generate_document(DocSpec(size=5_000, table_ratio=0))
+    document = Document(revision, count_emoji=True)
+    assert document.update(revision) == len(revision["body"]["content"])
+    assert document.update(revision) == 0
+
+    edited = copy.deepcopy(revision)
+    content = edited["body"]["content"]
+    content[3]["paragraph"]["elements"][0]["textRun"]["content"] += "правка 😀 "
+    content.insert(5, copy.deepcopy(content[1]))
+
+    # Изменённый абзац и копия, для которой нет второго прежнего вклада
+    assert document.update(edited) == 2
+    assert document.metrics() == Document(edited, count_emoji=True).metrics()
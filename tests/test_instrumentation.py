@@ -0,0 +1,213 @@
+import json
+
+import pytest
+
+import instrumentation as instrumentation_module
+from docgen import DocSpec, generate_document
+from document import Document
+from instrumentation import (
+    BYTES_BUCKETS,
+    Histogram,
+    Instrumentation,
+    instrumentation,
+    timed,
+)
+
+
+@pytest.fixture()
+def enabled():
+    instrumentation.reset()
+    instrumentation.enable()
+    yield instrumentation
+    instrumentation.disable()
+    instrumentation.reset()
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _stage_sums(metrics: Instrumentation) -> dict[str, float]:
+    return {
+        dict(labels)["stage"]: histogram.sum
+        for (name, labels), histogram in metrics.histograms.items()
+        if name == "document_stage_seconds"
+    }
+
+
+def test_histogram_buckets():
+    histogram = Histogram((1.0, 2.0))
+    for value in (0.5, 1.0, 1.5, 3.0, 4.0):
+        histogram.observe(value)
+    # Граница входит в свою корзину, последняя корзина — +Inf
+    assert histogram.counts == [2, 1, 2]
+    assert histogram.cumulative() == [2, 3, 5]
+    assert histogram.sum == 10.0
+    assert histogram.count == 5
+
+
+def test_disabled_instrumentation_records_nothing():
+    metrics = Instrumentation()
+    metrics.observe("stage_seconds", 1.0)
+    metrics.increment("calls_total")
+    metrics.record_request("get", 200, 0.1, received=10, retries=1)
+    with metrics.timer("stage_seconds"):
+        pass
+    assert metrics.histograms == {} and metrics.counters == {}
+
+
+def test_labels_and_buckets():
+    metrics = Instrumentation(enabled=True)
+    metrics.observe("size_bytes", 100, BYTES_BUCKETS, kind="a")
+    # Корзины выбираются при первом наблюдении метрики
+    metrics.observe("size_bytes", 5_000, kind="b")
+    metrics.increment("calls_total", method="get", status=200)
+    metrics.increment("calls_total", 2, status=200, method="get")
+
+    assert metrics.histograms[("size_bytes", (("kind", "b"),))].buckets == (
+        BYTES_BUCKETS
+    )
+    assert metrics.counters == {
+        ("calls_total", (("method", "get"), ("status", "200"))): 3
+    }
+
+
+def test_record_request():
+    metrics = Instrumentation(enabled=True)
+    metrics.record_request("documents.get", 200, 0.2, received=2_000, retries=2)
+    metrics.record_request("documents.get", 200, 0.3)
+
+    latency = metrics.histograms[
+        ("api_request_seconds", (("method", "documents.get"), ("status", "200")))
+    ]
+    assert latency.count == 2 and latency.sum == pytest.approx(0.5)
+    size = metrics.histograms[("api_response_bytes", (("method", "documents.get"),))]
+    assert size.buckets == BYTES_BUCKETS and size.sum == 2_000
+    assert metrics.counters == {
+        ("api_retries_total", (("method", "documents.get"),)): 2
+    }
+
+
+def test_to_json():
+    metrics = Instrumentation(enabled=True)
+    metrics.observe("stage_seconds", 0.003, stage="walk")
+    metrics.increment("calls_total", method="get")
+
+    exported = metrics.to_json()
+    assert json.loads(json.dumps(exported)) == exported
+    [histogram] = exported["histograms"]
+    assert histogram["name"] == "stage_seconds"
+    assert histogram["labels"] == {"stage": "walk"}
+    assert histogram["buckets"]["0.0025"] == 0
+    assert histogram["buckets"]["0.005"] == 1
+    assert histogram["buckets"]["+Inf"] == 1
+    assert (histogram["sum"], histogram["count"]) == (0.003, 1)
+    assert exported["counters"] == [
+        {"name": "calls_total", "labels": {"method": "get"}, "value": 1}
+    ]
+
+
+def test_to_prometheus():
+    metrics = Instrumentation(enabled=True)
+    metrics.observe("stage_seconds", 0.003, (0.001, 0.01), stage="walk")
+    metrics.increment("calls_total")
+    metrics.increment("calls_total", 2, method="get")
+
+    assert metrics.to_prometheus().splitlines() == [
+        "# TYPE stage_seconds histogram",
+        'stage_seconds_bucket{stage="walk",le="0.001"} 0',
+        'stage_seconds_bucket{stage="walk",le="0.01"} 1',
+        'stage_seconds_bucket{stage="walk",le="+Inf"} 1',
+        'stage_seconds_sum{stage="walk"} 0.003',
+        'stage_seconds_count{stage="walk"} 1',
+        "# TYPE calls_total counter",
+        "calls_total 1",
+        'calls_total{method="get"} 2',
+    ]
+    assert Instrumentation().to_prometheus() == "\n"
+
+
+def test_prometheus_label_escaping():
+    metrics = Instrumentation(enabled=True)
+    metrics.increment("calls_total", source='путь\\к "файлу"\n\tконец')
+    # Экранируются только обратная косая черта, кавычка и перевод строки
+    assert metrics.to_prometheus().splitlines()[-1] == (
+        'calls_total{source="путь\\\\к \\"файлу\\"\\n\tконец"} 1'
+    )
+
+
+def test_timed_records_only_own_time_of_nested_stages(enabled, monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(instrumentation_module.time, "perf_counter", clock)
+
+    @timed("inner")
+    def inner():
+        clock.now += 2.0
+
+    @timed("outer")
+    def outer():
+        clock.now += 1.0
+        inner()
+        inner()
+        clock.now += 0.5
+
+    outer()
+    inner()
+    assert _stage_sums(enabled) == {"outer": 1.5, "inner": 6.0}
+
+
+def test_timed_stage_that_raises(enabled, monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(instrumentation_module.time, "perf_counter", clock)
+
+    @timed("failing")
+    def failing():
+        clock.now += 1.0
+        raise ValueError()
+
+    @timed("outer")
+    def outer():
+        with pytest.raises(ValueError):
+            failing()
+        clock.now += 0.25
+
+    outer()
+    assert _stage_sums(enabled) == {"failing": 1.0, "outer": 0.25}
+
+
+def test_document_stages_do_not_overlap(enabled):
+    data = generate_document(DocSpec(size=20_000, seed=1, table_ratio=0.3))
+    document = Document(data, count_emoji=True)
+    # Первым запрошен список таблиц, поэтому обход выполняется внутри него
+    document.tables
+    document.metrics()
+    sums = _stage_sums(enabled)
+    assert {"walk", "tables", "emoji", "tokenize"} <= set(sums)
+    # Время обхода в этап таблиц не входит
+    assert sums["tables"] < sums["walk"]
+
+
+def test_profile_keeps_only_slow_blocks(tmp_path):
+    metrics = Instrumentation(enabled=True)
+    metrics.profile_dir = str(tmp_path / "profiles")
+    with metrics.profile("doc"):
+        pass
+    assert not (tmp_path / "profiles").exists()
+
+    metrics.profile_threshold = 60.0
+    with metrics.profile("doc"):
+        pass
+    assert not (tmp_path / "profiles").exists()
+
+    metrics.profile_threshold = 0.0
+    with metrics.profile("docs/../secret id"):
+        sum(range(1_000))
+    [profile] = (tmp_path / "profiles").iterdir()
+    # Имя источника становится безопасным именем файла
+    assert profile.name == "docs_.._secret_id.prof"
+    assert profile.stat().st_size > 0
+    assert metrics.counters == {("slow_documents_total", ()): 1}
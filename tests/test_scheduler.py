@@ -0,0 +1,82 @@
+import pytest
+
+from fake_google import FakeGoogleServer, fake_google_api
+from googleapi import Permissions
+from scheduler import RequestScheduler, is_idempotent
+
+
+@pytest.fixture()
+def fake():
+    with FakeGoogleServer({"doc": {"title": "Документ", "revisionId": "1"}}) as server:
+        yield server
+
+
+@pytest.fixture()
+def google_api(fake):
+    google_api = fake_google_api(fake.url)
+    google_api.scheduler = RequestScheduler(quotas={}, sleep=lambda seconds: None)
+    return google_api
+
+
+def test_is_idempotent():
+    assert is_idempotent("docs.documents.get")
+    assert is_idempotent("drive.files.delete")
+    assert not is_idempotent("docs.documents.create")
+    assert not is_idempotent("drive.permissions.create")
+    assert not is_idempotent("docs.documents.batchUpdate", {"requests": []})
+    assert is_idempotent(
+        "docs.documents.batchUpdate",
+        {"requests": [], "writeControl": {"requiredRevisionId": "1"}},
+    )
+
+
+def test_reads_are_retried_after_server_errors(fake, google_api):
+    fake.inject(503, 2)
+    assert google_api.get_document("doc")["title"] == "Документ"
+    assert fake.requests == 3
+
+
+@pytest.mark.parametrize("status, requests", [(503, 1), (429, 2)])
+def test_create_is_retried_only_when_throttled(fake, google_api, status, requests):
+    fake.inject(status)
+    document_id = google_api.create_document("Новый")
+    assert fake.requests == requests
+    if status == 429:
+        assert document_id in fake.documents
+    else:
+        assert document_id is None
+        assert google_api.last_error.status == 503
+        assert google_api.last_error.retries == 0
+
+
+def test_batch_update_is_retried_only_with_revision_guard(fake, google_api):
+    requests = [{"insertText": {"location": {"index": 1}, "text": "x"}}]
+
+    fake.inject(503)
+    assert google_api.batch_update("doc", requests) is None
+    assert fake.requests == 1
+
+    fake.inject(503)
+    revision_id = google_api.batch_update("doc", requests, revision_id="1")
+    assert revision_id == fake.documents["doc"]["revisionId"]
+    assert fake.requests == 3
+    assert fake.updates["doc"] == requests
+
+
+def test_bulk_permissions_are_retried_only_when_throttled(fake, google_api):
+    fake.files["other"] = {"id": "other", "name": "other"}
+    fake.inject(503)
+    items = google_api.add_permissions_bulk(
+        [
+            ("doc", "a@example.com", Permissions.READ),
+            ("other", "a@example.com", Permissions.READ),
+        ]
+    )
+    assert [item.ok for item in items] == [False, True]
+
+    fake.inject(429)
+    items = google_api.add_permissions_bulk(
+        [("doc", "b@example.com", Permissions.READ)]
+    )
+    assert items[0].ok
+    assert [p["emailAddress"] for p in fake.permissions["doc"]] == ["b@example.com"]
@@ -0,0 +1,232 @@
+import asyncio
+import json
+
+import pytest
+from starlette.testclient import TestClient
+
+from docgen import DocSpec, generate_document
+from document import Document
+from fake_google import FakeGoogleServer, fake_google_api, fake_reader
+from instrumentation import instrumentation
+from server import Coalescer, DocumentService, Overloaded, TooLarge, create_app
+
+
+@pytest.fixture()
+def documents():
+    return {
+        f"doc-{number}": generate_document(DocSpec(size=2_000, seed=number))
+        for number in range(3)
+    }
+
+
+@pytest.fixture()
+def fake(documents):
+    with FakeGoogleServer(documents) as fake:
+        yield fake
+
+
+@pytest.fixture()
+def metrics():
+    instrumentation.reset()
+    instrumentation.enable()
+    yield instrumentation
+    instrumentation.disable()
+    instrumentation.reset()
+
+
+def _service(fake, max_pending=4) -> DocumentService:
+    return DocumentService(
+        fake_reader(fake.url),
+        lambda: fake_google_api(fake.url),
+        processes=1,
+        write_workers=2,
+        max_pending=max_pending,
+    )
+
+
+@pytest.fixture()
+def service(fake):
+    return _service(fake)
+
+
+@pytest.fixture()
+def client(service):
+    with TestClient(create_app(service)) as client:
+        yield client
+
+
+def test_analyse_ids(client, documents):
+    response = client.post(
+        "/analyse", json={"document_ids": list(documents) + ["missing"]}
+    )
+    assert response.status_code == 200
+    results = {result["source"]: result for result in response.json()["results"]}
+    for document_id, document in documents.items():
+        expected = Document(document).metrics()
+        assert {name: results[document_id][name] for name in expected} == expected
+    assert results["missing"]["status"] == 404
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        {"document_ids": "abc"},
+        {"document_ids": [1, 2]},
+        {"document_ids": None},
+        {"ids": ["doc-0"]},
+        ["doc-0"],
+    ],
+)
+def test_analyse_ids_requires_a_list_of_strings(client, body):
+    response = client.post("/analyse", json=body)
+    assert response.status_code == 400
+
+
+def test_analyse_ids_over_the_limit_is_too_large(client):
+    # Даже простаивающий сервис не примет больше max_pending документов сразу
+    response = client.post(
+        "/analyse", json={"document_ids": [f"doc-{n}" for n in range(5)]}
+    )
+    assert response.status_code == 413
+    assert "Retry-After" not in response.headers
+
+
+def test_overloaded_service_answers_429(client, service, monkeypatch):
+    async def overloaded(*args):
+        raise Overloaded()
+
+    monkeypatch.setattr(service, "analyse_ids", overloaded)
+    response = client.post("/analyse", json={"document_ids": ["doc-0"]})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_analyse_document(client, documents):
+    document = documents["doc-1"]
+    response = client.post(
+        "/analyse/document?count_emoji=1", content=json.dumps(document)
+    )
+    assert response.status_code == 200
+    expected = Document(document, count_emoji=True).metrics()
+    result = response.json()
+    assert {name: result[name] for name in expected} == expected
+
+    response = client.post("/analyse/document", content=b"{not json")
+    assert response.status_code == 400
+    assert "error" in response.json()
+
+
+def test_write_creates_and_updates_documents(client, fake, documents):
+    # Колонтитулы запросами не переносятся, и writer предупреждает об этом
+    document = {
+        key: value
+        for key, value in documents["doc-2"].items()
+        if key not in ("headers", "footers")
+    }
+    response = client.post("/write", json={"document": document, "title": "Копия"})
+    assert response.status_code == 200
+    document_id = response.json()["document_id"]
+    assert fake.files[document_id]["name"] == "Копия"
+    assert fake.updates[document_id]
+
+    # Пустое тело переписывает документ, оставляя последний перевод строки
+    empty = {"body": {"content": [{"endIndex": 1, "sectionBreak": {}}]}}
+    response = client.post(
+        "/write", json={"document": empty, "document_id": document_id}
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("body", [b"{not json", b"{}", b"[]", b'{"document": 1}'])
+def test_write_rejects_malformed_requests(client, body):
+    response = client.post("/write", content=body)
+    assert response.status_code == 400
+
+
+def test_write_reports_google_errors(client, fake, documents):
+    fake.inject(404)
+    response = client.post("/write", json={"document": documents["doc-0"]})
+    assert response.status_code == 502
+    assert response.json()["status"] == 404
+
+
+def test_metrics(client, metrics):
+    client.post("/analyse", json={"document_ids": [f"doc-{n}" for n in range(5)]})
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "service_too_large_total 1" in response.text
+
+
+def test_admit_rejects_new_work_when_queue_is_full(fake, metrics):
+    service = _service(fake, max_pending=2)
+
+    async def scenario():
+        release = asyncio.Event()
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            await release.wait()
+            return {"source": "slow"}
+
+        keys = [("id", f"doc-{n}", False, False) for n in range(2)]
+        running = [
+            asyncio.ensure_future(service.analyses.run(key, slow)) for key in keys
+        ]
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded):
+            await service.analyse_ids(["doc-2"])
+        with pytest.raises(TooLarge):
+            await service.analyse_ids(["a", "b", "c"])
+
+        # Документы, которые уже анализируются, не считаются новыми
+        shared = asyncio.ensure_future(service.analyse_ids(["doc-0", "doc-1"]))
+        await asyncio.sleep(0)
+        release.set()
+        assert await shared == [{"source": "slow"}, {"source": "slow"}]
+        await asyncio.gather(*running)
+        assert len(calls) == 2
+        await service.reader.aclose()
+
+    asyncio.run(scenario())
+    assert metrics.counters[("service_rejected_total", ())] == 1
+    assert metrics.counters[("service_coalesced_total", ())] == 2
+
+
+def test_coalescer_shares_results_and_errors():
+    async def scenario():
+        coalescer = Coalescer()
+        release = asyncio.Event()
+        calls = []
+
+        async def task(result):
+            calls.append(result)
+            await release.wait()
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        first = asyncio.ensure_future(coalescer.run("a", lambda: task(1)))
+        second = asyncio.ensure_future(coalescer.run("a", lambda: task(2)))
+        failing = [
+            asyncio.ensure_future(coalescer.run("b", lambda: task(ValueError("b"))))
+            for _ in range(2)
+        ]
+        await asyncio.sleep(0)
+        assert len(coalescer) == 2 and "a" in coalescer
+
+        # Отмена одного ожидающего не отменяет общую задачу
+        second.cancel()
+        release.set()
+        assert await first == 1
+        for future in failing:
+            with pytest.raises(ValueError):
+                await future
+        # Второй вызов с ключом "a" присоединился к первому
+        assert calls[0] == 1 and len(calls) == 2
+        assert len(coalescer) == 0
+
+        # После завершения ключ запускается заново
+        assert await coalescer.run("a", lambda: task(3)) == 3
+
+    asyncio.run(scenario())
@@ -0,0 +1,139 @@
+import io
+import json
+import tracemalloc
+
+import pytest
+
+import compact
+from compact import RUN_TABLE, RUN_TEXT, CompactText
+from docgen import DocSpec, generate_document
+from document import Document
+from stats import TextStats
+
+
+def _document(seed: int, **spec) -> dict:
+    spec = {"size": 3_000, "table_ratio": 0.3, "images": 2, "link_ratio": 0.1, **spec}
+    return generate_document(DocSpec(seed=seed, **spec))
+
+
+def _payload(data: dict) -> bytes:
+    return json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("compact_mode", [False, True])
+@pytest.mark.parametrize("count_emoji", [False, True])
+def test_stream_matches_in_memory_metrics(seed, compact_mode, count_emoji):
+    data = _document(seed, table_depth=2, emoji_density=0.1)
+    expected = Document(data, count_emoji=count_emoji).metrics()
+    document = Document.from_stream(
+        io.BytesIO(_payload(data)), count_emoji=count_emoji, compact=compact_mode
+    )
+    assert document.metrics() == expected
+
+
+@pytest.mark.parametrize("compact_mode", [False, True])
+def test_from_path(tmp_path, compact_mode):
+    data = _document(4)
+    expected = Document(data, count_emoji=True).metrics()
+    path = tmp_path / "document.json"
+    path.write_bytes(_payload(data))
+
+    document = Document.from_path(str(path), count_emoji=True, compact=compact_mode)
+    assert document.metrics() == expected
+
+
+@pytest.mark.parametrize("compact_mode", [False, True])
+def test_stream_first_table_only(compact_mode):
+    data = _document(5, table_ratio=0.5, table_rows=3)
+    expected = Document(data, first_table_only=True).metrics()
+    document = Document.from_stream(
+        io.BytesIO(_payload(data)), first_table_only=True, compact=compact_mode
+    )
+    assert document.metrics() == expected
+
+    plain = _document(6, table_ratio=0)
+    with pytest.raises(IndexError):
+        Document.from_stream(
+            io.BytesIO(_payload(plain)), first_table_only=True, compact=compact_mode
+        )
+
+
+def test_compact_document_keeps_text_once():
+    data = _document(7, table_depth=2)
+    reference = Document(data)
+    document = Document.from_stream(io.BytesIO(_payload(data)), compact=True)
+    text = document.compact
+
+    assert document.raw_content == reference.raw_content
+    assert "".join(text.runs()) == text.buffer
+    assert [text.run(index) for index in range(len(text))] == list(text.runs())
+    assert len(text.images) == reference.image_count
+    assert [link.url for link in text.links] == reference.urls
+    for link in text.links:
+        assert 0 < link.length
+        assert link.offset + link.length <= len(text.buffer)
+    # Текст таблиц помечен отдельно от текста абзацев тела
+    assert "".join(text.runs(RUN_TABLE))
+    assert len(list(text.runs(RUN_TABLE))) + len(list(text.runs(RUN_TEXT))) == len(text)
+
+
+def test_compact_text_records():
+    text = CompactText()
+    text.add_link("https://example.com/before")
+    text.append("первый 😀 ")
+    text.add_link("https://example.com/first")
+    text.add_image("kix.image")
+    text.append("ячейка\n", RUN_TABLE)
+    text.close()
+
+    assert text.buffer == "первый 😀 ячейка\n"
+    assert list(text.runs()) == ["первый 😀 ", "ячейка\n"]
+    assert list(text.runs(RUN_TABLE)) == ["ячейка\n"]
+    assert [(link.url, link.offset, link.length) for link in text.links] == [
+        ("https://example.com/before", 0, 0),
+        ("https://example.com/first", 0, len("первый 😀 ")),
+    ]
+    assert [(image.object_id, image.offset) for image in text.images] == [
+        ("kix.image", len("первый 😀 "))
+    ]
+    # Повторное закрытие ничего не меняет
+    assert text.close().buffer == "первый 😀 ячейка\n"
+    reference = TextStats()
+    reference.feed(text.buffer)
+    assert text.stats().word_count == reference.close().word_count
+
+
+def test_compact_text_flushes_in_blocks(monkeypatch):
+    monkeypatch.setattr(compact, "FLUSH_SIZE", 10)
+    runs = [f"фрагмент {number} " for number in range(50)] + ["😀", ""]
+    text = CompactText()
+    appended = 0
+    for run in runs:
+        text.append(run)
+        appended += len(run)
+        # Буфер растёт по мере поступления фрагментов, а не только при закрытии
+        assert appended - len(text.buffer) < 10
+    text.close()
+    assert text.buffer == "".join(runs)
+    assert list(text.runs()) == runs
+
+
+def test_compact_text_close_does_not_double_memory():
+    template = "слово " * 200
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        text = CompactText()
+        # Каждый фрагмент создаётся заново, как строки из парсера JSON
+        for number in range(4_000):
+            text.append(template[:999] + str(number % 10))
+        text.close()
+        peak = tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+
+    # Кириллица занимает два байта на символ, и весь текст хранится один раз
+    assert len(text.buffer) == 4_000_000
+    assert peak < 1.5 * len(text.buffer) * 2
@@ -0,0 +1,140 @@
+import pytest
+
+from docgen import DocSpec, generate_document
+from document import Document
+from table_index import TableIndex
+from walker import walk, walk_structure
+
+
+def _document():
+    spec = DocSpec(
+        size=20_000,
+        seed=3,
+        table_ratio=0.3,
+        table_depth=2,
+        table_rows=3,
+        table_columns=3,
+        emoji_density=0.1,
+        link_ratio=0.2,
+    )
+    return generate_document(spec)
+
+
+def _metrics(element, count_emoji):
+    # Счётчики фрагмента так же, как у документа из этого фрагмента
+    metrics = Document({"body": {"content": element}}, count_emoji).metrics()
+    del metrics["table_count"]
+    metrics["image_count"] = len(walk(element).images)
+    metrics["total_characters"] += metrics["image_count"]
+    metrics["characters_without_spaces"] += metrics["image_count"]
+    return metrics
+
+
+@pytest.mark.parametrize("count_emoji", [False, True])
+def test_aggregates_match_joined_cells(count_emoji):
+    tables = walk(_document()).tables
+    index = TableIndex(tables, count_emoji=count_emoji)
+    for number, table in enumerate(tables):
+        rows = table["tableRows"]
+        cells = [[cell["content"] for cell in row["tableCells"]] for row in rows]
+        for row, row_cells in enumerate(cells):
+            joined = [item for content in row_cells for item in content]
+            assert index.row(number, row).to_dict() == _metrics(joined, count_emoji)
+            for column, content in enumerate(row_cells):
+                assert index.cell(number, row, column).to_dict() == _metrics(
+                    content, count_emoji
+                )
+        for column in range(len(cells[0])):
+            joined = [item for row_cells in cells for item in row_cells[column]]
+            assert index.column(number, column).to_dict() == _metrics(
+                joined, count_emoji
+            )
+        everything = [item for row_cells in cells for c in row_cells for item in c]
+        assert index.table(number).to_dict() == _metrics(everything, count_emoji)
+        assert [row.text for row in index.rows(number)] == [
+            index.row(number, row).text for row in range(len(rows))
+        ]
+        assert index.row(number, -1) is index.row(number, len(rows) - 1)
+
+
+def test_queries_walk_only_the_cells_they_need():
+    tables = walk(_document()).tables
+    walked = []
+
+    def counting_walk(content):
+        walked.append(id(content))
+        return walk_structure(content)
+
+    index = TableIndex(tables, counting_walk)
+    assert walked == []
+
+    row = index.row(0, 1)
+    assert len(walked) == len(tables[0]["tableRows"][1]["tableCells"])
+    assert index.row(0, 1) is row
+    index.cell(0, 1, 0)
+    assert len(walked) == len(tables[0]["tableRows"][1]["tableCells"])
+
+    # Счёт знаков не требует разбиения на слова и поиска эмодзи
+    assert row._words is None and row._emoji is None
+    row.to_dict()
+    assert row._words is not None
+
+    with pytest.raises(IndexError):
+        index.row(0, len(tables[0]["tableRows"]))
+
+
+def test_first_table_only_counts_the_second_row():
+    document = _document()
+    table = walk(document).tables[0]
+    row = [
+        item for cell in table["tableRows"][1]["tableCells"] for item in cell["content"]
+    ]
+    for count_emoji in (False, True):
+        metrics = Document(document, count_emoji, first_table_only=True).metrics()
+        expected = _metrics(row, count_emoji)
+        assert metrics["word_count"] == expected["word_count"]
+        assert metrics["total_characters"] == expected["total_characters"]
+        assert metrics["count_emoji"] == expected["count_emoji"]
+        assert metrics["urls"] == expected["urls"]
+        assert metrics["table_count"] == len(walk(document).tables)
+
+
+def test_negative_and_out_of_range_numbers():
+    tables = walk(_document()).tables
+    index = TableIndex(tables)
+    last = len(tables) - 1
+    rows = len(tables[last]["tableRows"])
+    columns = len(tables[last]["tableRows"][0]["tableCells"])
+
+    # Отрицательный номер попадает в тот же кэш, что и номер с начала
+    assert index.table(-1) is index.table(last)
+    assert index.row(-1, -1) is index.row(last, rows - 1)
+    assert index.column(-1, -1) is index.column(last, columns - 1)
+    assert index.cell(-1, 0, -1) is index.cell(last, 0, columns - 1)
+    assert index.rows(-1) == index.rows(last)
+    assert index.columns(-1) == index.columns(last)
+    assert len(index._totals) == 1 and len(index._rows) == rows
+
+    for query in (
+        lambda: index.table(len(tables)),
+        lambda: index.table(-len(tables) - 1),
+        lambda: index.rows(len(tables)),
+        lambda: index.row(0, -len(tables[0]["tableRows"]) - 1),
+        lambda: index.column(0, columns),
+        lambda: index.cell(0, 0, len(tables[0]["tableRows"][0]["tableCells"])),
+        lambda: index.cell(0, 0, -len(tables[0]["tableRows"][0]["tableCells"]) - 1),
+    ):
+        with pytest.raises(IndexError):
+            query()
+
+
+def test_cell_of_a_short_row():
+    cell = {"content": [{"paragraph": {"elements": [{"textRun": {"content": "x\n"}}]}}]}
+    table = {"tableRows": [{"tableCells": [cell, cell]}, {"tableCells": [cell]}]}
+    index = TableIndex([table])
+    assert index.cell(0, 1, 0).text == "x\n"
+    assert index.cell(0, 1, -1) is index.cell(0, 1, 0)
+    with pytest.raises(IndexError):
+        index.cell(0, 1, 1)
+    # Столбец короткой строки собирается только из имеющихся ячеек
+    assert index.column(0, 1).text == "x\n"
@@ -0,0 +1,116 @@
+import random
+import re
+import string
+
+import pytest
+
+from tokenizer import WordSplitter, iter_words, split_words
+
+CASES = [
+    "",
+    "   ",
+    "\n\n",
+    "слово",
+    "  два слова \n",
+    "кто-то сказал – что-то",
+    "- -- – дефисы отдельно - –",
+    "во-первых,во-вторых.в-третьих",
+    "it's rock'n'roll, don't 'quote'",
+    "неразрывный\xa0пробел и узкий",
+    "\xa0 \xa0",
+    "табуляция\tи\x0bвертикальная",
+    "эмодзи😀внутри 👨‍👩‍👧 семья 🇷🇺 флаг 👍🏽",
+    "😀-😀 😀–😀",
+    "!!! ... ?!, «кавычки» “двойные” ‘одинарные’",
+    "=формула= (скобки) [и] <угловые> |черта| a/b c\\d 50% #тег",
+    "конец абзаца\nначало следующего\n",
+    ". ' .",
+]
+
+_ALPHABET = [
+    "а",
+    "b",
+    "7",
+    "😀",
+    "👍🏽",
+    " ",
+    "\xa0",
+    "\t",
+    "\n",
+    "-",
+    "–",
+    "—",
+    "'",
+    ".",
+    ",",
+    "!",
+]
+
+
+def _reference(text: str) -> list[str]:
+    # Прежняя реализация Document.extract_words, на которую равняется токенизатор
+    text = re.sub(r"\n+", " ", text).strip()
+    for char in ",.:#><()[]\\|/?\x0b—=”“!%\t":
+        text = text.replace(char, " ")
+    text = text.replace("–", "").replace("-", "")
+    return [
+        word
+        for word in text.split(" ")
+        if any(char not in string.punctuation for char in word) and not word.isspace()
+    ]
+
+
+def _random_texts(count: int) -> list[str]:
+    rng = random.Random(0)
+    return [
+        "".join(rng.choice(_ALPHABET) for _ in range(rng.randint(0, 16)))
+        for _ in range(count)
+    ]
+
+
+@pytest.mark.parametrize("text", CASES)
+def test_split_words_matches_reference(text):
+    assert split_words(text) == _reference(text)
+
+
+def test_split_words_matches_reference_on_random_texts():
+    for text in _random_texts(2_000):
+        assert split_words(text) == _reference(text), repr(text)
+
+
+def test_split_words_without_strip_keeps_edge_whitespace():
+    # Неразрывный пробел в середине текста не разделитель и остаётся в слове
+    assert split_words("\xa0слово\xa0") == ["слово"]
+    assert split_words("\xa0слово\xa0", strip=False) == ["\xa0слово\xa0"]
+    assert split_words(" \xa0 ", strip=False) == []
+
+
+def _feed(pieces: list[str]) -> list[str]:
+    splitter = WordSplitter()
+    words = []
+    for piece in pieces:
+        words.extend(splitter.feed(piece))
+    return words + splitter.close()
+
+
+@pytest.mark.parametrize("text", CASES)
+def test_word_splitter_matches_on_every_cut(text):
+    # Разрез в любом месте, в том числе внутри слова, эмодзи или серии пробелов
+    for cut in range(len(text) + 1):
+        assert _feed([text[:cut], text[cut:]]) == split_words(text), cut
+
+
+def test_word_splitter_matches_on_random_pieces():
+    rng = random.Random(1)
+    for text in _random_texts(1_000):
+        cuts = sorted(rng.choices(range(len(text) + 1), k=rng.randint(0, 5)))
+        bounds = [0] + cuts + [len(text)]
+        pieces = [text[start:end] for start, end in zip(bounds, bounds[1:])]
+        assert _feed(pieces) == split_words(text), pieces
+        assert list(iter_words(pieces)) == split_words(text), pieces
+
+
+def test_word_splitter_single_characters():
+    text = "  кто-то's\xa0слово 😀‍👩 – конец\xa0\n"
+    assert _feed(list(text)) == split_words(text)
+    assert list(iter_words([])) == []
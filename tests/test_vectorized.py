@@ -0,0 +1,108 @@
+import json
+import random
+
+import numpy as np
+import pytest
+
+from docgen import DocSpec, generate_document
+from document import Document
+from tokenizer import split_words
+from vectorized import batch_metrics, count_words
+
+TEXTS = [
+    "",
+    " ",
+    "\n",
+    " \t\n ",
+    "  　",
+    "слово",
+    "  два слова  \n",
+    "😀",
+    "смайл😀в середине 👍🏽",
+    "👨‍👩‍👧 семья 🇷🇺🇺🇸",
+    # Одиночные суррогаты допустимы в JSON и проходят в текст как есть
+    json.loads('"\\ud83d текст \\ude00"'),
+    "\U0001f600\U0001f600 \U00010348 готика",
+    "кто-то – что-то - ... !!! ?",
+    "пунктуация . , ; ' \" и пробел",
+    ".. ..",
+]
+
+
+def _document(*runs: str) -> dict:
+    elements = [{"textRun": {"content": run}} for run in runs]
+    return {"body": {"content": [{"paragraph": {"elements": elements}}]}}
+
+
+def _scalar(data: dict, **options) -> dict:
+    metrics = Document(data, **options).metrics()
+    del metrics["table_count"], metrics["urls"]
+    return metrics
+
+
+@pytest.mark.parametrize("count_emoji", [False, True])
+def test_batch_metrics_match_scalar_path_on_edge_cases(count_emoji):
+    documents = [_document(text) for text in TEXTS]
+    # Соседние документы: слово не продолжается в следующий документ
+    documents += [_document("нача", "ло"), _document("ло конец"), _document()]
+    table = batch_metrics(documents, count_emoji=count_emoji)
+    assert len(table) == len(documents)
+    for index, data in enumerate(documents):
+        row = table.row(index)
+        assert row.pop("source") == str(index)
+        assert row == _scalar(data, count_emoji=count_emoji), index
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_batch_metrics_match_scalar_path_on_generated_documents(seed):
+    documents = [
+        generate_document(DocSpec(size=2_000, seed=seed * 10 + number))
+        for number in range(4)
+    ]
+    table = batch_metrics(documents, count_emoji=True)
+    assert [
+        {key: value for key, value in row.items() if key != "source"}
+        for row in table.rows()
+    ] == [_scalar(data, count_emoji=True) for data in documents]
+
+
+def test_batch_metrics_first_table_only():
+    documents = [
+        generate_document(
+            DocSpec(size=2_000, seed=number, table_ratio=0.5, table_rows=3)
+        )
+        for number in range(4)
+    ]
+    table = batch_metrics(documents, first_table_only=True)
+    assert [
+        {key: value for key, value in row.items() if key != "source"}
+        for row in table.rows()
+    ] == [_scalar(data, first_table_only=True) for data in documents]
+
+
+def test_count_words_matches_split_words_on_random_texts():
+    rng = random.Random(0)
+    alphabet = ["а", "b", "😀", " ", " ", "\t", "\n", "-", "–", ".", "'", "🇷🇺"]
+    texts = [
+        "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+        for _ in range(500)
+    ]
+    lengths = np.array([len(text) for text in texts], dtype=np.int64)
+    ends = np.cumsum(lengths)
+    codes = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32)
+    counts = count_words(codes, ends - lengths, ends)
+    assert counts.tolist() == [len(split_words(text)) for text in texts]
+
+
+def test_batch_metrics_reads_paths_and_documents(tmp_path):
+    data = _document("текст 😀 из файла")
+    path = tmp_path / "document.json"
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+    table = batch_metrics([str(path), Document(data, count_emoji=True)], True)
+    assert table.sources == [str(path), "1"]
+    assert table.rows() == [
+        {"source": source, **_scalar(data, count_emoji=True)}
+        for source in (str(path), "1")
+    ]
+    assert batch_metrics([]).rows() == []
@@ -0,0 +1,168 @@
+import pytest
+
+from docgen import DocSpec, generate_document
+from document import Document
+from walker import walk, walk_structure
+
+
+def _paragraph(*runs):
+    return {
+        "paragraph": {
+            "elements": [
+                {"textRun": {"content": text, "textStyle": style}}
+                for text, style in runs
+            ]
+        }
+    }
+
+
+def _link(url):
+    return {"link": {"url": url}}
+
+
+@pytest.mark.parametrize("element", [None, "text", 1, {}, []])
+def test_walk_without_containers_collects_nothing(element):
+    walked = walk(element)
+    assert walked.urls == []
+    assert walked.text_runs == []
+    assert walked.tables == []
+    assert walked.images == []
+
+
+@pytest.mark.parametrize("json_data", [None, {}])
+def test_empty_document_has_no_urls(json_data):
+    assert Document(json_data).urls == []
+    assert Document(json_data).metrics()["urls"] == []
+
+
+def test_walk_collects_only_string_urls():
+    content = [
+        _paragraph(("раз ", _link("https://a.example")), ("два\n", {})),
+        _paragraph(("три\n", {"link": {"url": None}})),
+        _paragraph(("четыре\n", {"link": {"bookmarkId": "b"}})),
+    ]
+    walked = walk(content)
+    assert walked.urls == ["https://a.example"]
+    assert walked.text == "раз два\nтри\nчетыре\n"
+
+
+# Корпус документов, на котором обход по схеме обязан совпадать с общим обходом
+CORPUS = [
+    DocSpec(size=20_000, seed=1),
+    DocSpec(size=20_000, seed=2, table_ratio=0.3, table_depth=3),
+    DocSpec(size=10_000, seed=3, emoji_density=0.2, link_ratio=0.3),
+    DocSpec(size=10_000, seed=4, cyrillic_ratio=0.0, images=0, headers=False),
+    DocSpec(size=5_000, seed=5, table_ratio=0.5, table_rows=5, table_columns=4),
+]
+
+
+def _handmade_document():
+    image = {
+        "inlineObjectElement": {
+            "inlineObjectId": "kix.1",
+            "textStyle": _link("https://image.example"),
+        }
+    }
+    suggested = {
+        "textRun": {
+            "content": "правка\n",
+            "textStyle": {},
+            "suggestedTextStyleChanges": {
+                "suggest.1": {"textStyle": _link("https://suggested.example")}
+            },
+        }
+    }
+    cell = {"content": [_paragraph(("ячейка 👍🏽\n", _link("https://cell.example")))]}
+    nested = {
+        "table": {
+            "tableRows": [
+                {"tableCells": [cell, {"content": [_paragraph(("x\n", {}))]}]}
+            ]
+        }
+    }
+    table = {
+        "table": {
+            "tableRows": [
+                {"tableCells": [cell, {"content": [_paragraph(("🇷🇺\n", {}))]}]},
+                {"tableCells": [{"content": [_paragraph(("вне\n", {})), nested]}]},
+            ]
+        }
+    }
+    # Ссылки в стиле маркера и в предложенных правках абзаца, между и после
+    # ссылок текста
+    bulleted = _paragraph(("пункт\n", _link("https://item.example")))
+    bulleted["paragraph"].update(
+        paragraphStyle={"namedStyleType": "NORMAL_TEXT"},
+        bullet={"listId": "kix.list", "textStyle": _link("https://bullet.example")},
+        suggestedBulletChanges={
+            "suggest.2": {
+                "bullet": {"textStyle": _link("https://suggested-bullet.example")}
+            }
+        },
+        suggestedParagraphStyleChanges={
+            "suggest.3": {"paragraphStyle": {"link": {"url": "https://p.example"}}}
+        },
+    )
+    ordered = {
+        "paragraph": {
+            "bullet": {
+                "listId": "kix.list",
+                "textStyle": _link("https://first.example"),
+            },
+            "elements": [{"textRun": {"content": "второй\n", "textStyle": {}}}],
+        }
+    }
+    table_of_contents = {
+        "tableOfContents": {
+            "content": [_paragraph(("Глава 1\n", _link("https://toc.example")))]
+        }
+    }
+    return {
+        "body": {
+            "content": [
+                {"sectionBreak": {"sectionStyle": {}}},
+                _paragraph(("Начало 👨‍👩‍👧 ", {}), ("текста\n", {})),
+                {"paragraph": {"elements": [image, suggested]}},
+                table,
+                table_of_contents,
+                bulleted,
+                ordered,
+                _paragraph(("Конец\n", {"bold": True})),
+            ]
+        },
+        "inlineObjects": {"kix.1": {}},
+        "namedStyles": {"styles": [{"textStyle": _link("https://style.example")}]},
+    }
+
+
+def _corpus():
+    yield "handmade", _handmade_document()
+    for spec in CORPUS:
+        yield f"seed-{spec.seed}", generate_document(spec)
+
+
+@pytest.mark.parametrize("name, document", list(_corpus()))
+def test_walk_structure_matches_walk(name, document):
+    content = document["body"]["content"]
+    generic = walk(content)
+    structural = walk_structure(content)
+    assert structural.text_runs == generic.text_runs
+    assert structural.urls == generic.urls
+    assert [id(table) for table in structural.tables] == [
+        id(table) for table in generic.tables
+    ]
+    assert [id(image) for image in structural.images] == [
+        id(image) for image in generic.images
+    ]
+
+
+@pytest.mark.parametrize("name, document", list(_corpus()))
+@pytest.mark.parametrize("count_emoji", [False, True])
+@pytest.mark.parametrize("first_table_only", [False, True])
+def test_structural_document_metrics(name, document, count_emoji, first_table_only):
+    tables = walk(document).tables
+    if first_table_only and (not tables or len(tables[0]["tableRows"]) < 2):
+        pytest.skip("в документе нет второй строки первой таблицы")
+    generic = Document(document, count_emoji, first_table_only)
+    structural = Document(document, count_emoji, first_table_only, structural=True)
+    assert structural.metrics() == generic.metrics()
@@ -0,0 +1,324 @@
+import copy
+import json
+
+import pytest
+
+from docgen import DocSpec, generate_document
+from document import Document
+from writer import (
+    UnsupportedContentWarning,
+    diff_requests,
+    document_requests,
+    split_batches,
+)
+
+EMPTY = {"body": {"content": [{"endIndex": 1, "sectionBreak": {}}]}}
+
+
+def _text(content: list) -> str:
+    return "".join(
+        element["textRun"]["content"]
+        for block in content
+        for element in block.get("paragraph", {}).get("elements", [])
+        if "textRun" in element
+    )
+
+
+def _apply(text: str, requests: list[dict]) -> str:
+    """Apply text inserts and deletes to a body that starts at index 1."""
+    # Индексы Docs считаются в кодовых единицах UTF-16, по два байта
+    units = bytearray(text.encode("utf-16-le"))
+    for request in requests:
+        if "insertText" in request:
+            offset = (request["insertText"]["location"]["index"] - 1) * 2
+            assert 0 <= offset < len(units)
+            units[offset:offset] = request["insertText"]["text"].encode("utf-16-le")
+        elif "deleteContentRange" in request:
+            range_ = request["deleteContentRange"]["range"]
+            assert range_["startIndex"] < range_["endIndex"]
+            del units[(range_["startIndex"] - 1) * 2 : (range_["endIndex"] - 1) * 2]
+        elif "createParagraphBullets" in request:
+            # Табуляции в начале абзацев списка становятся уровнем вложенности
+            range_ = request["createParagraphBullets"]["range"]
+            for index in reversed(range(range_["startIndex"], range_["endIndex"])):
+                offset = (index - 1) * 2
+                if offset and units[offset - 2 : offset] != "\n".encode("utf-16-le"):
+                    continue
+                while units[offset : offset + 2] == "\t".encode("utf-16-le"):
+                    del units[offset : offset + 2]
+        else:
+            assert "insertTable" not in request and "insertInlineImage" not in request
+    return units.decode("utf-16-le")
+
+
+def _plain(seed: int) -> dict:
+    spec = DocSpec(
+        size=3000,
+        seed=seed,
+        table_ratio=0,
+        images=0,
+        emoji_density=0.1,
+        headers=False,
+    )
+    return generate_document(spec)
+
+
+def _edited(data: dict, index: int, text: str) -> dict:
+    """Return a copy of `data` with the text of one paragraph replaced."""
+    data = copy.deepcopy(data)
+    content = data["body"]["content"]
+    paragraph = content[index]["paragraph"]
+    paragraph["elements"] = [{"textRun": {"content": text, "textStyle": {}}}]
+    # Индексы ниже правки не пересчитываются: diff сравнивает элементы без них
+    return data
+
+
+def test_document_requests_write_the_whole_body():
+    for seed in range(5):
+        data = _plain(seed)
+        requests = document_requests(Document(data))
+        assert _apply("\n", requests) == _text(data["body"]["content"])
+
+
+def _tables(content: list) -> list[tuple[int, int]]:
+    tables = []
+    for block in content:
+        if "table" in block:
+            table = block["table"]
+            tables.append((len(table["tableRows"]), table["columns"]))
+            for row in table["tableRows"]:
+                for cell in row["tableCells"]:
+                    tables.extend(_tables(cell["content"]))
+    return tables
+
+
+def test_document_requests_insert_tables_and_images():
+    spec = DocSpec(
+        size=3000, seed=3, table_ratio=0.3, table_depth=2, images=2, headers=False
+    )
+    data = generate_document(spec)
+    requests = document_requests(Document(data))
+    tables = [
+        (request["insertTable"]["rows"], request["insertTable"]["columns"])
+        for request in requests
+        if "insertTable" in request
+    ]
+    assert tables == _tables(data["body"]["content"])
+    assert len(tables) > 1
+    locations = {
+        request["insertTable"]["location"]["index"]
+        for request in requests
+        if "insertTable" in request
+    }
+    for block in data["body"]["content"]:
+        if "table" in block:
+            # insertTable сам добавляет перевод строки перед таблицей
+            assert block["startIndex"] - 1 in locations
+    uris = [
+        request["insertInlineImage"]["uri"]
+        for request in requests
+        if "insertInlineImage" in request
+    ]
+    assert sorted(uris) == sorted(
+        item["inlineObjectProperties"]["embeddedObject"]["imageProperties"][
+            "contentUri"
+        ]
+        for item in data["inlineObjects"].values()
+    )
+    # Вставки идут по возрастанию индексов: каждая ставится на своё место
+    locations = [
+        request[kind]["location"]["index"]
+        for request in requests
+        for kind in ("insertText", "insertTable", "insertInlineImage")
+        if kind in request
+    ]
+    assert locations == sorted(locations)
+
+
+def test_diff_requests_rewrite_only_changed_elements():
+    data = _plain(1)
+    content = data["body"]["content"]
+    middle = len(content) // 2
+    edited = _edited(data, middle, "новый текст 😀\n")
+
+    requests = diff_requests(data, Document(edited))
+    deletes = [request for request in requests if "deleteContentRange" in request]
+    assert deletes == [
+        {
+            "deleteContentRange": {
+                "range": {
+                    "startIndex": content[middle]["startIndex"],
+                    "endIndex": content[middle]["endIndex"] - 1,
+                }
+            }
+        }
+    ]
+    old_text = _text(content)
+    assert _apply(old_text, requests) == _text(edited["body"]["content"])
+
+
+def test_diff_requests_edit_first_and_last_paragraphs():
+    data = _plain(2)
+    content = data["body"]["content"]
+    for index in (1, len(content) - 1):
+        edited = _edited(data, index, "x\n")
+        requests = diff_requests(data, Document(edited))
+        assert _apply(_text(content), requests) == _text(edited["body"]["content"])
+
+
+def test_diff_requests_without_changes():
+    data = _plain(4)
+    assert diff_requests(data, Document(copy.deepcopy(data))) == []
+
+
+def test_diff_requests_empty_new_body():
+    data = _plain(5)
+    requests = diff_requests(data, Document(EMPTY))
+    # Последний перевод строки тела удалить нельзя
+    assert _apply(_text(data["body"]["content"]), requests) == "\n"
+    assert requests[0]["deleteContentRange"]["range"]["startIndex"] == 1
+
+
+def test_diff_requests_empty_current_body():
+    data = _plain(6)
+    requests = diff_requests(EMPTY, Document(data))
+    assert requests == document_requests(Document(data))
+    assert diff_requests(EMPTY, Document(EMPTY)) == []
+
+
+def _list_document() -> dict:
+    paragraphs = [
+        ("до списка\n", None),
+        ("первый\n", ("kix.bullets", 0)),
+        ("вложенный 😀\n", ("kix.bullets", 1)),
+        ("второй\n", ("kix.bullets", 0)),
+        ("между списками\n", None),
+        ("один\n", ("kix.numbers", 0)),
+        ("два\n", ("kix.numbers", 0)),
+    ]
+    content = [{"endIndex": 1, "sectionBreak": {}}]
+    index = 1
+    for text, bullet in paragraphs:
+        end = index + len(text.encode("utf-16-le")) // 2
+        paragraph: dict = {
+            "elements": [{"textRun": {"content": text, "textStyle": {}}}],
+            "paragraphStyle": {"namedStyleType": "NORMAL_TEXT"},
+        }
+        if bullet is not None:
+            paragraph["bullet"] = {"listId": bullet[0], "nestingLevel": bullet[1]}
+        content.append({"startIndex": index, "endIndex": end, "paragraph": paragraph})
+        index = end
+    return {
+        "body": {"content": content},
+        "lists": {
+            "kix.bullets": {
+                "listProperties": {"nestingLevels": [{"glyphSymbol": "●"}]}
+            },
+            "kix.numbers": {
+                "listProperties": {"nestingLevels": [{"glyphType": "DECIMAL"}]}
+            },
+        },
+    }
+
+
+def _bullets(requests: list[dict]) -> list[tuple[int, int, str]]:
+    return [
+        (
+            request["createParagraphBullets"]["range"]["startIndex"],
+            request["createParagraphBullets"]["range"]["endIndex"],
+            request["createParagraphBullets"]["bulletPreset"],
+        )
+        for request in requests
+        if "createParagraphBullets" in request
+    ]
+
+
+def test_document_requests_create_lists():
+    data = _list_document()
+    content = data["body"]["content"]
+    requests = document_requests(Document(data))
+
+    # Вложенный абзац получает табуляцию, поэтому первый список длиннее на 1
+    assert _bullets(requests) == [
+        (
+            content[6]["startIndex"] + 1,
+            content[7]["endIndex"] + 1,
+            "NUMBERED_DECIMAL_ALPHA_ROMAN",
+        ),
+        (
+            content[2]["startIndex"],
+            content[4]["endIndex"] + 1,
+            "BULLET_DISC_CIRCLE_SQUARE",
+        ),
+    ]
+    # Маркеры создаются после вставок и стилей
+    first = next(
+        number
+        for number, request in enumerate(requests)
+        if "createParagraphBullets" in request
+    )
+    assert all("createParagraphBullets" in request for request in requests[first:])
+    assert _apply("\n", requests[:first]).count("\t") == 1
+    assert _apply("\n", requests) == _text(content)
+
+
+def test_diff_requests_remove_bullet_of_kept_paragraph():
+    data = _list_document()
+    content = data["body"]["content"]
+    # Правка последнего абзаца списка: его перевод строки остаётся на месте
+    edited = copy.deepcopy(data)
+    edited["body"]["content"][7] = copy.deepcopy(content[1])
+
+    requests = diff_requests(data, Document(edited))
+    start = content[7]["startIndex"]
+    changed = {"startIndex": start, "endIndex": start + len("до списка\n")}
+    assert {"deleteParagraphBullets": {"range": changed}} in requests
+    assert _bullets(requests) == []
+    assert _apply(_text(content), requests) == _text(edited["body"]["content"])
+
+    # Обычный абзац на месте абзаца списка получает маркер заново
+    edited["body"]["content"][7] = copy.deepcopy(content[3])
+    requests = diff_requests(data, Document(edited))
+    assert _bullets(requests) == [
+        (
+            content[7]["startIndex"],
+            content[7]["startIndex"] + len("\tвложенный 😀\n") + 1,
+            "BULLET_DISC_CIRCLE_SQUARE",
+        )
+    ]
+    assert _apply(_text(content), requests) == _text(edited["body"]["content"])
+
+
+def test_unsupported_content_warns():
+    data = _list_document()
+    with pytest.warns(UnsupportedContentWarning, match="headers"):
+        document_requests(Document(dict(data, headers={"kix.h": {"content": []}})))
+
+    toc = copy.deepcopy(data)
+    toc["body"]["content"].insert(1, {"tableOfContents": {"content": []}})
+    with pytest.warns(UnsupportedContentWarning, match="tableOfContents"):
+        document_requests(Document(toc))
+
+    # Сноска, изменённая в новой версии, тоже не переносится
+    footnotes = dict(data, footnotes={"kix.f": {"content": []}})
+    with pytest.warns(UnsupportedContentWarning, match="footnotes"):
+        diff_requests(data, Document(footnotes))
+
+
+def test_split_batches_keep_order_and_size():
+    requests = document_requests(Document(_plain(7)))
+    requests += [{"insertText": {"location": {"index": 1}, "text": "й" * 400}}] * 20
+    max_bytes = 2000
+    batches = split_batches(requests, max_bytes)
+    assert [request for batch in batches for request in batch] == requests
+    for batch in batches:
+        size = sum(
+            len(json.dumps(request, ensure_ascii=False).encode("utf-8"))
+            for request in batch
+        )
+        # Запрос больше лимита уходит отдельным пакетом
+        assert size <= max_bytes or len(batch) == 1
+
+
+def test_split_batches_empty():
+    assert split_batches([]) == []
@@ -0,0 +1,86 @@
+import re
+import string
+from typing import Iterable, Iterator
+
+# Знаки, которые разделяют слова (вместе с пробелом)
+SEPARATORS = ",.:#><()[]\\|/?\x0b—=”“!%\t\n"
+# Знаки, которые склеивают части слова (удаляются без замены на пробел)
+JOINERS = "–-"
+
+_WORD_RE = re.compile(f"[^ {re.escape(SEPARATORS)}]+")
+_SEPARATOR_SET = frozenset(SEPARATORS + " ")
+_PUNCTUATION = string.punctuation
+
+
+def _remove_joiners(text: str) -> str:
+    for joiner in JOINERS:
+        text = text.replace(joiner, "")
+    return text
+
+
+def _filter_words(tokens: list[str]) -> list[str]:
+    # Слово должно содержать хотя бы один символ, не являющийся знаком пунктуации
+    return [
+        token for token in tokens if token.strip(_PUNCTUATION) and not token.isspace()
+    ]
+
+
+def split_words(text: str, strip: bool = True) -> list[str]:
+    """Split text into words with the separator rules of `Document.extract_words`.
+
+    Without `strip` the text is treated as a piece from the middle of a longer
+    text, keeping its leading and trailing whitespace.
+    """
+    if strip:
+        text = text.strip()
+    return _filter_words(_WORD_RE.findall(_remove_joiners(text)))
+
+
+class WordSplitter:
+    """Incremental splitter fed with consecutive pieces of one text.
+
+    Words returned by `feed()` and `close()` together equal
+    `split_words` of the joined text. Only the unfinished last word and any
+    trailing whitespace are carried over to the next piece.
+    """
+
+    def __init__(self) -> None:
+        # Незаконченное последнее слово (уже без склеивающих знаков) и пробелы после него
+        self._carry_word = ""
+        self._carry_tail = ""
+        self._started = False
+
+    def feed(self, chunk: str) -> list[str]:
+        if not self._started:
+            # Пробелы в начале всего текста отбрасываются, как в str.strip()
+            chunk = chunk.lstrip()
+            if not chunk:
+                return []
+            self._started = True
+
+        raw = self._carry_tail + chunk
+        stripped = raw.rstrip()
+        # Пробелы в конце могут оказаться концом всего текста, их нельзя разбирать
+        self._carry_tail = raw[len(stripped) :]
+        if not stripped:
+            return []
+
+        text = self._carry_word + _remove_joiners(stripped)
+        tokens = _WORD_RE.findall(text)
+        self._carry_word = (
+            tokens.pop() if text and text[-1] not in _SEPARATOR_SET else ""
+        )
+        return _filter_words(tokens)
+
+    def close(self) -> list[str]:
+        words = _filter_words([self._carry_word])
+        self._carry_word = self._carry_tail = ""
+        return words
+
+
+def iter_words(chunks: Iterable[str]) -> Iterator[str]:
+    """Yield the same words as `split_words("".join(chunks))` without joining."""
+    splitter = WordSplitter()
+    for chunk in chunks:
+        yield from splitter.feed(chunk)
+    yield from splitter.close()
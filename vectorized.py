@@ -0,0 +1,181 @@
+import json
+import string
+from functools import lru_cache
+from typing import Iterable, Union
+
+import numpy as np
+
+from document import Document
+from tokenizer import JOINERS, SEPARATORS
+
+# Классы символов для подсчёта слов
+_SEPARATOR = 0
+_JOINER = 1
+_SPACE = 2
+_PUNCTUATION = 3
+_OTHER = 4
+
+
+@lru_cache(maxsize=None)
+def _char_tables() -> tuple[np.ndarray, np.ndarray]:
+    """Class and `str.isspace` of every code point, indexed by the UTF-32 value."""
+    whitespace = np.zeros(0x110000, dtype=bool)
+    whitespace[[code for code in range(0x110000) if chr(code).isspace()]] = True
+
+    classes = np.full(0x110000, _OTHER, dtype=np.uint8)
+    classes[[ord(char) for char in string.punctuation]] = _PUNCTUATION
+    classes[whitespace] = _SPACE
+    classes[[ord(char) for char in JOINERS]] = _JOINER
+    classes[[ord(char) for char in SEPARATORS + " "]] = _SEPARATOR
+    return classes, whitespace
+
+
+def _segment_counts(
+    positions: np.ndarray, starts: np.ndarray, ends: np.ndarray
+) -> np.ndarray:
+    # Число отсортированных позиций в каждом отрезке, пустые отрезки дают ноль
+    return np.searchsorted(positions, ends) - np.searchsorted(positions, starts)
+
+
+def count_words(codes: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Count words of every text in a UTF-32 buffer, as `split_words` does.
+
+    A token is a run of characters between separators once joiners are
+    removed. It is a word when it has a character that is neither
+    punctuation nor whitespace, or has both punctuation and whitespace.
+    The whitespace stripped from the ends of each text never counts.
+    """
+    class_table, whitespace_table = _char_tables()
+    classes = class_table[codes]
+
+    # Обрезка пробельных символов по краям каждого текста до удаления склеек:
+    # разделители уже не входят в слова, важны только прочие пробельные
+    solid = np.concatenate(
+        ([-1], np.flatnonzero(~whitespace_table[codes]), [len(codes)])
+    )
+    first = solid[np.searchsorted(solid, starts)]
+    last = solid[np.searchsorted(solid, ends) - 1]
+    spaces = np.flatnonzero(classes == _SPACE)
+    text = np.searchsorted(ends, spaces, side="right")
+    classes[spaces[(spaces < first[text]) | (spaces > last[text])]] = _SEPARATOR
+
+    # Удаление склеек со сдвигом границ текстов
+    joiners = np.flatnonzero(classes == _JOINER)
+    if len(joiners):
+        classes = np.delete(classes, joiners)
+        starts = starts - np.searchsorted(joiners, starts)
+        ends = ends - np.searchsorted(joiners, ends)
+
+    # Слово не продолжается через границу текстов
+    in_token = classes != _SEPARATOR
+    token_start = in_token.copy()
+    token_start[1:] &= ~in_token[:-1]
+    token_end = in_token.copy()
+    token_end[:-1] &= ~in_token[1:]
+    filled = starts < ends
+    token_start[starts[filled]] = in_token[starts[filled]]
+    token_end[ends[filled] - 1] = in_token[ends[filled] - 1]
+    token_starts = np.flatnonzero(token_start)
+    token_ends = np.flatnonzero(token_end) + 1
+
+    # Состав токенов по редким классам: пробельные символы и пунктуация
+    space = _segment_counts(np.flatnonzero(classes == _SPACE), token_starts, token_ends)
+    punctuation = _segment_counts(
+        np.flatnonzero(classes == _PUNCTUATION), token_starts, token_ends
+    )
+    other = token_ends - token_starts > space + punctuation
+    words = other | ((space > 0) & (punctuation > 0))
+    return _segment_counts(token_starts[words], starts, ends)
+
+
+class MetricsTable:
+    """Metric columns of a batch of documents, one row per document."""
+
+    COLUMNS = (
+        "word_count",
+        "total_characters",
+        "characters_without_spaces",
+        "image_count",
+        "count_emoji",
+    )
+
+    def __init__(self, sources: list[str], columns: dict[str, np.ndarray]) -> None:
+        self.sources = sources
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.sources)
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.columns[column]
+
+    def row(self, index: int) -> dict:
+        """Counters of one document, as in `Document.metrics()` without URLs."""
+        row = {"source": self.sources[index]}
+        row.update(
+            (column, int(self.columns[column][index])) for column in self.COLUMNS
+        )
+        return row
+
+    def rows(self) -> list[dict]:
+        return [self.row(index) for index in range(len(self))]
+
+
+def _load(
+    source: Union[Document, dict, str], count_emoji: bool, first_table_only: bool
+) -> Document:
+    if isinstance(source, Document):
+        return source
+    if isinstance(source, str):
+        with open(source, encoding="utf-8") as f:
+            source = json.load(f)
+    return Document(source, count_emoji=count_emoji, first_table_only=first_table_only)
+
+
+def batch_metrics(
+    sources: Iterable[Union[Document, dict, str]],
+    count_emoji=False,
+    first_table_only=False,
+) -> MetricsTable:
+    """Count the metrics of many documents at once over one UTF-32 buffer.
+
+    Sources are `Document` objects, Docs JSON dicts or paths to saved JSON
+    exports. Characters and words of all documents are counted with
+    vectorized operations; only emoji, when enabled, are counted per
+    document.
+    """
+    names: list[str] = []
+    texts: list[str] = []
+    images: list[int] = []
+    emoji: list[int] = []
+    for number, source in enumerate(sources):
+        document = _load(source, count_emoji, first_table_only)
+        names.append(source if isinstance(source, str) else str(number))
+        texts.append(document.raw_content)
+        images.append(document.image_count)
+        emoji.append(document.count_emoji if count_emoji else 0)
+
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    codes = np.frombuffer(
+        "".join(texts).encode("utf-32-le", "surrogatepass"), dtype=np.uint32
+    )
+    del texts
+
+    newlines = _segment_counts(np.flatnonzero(codes == ord("\n")), starts, ends)
+    spaces = _segment_counts(np.flatnonzero(codes == ord(" ")), starts, ends)
+    image_count = np.array(images, dtype=np.int64)
+    emoji_count = np.array(emoji, dtype=np.int64)
+    extra = image_count + emoji_count
+
+    return MetricsTable(
+        names,
+        {
+            "word_count": count_words(codes, starts, ends),
+            "total_characters": lengths - newlines + extra,
+            "characters_without_spaces": lengths - newlines - spaces + extra,
+            "image_count": image_count,
+            "count_emoji": emoji_count,
+        },
+    )
@@ -0,0 +1,201 @@
+from typing import Any, Union
+
+# Флаги элементов стека обхода
+_IN_TABLE = 1
+_IN_IMAGE = 2
+_NEW_TABLE = 4
+_NEW_IMAGE = 8
+
+# Части абзаца помимо элементов, в стилях которых могут быть ссылки
+_PARAGRAPH_LINK_KEYS = frozenset(
+    ("bullet", "suggestedBulletChanges", "suggestedParagraphStyleChanges")
+)
+
+
+class DocumentWalk:
+    """Result of a single pass over the Docs JSON tree."""
+
+    __slots__ = ("text_runs", "tables", "images", "urls")
+
+    def __init__(self) -> None:
+        self.text_runs: list[str] = []
+        self.tables: list[dict] = []
+        self.images: list[dict] = []
+        self.urls: list[str] = []
+
+    @property
+    def text(self) -> str:
+        return "".join(self.text_runs)
+
+
+def walk(element: Any) -> DocumentWalk:
+    """Collect text runs, tables, inline objects and URLs in one iterative pass.
+
+    The order of every collected list matches a depth-first walk over the
+    element, the same order the old recursive helpers produced. Tables nested
+    inside an already collected table are not collected again.
+    """
+    result = DocumentWalk()
+    text_runs = result.text_runs
+    tables = result.tables
+    images = result.images
+    urls = result.urls
+    if not isinstance(element, (dict, list)):
+        return result
+
+    stack: list[tuple[Any, int]] = [(element, 0)]
+    pop = stack.pop
+    push = stack.append
+
+    while stack:
+        node, flags = pop()
+
+        if isinstance(node, dict):
+            if flags & _NEW_TABLE:
+                tables.append(node)
+            if flags & _NEW_IMAGE:
+                images.append(node)
+
+            content = node.get("content")
+            if isinstance(content, str):
+                text_runs.append(content)
+
+            flags &= _IN_TABLE | _IN_IMAGE
+            for key, value in reversed(node.items()):
+                if isinstance(value, dict):
+                    if key == "table" and not flags & _IN_TABLE:
+                        push((value, flags | _IN_TABLE | _NEW_TABLE))
+                    elif key == "inlineObjectElement" and not flags & _IN_IMAGE:
+                        push((value, flags | _IN_IMAGE | _NEW_IMAGE))
+                    else:
+                        push((value, flags))
+                elif isinstance(value, list):
+                    push((value, flags))
+                elif key == "url" and isinstance(value, str):
+                    push((value, flags))
+
+        elif isinstance(node, list):
+            flags &= _IN_TABLE | _IN_IMAGE
+            for item in reversed(node):
+                if isinstance(item, (dict, list)):
+                    push((item, flags))
+
+        else:
+            # В стек попадают только строки из ключей "url"
+            urls.append(node)
+
+    return result
+
+
+def collect_element_urls(element: dict, urls: list[str]) -> None:
+    # Ссылки хранятся в textStyle элемента абзаца и в предложенных изменениях стиля
+    for value in element.values():
+        if not isinstance(value, dict):
+            continue
+
+        url = value.get("textStyle", {}).get("link", {}).get("url")
+        if isinstance(url, str):
+            urls.append(url)
+
+        for change in value.get("suggestedTextStyleChanges", {}).values():
+            url = change.get("textStyle", {}).get("link", {}).get("url")
+            if isinstance(url, str):
+                urls.append(url)
+
+
+def walk_structure(element: Any) -> DocumentWalk:
+    """Collect the same data as `walk`, following only the Docs schema.
+
+    Accepts a list of structural elements (`body.content`), a table row or a
+    whole document. Paragraph styles, named styles and lists are never
+    visited; only bullets and suggested paragraph changes, which can hold
+    links, are walked generically.
+    """
+    result = DocumentWalk()
+    text_runs = result.text_runs
+    tables = result.tables
+    images = result.images
+    urls = result.urls
+
+    stack: list[tuple[dict, bool]] = []
+    push = stack.append
+    append_text = text_runs.append
+    empty: dict = {}
+
+    def push_content(content: list, in_table: bool) -> None:
+        for item in reversed(content):
+            push((item, in_table))
+
+    if isinstance(element, list):
+        push_content(element, False)
+    elif isinstance(element, dict) and "tableCells" in element:
+        for cell in reversed(element["tableCells"]):
+            push_content(cell.get("content", []), False)
+    elif isinstance(element, dict):
+        for key, segment in reversed(element.items()):
+            if key == "body":
+                push_content(segment.get("content", []), False)
+            elif key in ("headers", "footers", "footnotes"):
+                for part in reversed(segment.values()):
+                    push_content(part.get("content", []), False)
+
+    while stack:
+        node, in_table = stack.pop()
+
+        paragraph = node.get("paragraph")
+        if paragraph is not None:
+            after: Union[list[str], None] = None
+            if not _PARAGRAPH_LINK_KEYS.isdisjoint(paragraph):
+                # Ссылки маркера и предложенных правок идут в порядке ключей
+                # абзаца до или после ссылок его элементов, как при общем обходе
+                target = urls
+                after = []
+                for key, value in paragraph.items():
+                    if key == "elements":
+                        target = after
+                    elif key in _PARAGRAPH_LINK_KEYS:
+                        target.extend(walk(value).urls)
+
+            for paragraph_element in paragraph.get("elements", ()):
+                # По схеме у элемента абзаца одно содержимое, чаще всего textRun
+                text_run = paragraph_element.get("textRun")
+                if text_run is None:
+                    image = paragraph_element.get("inlineObjectElement")
+                    if image is not None:
+                        images.append(image)
+                    collect_element_urls(paragraph_element, urls)
+                    continue
+
+                content = text_run.get("content")
+                if isinstance(content, str):
+                    append_text(content)
+                link = text_run.get("textStyle", empty).get("link")
+                if link is not None:
+                    url = link.get("url")
+                    if isinstance(url, str):
+                        urls.append(url)
+                if "suggestedTextStyleChanges" in text_run:
+                    for change in text_run["suggestedTextStyleChanges"].values():
+                        url = (
+                            change.get("textStyle", empty).get("link", empty).get("url")
+                        )
+                        if isinstance(url, str):
+                            urls.append(url)
+            if after:
+                urls.extend(after)
+            continue
+
+        table = node.get("table")
+        if table is not None:
+            if not in_table:
+                tables.append(table)
+            for row in reversed(table.get("tableRows", [])):
+                for cell in reversed(row.get("tableCells", [])):
+                    push_content(cell.get("content", []), True)
+            continue
+
+        table_of_contents = node.get("tableOfContents")
+        if table_of_contents is not None:
+            push_content(table_of_contents.get("content", []), in_table)
+
+    return result
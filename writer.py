@@ -0,0 +1,429 @@
+import json
+import warnings
+from typing import TYPE_CHECKING, Union
+
+if TYPE_CHECKING:
+    from document import Document
+
+# Ограничения одного вызова batchUpdate: размер тела и длина вставляемого текста
+MAX_BATCH_BYTES = 1024 * 1024
+MAX_INSERT_LENGTH = 50_000
+
+# Стиль абзаца нового документа и поля, которые API только отдаёт
+DEFAULT_PARAGRAPH_STYLE = {
+    "namedStyleType": "NORMAL_TEXT",
+    "direction": "LEFT_TO_RIGHT",
+}
+READ_ONLY_PARAGRAPH_FIELDS = ("headingId", "tabStops")
+# Элементы абзаца, которые переносятся в копию; остальные теряются
+WRITTEN_PARAGRAPH_ELEMENTS = ("textRun", "inlineObjectElement")
+# Части документа вне тела, которых запросы не касаются
+UNWRITTEN_SEGMENTS = ("headers", "footers", "footnotes")
+# Типы нумерации, которые дают нумерованный список, а не маркированный
+UNORDERED_GLYPH_TYPES = ("GLYPH_TYPE_UNSPECIFIED", "NONE")
+
+
+class UnsupportedContentWarning(UserWarning):
+    """Part of the document that the requests do not reproduce."""
+
+
+def _bullet_preset(list_properties: dict) -> str:
+    levels = list_properties.get("listProperties", {}).get("nestingLevels", [])
+    glyph_type = levels[0].get("glyphType") if levels else None
+    if glyph_type and glyph_type not in UNORDERED_GLYPH_TYPES:
+        return "NUMBERED_DECIMAL_ALPHA_ROMAN"
+    return "BULLET_DISC_CIRCLE_SQUARE"
+
+
+def _length(text: str) -> int:
+    # Индексы Docs считаются в кодовых единицах UTF-16
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _add_range(
+    ranges: list[list], start: int, end: int, style: Union[dict, str]
+) -> None:
+    # Соседние диапазоны с одинаковым стилем сливаются в один запрос
+    if ranges and ranges[-1][1] == start and ranges[-1][2] == style:
+        ranges[-1][1] = end
+    elif style:
+        ranges.append([start, end, style])
+
+
+def _text_style(style: dict) -> dict:
+    link = style.get("link")
+    if link is not None and "url" not in link:
+        # Ссылки на закладки и заголовки исходного документа здесь не существуют
+        style = {key: value for key, value in style.items() if key != "link"}
+    return style
+
+
+def _paragraph_style(style: dict) -> dict:
+    return {
+        key: value
+        for key, value in style.items()
+        if key not in READ_ONLY_PARAGRAPH_FIELDS
+        and DEFAULT_PARAGRAPH_STYLE.get(key) != value
+    }
+
+
+class _RequestBuilder:
+    """Collects inserts and style ranges of structural elements in document order.
+
+    Every insert is placed at its final index: content is written front to
+    back, and each segment ends before a newline that is already there (the
+    last paragraph of the body or of a table cell). Element kinds that
+    cannot be written are collected in `skipped`.
+    """
+
+    def __init__(self, inline_objects: dict, lists: Union[dict, None] = None) -> None:
+        self.inline_objects = inline_objects
+        self.lists = lists or {}
+        self.inserts: list[dict] = []
+        self.paragraph_styles: list[list] = []
+        self.text_styles: list[list] = []
+        self.bullets: list[list] = []
+        self.skipped: set[str] = set()
+
+    def content(self, elements: list[dict], cursor: int) -> int:
+        """Insert `elements` at `cursor`, return the index of the kept newline."""
+        start = cursor
+        text: list[str] = []
+        images: list[dict] = []
+        for element in elements:
+            if "paragraph" in element:
+                cursor = self.paragraph(element["paragraph"], cursor, text, images)
+            elif "table" in element:
+                # Перевод строки перед таблицей вставляет сам insertTable
+                cursor = self.flush(start, text, images)
+                cursor = self.table(element["table"], cursor)
+                start = cursor
+                text = []
+                images = []
+            else:
+                self.skipped.update(
+                    key for key in element if key not in ("startIndex", "endIndex")
+                )
+        return self.flush(start, text, images)
+
+    def paragraph(
+        self, paragraph: dict, cursor: int, text: list[str], images: list[dict]
+    ) -> int:
+        start = cursor
+        bullet = paragraph.get("bullet")
+        if bullet is not None:
+            # Уровень вложенности задают табуляции в начале абзаца, которые
+            # createParagraphBullets затем удаляет
+            level = bullet.get("nestingLevel", 0)
+            text.append("\t" * level)
+            cursor += level
+
+        for element in paragraph.get("elements", []):
+            text_run = element.get("textRun")
+            if text_run is not None:
+                content = text_run.get("content", "")
+                end = cursor + _length(content)
+                _add_range(
+                    self.text_styles,
+                    cursor,
+                    end,
+                    _text_style(text_run.get("textStyle", {})),
+                )
+                text.append(content)
+                cursor = end
+                continue
+
+            image = element.get("inlineObjectElement")
+            if image is not None:
+                embedded = (
+                    self.inline_objects.get(image.get("inlineObjectId"), {})
+                    .get("inlineObjectProperties", {})
+                    .get("embeddedObject", {})
+                )
+                uri = embedded.get("imageProperties", {}).get("contentUri")
+                if uri:
+                    request: dict = {"location": {"index": cursor}, "uri": uri}
+                    if "size" in embedded:
+                        request["objectSize"] = embedded["size"]
+                    images.append({"insertInlineImage": request})
+                    cursor += 1
+                else:
+                    self.skipped.add("inlineObjectElement")
+                continue
+
+            self.skipped.update(
+                key
+                for key in element
+                if key not in ("startIndex", "endIndex", *WRITTEN_PARAGRAPH_ELEMENTS)
+            )
+
+        _add_range(
+            self.paragraph_styles,
+            start,
+            cursor,
+            _paragraph_style(paragraph.get("paragraphStyle", {})),
+        )
+        if bullet is not None:
+            _add_range(self.bullets, start, cursor, bullet.get("listId", ""))
+        return cursor
+
+    def flush(self, start: int, text: list[str], images: list[dict]) -> int:
+        # Текст сегмента вставляется одним запросом без последнего перевода
+        # строки, а изображения после него по возрастанию их итоговых индексов
+        joined = "".join(text)
+        if joined.endswith("\n"):
+            joined = joined[:-1]
+
+        index = start
+        for offset in range(0, len(joined), MAX_INSERT_LENGTH):
+            chunk = joined[offset : offset + MAX_INSERT_LENGTH]
+            self.inserts.append(
+                {"insertText": {"location": {"index": index}, "text": chunk}}
+            )
+            index += _length(chunk)
+
+        self.inserts.extend(images)
+        return index + len(images)
+
+    def table(self, table: dict, cursor: int) -> int:
+        rows = table.get("tableRows", [])
+        columns = table.get("columns") or max(
+            (len(row.get("tableCells", [])) for row in rows), default=0
+        )
+        if not rows or not columns:
+            return cursor
+
+        self.inserts.append(
+            {
+                "insertTable": {
+                    "rows": len(rows),
+                    "columns": columns,
+                    "location": {"index": cursor},
+                }
+            }
+        )
+        # Перевод строки и начало таблицы, затем у каждой строки и ячейки своё
+        # начало, а пустая ячейка содержит только перевод строки
+        cursor += 2
+        for row in rows:
+            cursor += 1
+            cells = row.get("tableCells", [])
+            for column in range(columns):
+                content = (
+                    cells[column].get("content", []) if column < len(cells) else []
+                )
+                cursor = self.content(content, cursor + 1) + 1
+        return cursor + 1
+
+    def requests(self) -> list[dict]:
+        """Inserts first, then styles over final ranges, then list bullets."""
+        requests = list(self.inserts)
+        requests.extend(
+            {
+                "updateParagraphStyle": {
+                    "range": {"startIndex": start, "endIndex": end},
+                    "paragraphStyle": style,
+                    "fields": ",".join(style),
+                }
+            }
+            for start, end, style in self.paragraph_styles
+        )
+        requests.extend(
+            {
+                "updateTextStyle": {
+                    "range": {"startIndex": start, "endIndex": end},
+                    "textStyle": style,
+                    "fields": ",".join(style),
+                }
+            }
+            for start, end, style in self.text_styles
+            if start < end
+        )
+        # Удалённые табуляции сдвигают текст дальше, поэтому списки с конца
+        requests.extend(
+            {
+                "createParagraphBullets": {
+                    "range": {"startIndex": start, "endIndex": end},
+                    "bulletPreset": _bullet_preset(self.lists.get(list_id, {})),
+                }
+            }
+            for start, end, list_id in reversed(self.bullets)
+        )
+        return requests
+
+    def warn_skipped(self) -> None:
+        if self.skipped:
+            warnings.warn(
+                "Запросы не переносят элементы: " + ", ".join(sorted(self.skipped)),
+                UnsupportedContentWarning,
+                stacklevel=3,
+            )
+
+
+def _body(json_data: Union[dict, None]) -> list[dict]:
+    if json_data is None:
+        raise ValueError("Документ загружен из потока, исходный JSON недоступен")
+    content = json_data.get("body", {}).get("content", [])
+    # Разрыв раздела в начале тела есть в любом документе
+    return [element for element in content if "sectionBreak" not in element]
+
+
+def _builder(json_data: dict) -> _RequestBuilder:
+    return _RequestBuilder(json_data.get("inlineObjects", {}), json_data.get("lists"))
+
+
+def _segments(json_data: dict) -> dict:
+    return {name: json_data[name] for name in UNWRITTEN_SEGMENTS if json_data.get(name)}
+
+
+def document_requests(document: "Document") -> list[dict]:
+    """Build `batchUpdate` requests that write `document` into a new empty doc.
+
+    Text runs are coalesced into one insert per segment between tables,
+    and adjacent ranges with the same style into one style update. Inline
+    images are inserted from their `contentUri`, which must still be valid.
+    Consecutive paragraphs of one list become one list with the preset of
+    its first nesting level. Headers, footers, footnotes, tables of contents
+    and other elements the API cannot insert are skipped with an
+    `UnsupportedContentWarning`.
+    """
+    body = _body(document.json_data)
+    builder = _builder(document.json_data)
+    builder.skipped.update(_segments(document.json_data))
+    builder.content(body, 1)
+    builder.warn_skipped()
+    return builder.requests()
+
+
+def _without_indices(node):
+    if isinstance(node, dict):
+        return {
+            key: _without_indices(value)
+            for key, value in node.items()
+            if key not in ("startIndex", "endIndex")
+        }
+    if isinstance(node, list):
+        return [_without_indices(value) for value in node]
+    return node
+
+
+def _fingerprint(element: dict) -> str:
+    return json.dumps(_without_indices(element), sort_keys=True, ensure_ascii=False)
+
+
+def diff_requests(current: dict, document: "Document") -> list[dict]:
+    """Build `batchUpdate` requests that turn `current` into `document`.
+
+    Top-level elements equal in both bodies at the start and at the end are
+    kept; only the elements between them are deleted and written again.
+    `current` is the Docs JSON of the revision the requests apply to.
+    Content is written as by `document_requests`; changed headers, footers
+    and footnotes are left as they are, with an `UnsupportedContentWarning`.
+    """
+    new = _body(document.json_data)
+    old = _body(current)
+    if not old:
+        return document_requests(document)
+
+    builder = _builder(document.json_data)
+    new_segments = _segments(document.json_data)
+    builder.skipped.update(
+        name
+        for name in UNWRITTEN_SEGMENTS
+        if _fingerprint(new_segments.get(name))
+        != _fingerprint(_segments(current).get(name))
+    )
+    if not new:
+        # Пустое тело: удаляется всё, кроме последнего перевода строки
+        start = old[0]["startIndex"]
+        end = old[-1]["endIndex"] - 1
+        requests = []
+        if start < end:
+            requests.append(_delete_range(start, end))
+        builder.warn_skipped()
+        return requests + _reset_styles(start, start + 1, _has_bullet(old[-1]))
+
+    old_keys = [_fingerprint(element) for element in old]
+    new_keys = [_fingerprint(element) for element in new]
+    if old_keys == new_keys:
+        builder.warn_skipped()
+        return []
+
+    prefix = 0
+    while prefix < min(len(old), len(new)) and old_keys[prefix] == new_keys[prefix]:
+        prefix += 1
+    suffix = 0
+    while (
+        suffix < min(len(old), len(new)) - prefix
+        and old_keys[-suffix - 1] == new_keys[-suffix - 1]
+    ):
+        suffix += 1
+
+    # Изменённый участок заканчивается абзацем в обоих документах: его перевод
+    # строки остаётся на месте, а участок начинается не с таблицы
+    while suffix and not (
+        prefix < len(old) - suffix
+        and prefix < len(new) - suffix
+        and "paragraph" in old[-suffix - 1]
+        and "paragraph" in new[-suffix - 1]
+    ):
+        suffix -= 1
+    if not suffix:
+        prefix = min(prefix, len(old) - 1, len(new) - 1)
+    while prefix and ("table" in old[prefix] or "table" in new[prefix]):
+        prefix -= 1
+
+    start = old[prefix]["startIndex"]
+    end = old[len(old) - suffix - 1]["endIndex"] - 1
+    requests: list[dict] = []
+    if start < end:
+        requests.append(_delete_range(start, end))
+
+    end = builder.content(new[prefix : len(new) - suffix], start) + 1
+    builder.warn_skipped()
+    requests.extend(builder.inserts)
+    # Вставленный текст наследует стиль и маркер абзаца, чей перевод строки
+    # остался на месте, поэтому сначала сброс
+    bullet = _has_bullet(old[len(old) - suffix - 1])
+    requests.extend(_reset_styles(start, end, bullet))
+    requests.extend(builder.requests()[len(builder.inserts) :])
+    return requests
+
+
+def _has_bullet(element: dict) -> bool:
+    return "bullet" in element.get("paragraph", {})
+
+
+def _delete_range(start: int, end: int) -> dict:
+    return {"deleteContentRange": {"range": {"startIndex": start, "endIndex": end}}}
+
+
+def _reset_styles(start: int, end: int, bullets: bool = False) -> list[dict]:
+    changed = {"startIndex": start, "endIndex": end}
+    requests = [{"deleteParagraphBullets": {"range": changed}}] if bullets else []
+    return requests + [
+        {
+            "updateParagraphStyle": {
+                "range": changed,
+                "paragraphStyle": {},
+                "fields": "*",
+            }
+        },
+        {"updateTextStyle": {"range": changed, "textStyle": {}, "fields": "*"}},
+    ]
+
+
+def split_batches(
+    requests: list[dict], max_bytes: int = MAX_BATCH_BYTES
+) -> list[list[dict]]:
+    """Split requests, keeping their order, into batches of at most `max_bytes`."""
+    batches: list[list[dict]] = []
+    size = 0
+    for request in requests:
+        request_size = len(json.dumps(request, ensure_ascii=False).encode("utf-8"))
+        if not batches or size + request_size > max_bytes:
+            batches.append([])
+            size = 0
+        batches[-1].append(request)
+        size += request_size
+    return batches